@@ -1,5 +1,5 @@
 import os, sys, configparser
-from scripts import organize, load, show
+from scripts import organize, load, show, storage, snapshot, mutations
 
 # Initial program configuration
 config = configparser.ConfigParser()
@@ -12,9 +12,11 @@ GENRES = ["Action", "Adventure", "Comedy", "Crime", "Documentary", "Drama", "Fan
 LANGUAGES = ["English", "Spanish", "German", "Italian", "French", 
             "Portuguese", "Russian", "Korean", "Chinese", "Japanese"]
 
-def main():
+def main(all_movies=None):
     # Main program menu
-    all_movies = load.get_all_movies()
+    # Without a snapshot, movies are read only when an option needs all of them, counts and averages
+    # come from the partition summaries and filters read just the partitions they touch (or query the database)
+    movie_partitions = storage.get_storage().get_lazy_catalog()
     while True:
         print("\n--- Main Menu ---\n"
         "1. Show all movies with path\n"
@@ -27,11 +29,20 @@ def main():
         "8. Add new movie\n"
         "9. Update movie\n"
         "10. Delete movie\n"
+        "11. Clean up empty files and folders\n"
+        "12. Show statistics from partition summaries\n"
+        "13. Export movies to the folder layout\n"
+        "14. Compact the mutation log into the partition files\n"
         "0. Exit")
-        option = insert_option(range_max=10)
+        option = insert_option(range_max=14)
+        if option in (1, 6, 8, 9, 10) and all_movies is None:
+            all_movies = load.get_all_movies()
         match option:
             case 0:
                 print("\nExiting...")
+                storage.get_storage().flush()
+                if all_movies is not None:
+                    snapshot.save_snapshot(all_movies)
                 break
             case 1:
                 show.show_movies(all_movies)
@@ -46,13 +57,24 @@ def main():
             case 6:
                 show.show_sorted_movies(all_movies)
             case 7:
-                show.show_filtered_movies(all_movies)
+                show.show_filtered_movies(all_movies if all_movies is not None else movie_partitions)
             case 8:
                 all_movies = load.add_new_movie(all_movies)
             case 9:
                 all_movies = load.update_movie(all_movies)
             case 10:
                 all_movies = load.delete_movie(all_movies)
+            case 11:
+                load.clean_movies_folder()
+            case 12:
+                show.show_summary_statistics()
+            case 13:
+                storage.get_storage().export_tree()
+            case 14:
+                if not mutations.compact_log():
+                    print("\nThe mutation log has no changes to compact")
+        # Write the queued movies once they have waited long enough
+        storage.get_storage().flush_if_due()
 
 
 
@@ -93,6 +115,15 @@ if (__name__ == "__main__"):
     print("="*60)
     for name, path in sorted(csv_paths.items()):
         print(f"  {name:20} -> {path}")
-    stats = load.categorize_movies()
-    print(stats)
-    main()
\ No newline at end of file
+    # Rewrite the partition files if Partition_Format changed
+    load.convert_partitions()
+    # Fold the changes logged in the last session into the partitions before categorizing new movies
+    mutations.compact_log()
+    # Start from the catalog snapshot when nothing changed on disk since it was saved
+    all_movies = snapshot.load_snapshot()
+    if all_movies is None:
+        stats = load.ingest_movies()
+        print(stats)
+    else:
+        print(f"Catalog snapshot loaded: {len(all_movies)} movies")
+    main(all_movies)
\ No newline at end of file
@@ -0,0 +1,338 @@
+import main, os, sys, json, mmap, struct, collections
+
+FILE_FORMAT = "bin"
+MAGIC = b"MVB1"
+
+# magic, version, record size, record count, string heap size
+HEADER_STRUCT = struct.Struct("<4sHHII")
+# year, duration, rating in tenths, genre code, language code, flags, padding,
+# then the heap offset and length of the name, the director and the raw fields
+RECORD_STRUCT = struct.Struct("<HHHBBBx6I")
+VERSION = 1
+
+# Offsets of the numeric columns inside a record, in 16-bit words, and of the code columns in bytes
+WORD_COLUMNS = {"year": 0, "duration": 1, "rating": 2}
+BYTE_COLUMNS = {"genre": 6, "language": 7, "flags": 8}
+
+# Flags of a record: a field whose text is kept verbatim in the raw heap entry because its
+# column cannot reproduce it exactly, and a numeric column that does not hold the field value
+RAW_FLAGS = {"year": 1, "duration": 2, "rating": 4, "genre": 8, "language": 16}
+NO_VALUE_FLAGS = {"year": 32, "duration": 64, "rating": 128}
+NO_CODE = 255
+MAX_WORD = 0xFFFF
+
+# Field order of the rows read_rows builds directly
+ROW_FIELDS = ("name", "genre", "year", "duration", "rating", "director", "language")
+
+
+
+def encode_integer(text):
+    """Get the column value of a year or duration text, if it is a valid number and reproduces it"""
+    try:
+        value = int(text)
+    except (ValueError, TypeError):
+        return None, False
+    if not 0 <= value <= MAX_WORD:
+        return None, False
+    return value, str(value) == text
+
+
+
+def encode_rating(text):
+    """Get the rating of a text in tenths, if it is a valid number with one decimal at most and reproduces it"""
+    try:
+        rating = float(text)
+        tenths = round(rating * 10)
+    except (ValueError, TypeError, OverflowError):
+        return None, False
+    if not 0 <= tenths <= MAX_WORD or tenths / 10 != rating:
+        return None, False
+    return tenths, format_rating(tenths) == text
+
+
+
+def format_rating(tenths):
+    """Get the text of a rating in tenths"""
+    return f"{tenths // 10}.{tenths % 10}"
+
+
+
+def get_code(values, text):
+    """Get the position of text in values, or NO_CODE"""
+    try:
+        return values.index(text)
+    except ValueError:
+        return NO_CODE
+
+
+
+def encode_movies(movies):
+    """Encode movies (dictionaries or rows of values in main.HEADER order) as the bytes of a binary partition"""
+    records = bytearray()
+    heap = bytearray()
+
+    def add_to_heap(text):
+        data = text.encode("utf-8")
+        offset = len(heap)
+        heap.extend(data)
+        return offset, len(data)
+
+    count = 0
+    for movie in movies:
+        values = [movie.get(field) for field in main.HEADER] if hasattr(movie, "get") else list(movie)
+        fields = dict(zip(main.HEADER, ("" if value is None else str(value) for value in values)))
+        flags = 0
+        raw_fields = []
+
+        columns = {}
+        for field in WORD_COLUMNS:
+            value, exact = encode_rating(fields[field]) if field == "rating" else encode_integer(fields[field])
+            if value is None:
+                flags |= NO_VALUE_FLAGS[field]
+            if not exact:
+                flags |= RAW_FLAGS[field]
+                raw_fields.append(fields[field])
+            columns[field] = value or 0
+        for field, values in (("genre", main.GENRES), ("language", main.LANGUAGES)):
+            columns[field] = get_code(values, fields[field])
+            if columns[field] == NO_CODE:
+                flags |= RAW_FLAGS[field]
+                raw_fields.append(fields[field])
+
+        name = add_to_heap(fields["name"])
+        director = add_to_heap(fields["director"])
+        raw = add_to_heap(json.dumps(raw_fields)) if raw_fields else (0, 0)
+        records += RECORD_STRUCT.pack(columns["year"], columns["duration"], columns["rating"],
+                                    columns["genre"], columns["language"], flags, *name, *director, *raw)
+        count += 1
+
+    return HEADER_STRUCT.pack(MAGIC, VERSION, RECORD_STRUCT.size, count, len(heap)) + records + heap
+
+
+
+def write_movies(file_path, movies):
+    """Write movies to a binary partition file, replacing it atomically"""
+    temporary_path = file_path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(encode_movies(movies))
+    os.replace(temporary_path, file_path)
+
+
+
+def is_binary_file(file_path):
+    """Check if a path is a binary partition file"""
+    return file_path.endswith("." + FILE_FORMAT)
+
+
+
+class BinaryPartition:
+    """Binary partition file mapped in memory, decoding records only when they are asked for.
+
+    column gives the numeric and code columns as strided views of the
+    mapped records, so query_indexes and get_summary read them without
+    building a Python object per movie.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, "rb") as file:
+            self.stat_result = os.fstat(file.fileno())
+            self.mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, record_size, self.count, heap_size = HEADER_STRUCT.unpack_from(self.mapped)
+            if magic != MAGIC or version != VERSION or record_size != RECORD_STRUCT.size:
+                raise ValueError(f"{file_path} is not a binary partition file")
+            self.heap_start = HEADER_STRUCT.size + self.count * RECORD_STRUCT.size
+            if len(self.mapped) != self.heap_start + heap_size:
+                raise ValueError(f"{file_path} is truncated")
+        except Exception:
+            self.mapped.close()
+            raise
+        self.buffer = memoryview(self.mapped)
+        self.views = []
+
+    def close(self):
+        """Release the views and unmap the file"""
+        for view in reversed(self.views):
+            view.release()
+        self.buffer.release()
+        self.mapped.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def column(self, field):
+        """Get the values of a year, duration, rating, genre, language or flags column as a strided view"""
+        records = self.buffer[HEADER_STRUCT.size:self.heap_start]
+        self.views.append(records)
+        if field in WORD_COLUMNS and sys.byteorder == "little":
+            words = records.cast("H")
+            self.views.append(words)
+            column = words[WORD_COLUMNS[field]::RECORD_STRUCT.size // 2]
+        elif field in WORD_COLUMNS:
+            return [values[WORD_COLUMNS[field]] for values in RECORD_STRUCT.iter_unpack(records)]
+        else:
+            column = records[BYTE_COLUMNS[field]::RECORD_STRUCT.size]
+        self.views.append(column)
+        return column
+
+    def get_text(self, offset, length):
+        """Decode a string of the heap"""
+        start = self.heap_start + offset
+        return str(self.mapped[start:start + length], "utf-8")
+
+    def decode(self, values):
+        """Get the row of a record from its unpacked values"""
+        year, duration, rating, genre, language, flags, name, name_length, director, director_length, raw, raw_length = values
+        fields = {
+            "name": self.get_text(name, name_length),
+            "genre": main.GENRES[genre] if genre != NO_CODE else None,
+            "year": str(year),
+            "duration": str(duration),
+            "rating": format_rating(rating),
+            "director": self.get_text(director, director_length),
+            "language": main.LANGUAGES[language] if language != NO_CODE else None
+        }
+        if flags & 31:
+            raw_fields = iter(json.loads(self.get_text(raw, raw_length)))
+            for field in ("year", "duration", "rating", "genre", "language"):
+                if flags & RAW_FLAGS[field]:
+                    fields[field] = next(raw_fields)
+        return tuple(fields[field] for field in main.HEADER)
+
+    def get_row(self, index):
+        """Decode one record as a row of values in main.HEADER order"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.decode(RECORD_STRUCT.unpack_from(self.mapped, HEADER_STRUCT.size + index * RECORD_STRUCT.size))
+
+    def read_rows(self):
+        """Decode every record as a row of values in main.HEADER order"""
+        records = self.buffer[HEADER_STRUCT.size:self.heap_start]
+        if tuple(main.HEADER) != ROW_FIELDS:
+            return [self.decode(values) for values in RECORD_STRUCT.iter_unpack(records)]
+
+        # Decode the heap once; its byte offsets are also text offsets when it is ASCII
+        heap = self.mapped[self.heap_start:]
+        heap_text = str(heap, "utf-8")
+        if len(heap_text) != len(heap):
+            heap_text = None
+        genres, languages = main.GENRES, main.LANGUAGES
+        numbers = {}
+        ratings = {}
+        rows = []
+        for values in RECORD_STRUCT.iter_unpack(records):
+            year, duration, rating, genre, language, flags, name, name_length, director, director_length, _, _ = values
+            if flags & 31:
+                rows.append(self.decode(values))
+                continue
+            if heap_text is not None:
+                name = heap_text[name:name + name_length]
+                director = heap_text[director:director + director_length]
+            else:
+                name = str(heap[name:name + name_length], "utf-8")
+                director = str(heap[director:director + director_length], "utf-8")
+            year_text = numbers.get(year) or numbers.setdefault(year, str(year))
+            duration_text = numbers.get(duration) or numbers.setdefault(duration, str(duration))
+            rating_text = ratings.get(rating) or ratings.setdefault(rating, format_rating(rating))
+            rows.append((name, genres[genre], year_text, duration_text, rating_text, director, languages[language]))
+        return rows
+
+    def has_flag(self, flag):
+        """Check if any record has a flag"""
+        return any(map(flag.__and__, self.column("flags")))
+
+    def query_indexes(self, **criteria):
+        """Get the positions of the records that match every criterion, taking the same criteria as
+        MovieCatalog.query. Returns None if a range field of some record is not a number"""
+        indexes = None
+        for field, value in criteria.items():
+            if field in ("genre", "language"):
+                code = get_code(main.GENRES if field == "genre" else main.LANGUAGES, value)
+                if code == NO_CODE:
+                    # Only a field kept verbatim can hold a value outside the list
+                    matches = lambda index, position=main.HEADER.index(field): self.get_row(index)[position] == value
+                else:
+                    matches = lambda index, column=self.column(field): column[index] == code
+            elif field in NO_VALUE_FLAGS:
+                if self.has_flag(NO_VALUE_FLAGS[field]):
+                    return None
+                column = self.column(field)
+                low, high = value
+                if field == "rating":
+                    # Ratings are compared as the same floats the catalog parses
+                    column = [tenths / 10 for tenths in column]
+                if indexes is None:
+                    indexes = [index for index, column_value in enumerate(column) if low <= column_value <= high]
+                    continue
+                matches = lambda index, column=column, low=low, high=high: low <= column[index] <= high
+            else:
+                raise ValueError(f"Field '{field}' cannot be queried")
+            indexes = [index for index in (range(self.count) if indexes is None else indexes) if matches(index)]
+        return list(range(self.count)) if indexes is None else indexes
+
+    def get_summary(self):
+        """Build the summary of the partition like summary.build_summary, summing the mapped columns"""
+        file_summary = {"rows": self.count, "duration_sum": 0, "rating_sum": 0.0, "rating_min": None,
+                        "rating_max": None, "rating_mean": None, "directors": {}, "languages": {}}
+        if not self.count:
+            return file_summary
+        flags = self.column("flags")
+        durations = self.column("duration")
+        ratings = self.column("rating")
+
+        if self.has_flag(NO_VALUE_FLAGS["duration"] | NO_VALUE_FLAGS["rating"]):
+            # A few records hold numbers the columns cannot: add them from their text
+            flagged = [index for index, record_flags in enumerate(flags)
+                    if record_flags & (NO_VALUE_FLAGS["duration"] | NO_VALUE_FLAGS["rating"])]
+            flagged_set = set(flagged)
+            durations = [duration for index, duration in enumerate(durations) if index not in flagged_set]
+            ratings = [rating / 10 for index, rating in enumerate(ratings) if index not in flagged_set]
+            for index in flagged:
+                _, _, _, duration, rating, _, _ = self.get_row(index)
+                try:
+                    durations.append(int(duration))
+                except (ValueError, TypeError):
+                    pass
+                try:
+                    ratings.append(float(rating))
+                except (ValueError, TypeError):
+                    pass
+            file_summary["duration_sum"] = sum(durations)
+            if ratings:
+                file_summary["rating_sum"] = sum(ratings)
+                file_summary["rating_min"], file_summary["rating_max"] = min(ratings), max(ratings)
+        else:
+            file_summary["duration_sum"] = sum(durations)
+            file_summary["rating_sum"] = sum(ratings) / 10
+            file_summary["rating_min"], file_summary["rating_max"] = min(ratings) / 10, max(ratings) / 10
+        file_summary["rating_mean"] = round(file_summary["rating_sum"] / self.count, 4)
+
+        records = self.buffer[HEADER_STRUCT.size:self.heap_start]
+        self.views.append(records)
+        directors = collections.Counter(self.get_text(values[8], values[9]).strip()
+                                        for values in RECORD_STRUCT.iter_unpack(records))
+        file_summary["directors"] = dict(directors)
+        languages = collections.Counter(self.column("language"))
+        for code, amount in languages.items():
+            if code != NO_CODE:
+                file_summary["languages"][main.LANGUAGES[code]] = amount
+        if NO_CODE in languages:
+            for index, code in enumerate(self.column("language")):
+                if code == NO_CODE:
+                    language = self.get_row(index)[6].strip()
+                    file_summary["languages"][language] = file_summary["languages"].get(language, 0) + 1
+        return file_summary
+
+
+
+def read_rows(file_path):
+    """Read every row of a binary partition file"""
+    with BinaryPartition(file_path) as partition:
+        return partition.read_rows()
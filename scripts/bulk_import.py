@@ -0,0 +1,80 @@
+import main, sys, json, time, argparse
+from scripts import load, fastcsv
+
+# Rejected rows printed by the command, the rest are only counted
+MAX_PRINTED_ERRORS = 20
+
+
+
+def get_file_type(file_path):
+    """Guess if a file holds CSV or JSON lines from its extension"""
+    return "jsonl" if file_path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+
+def read_movies_file(file_path, file_type=None):
+    """Read the movies of a CSV file with a header row, as rows of values in main.HEADER order,
+    or of a JSON-lines file with one object per line, as dictionaries"""
+    _, encoding, _, _ = load.get_config()
+    if (file_type or get_file_type(file_path)) == "csv":
+        return fastcsv.read_rows(file_path, encoding, main.HEADER)
+
+    movies = []
+    with open(file_path, "r", encoding=encoding) as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            movie = json.loads(line)
+            if not isinstance(movie, dict):
+                raise ValueError(f"Line {line_number} is not a JSON object")
+            movies.append(movie)
+    return movies
+
+
+
+def print_report(report, seconds):
+    """Print the counts of a bulk_add_movies report and the first rejected rows"""
+    rows = len(report["accepted"]) + len(report["duplicates"]) + len(report["rejected"])
+    print(f"Rows read: {rows} in {seconds:.2f} s")
+    print(f"Accepted: {len(report['accepted'])}")
+    print(f"Duplicates skipped: {len(report['duplicates'])}")
+    print(f"Rejected: {len(report['rejected'])}")
+    for rejected in report["rejected"][:MAX_PRINTED_ERRORS]:
+        print(f"  Row {rejected['row']}: {rejected['error']}")
+    if len(report["rejected"]) > MAX_PRINTED_ERRORS:
+        print(f"  ... and {len(report['rejected']) - MAX_PRINTED_ERRORS} more")
+
+
+
+def run(arguments=None):
+    """Command line entry point: add the movies of a CSV or JSON-lines file. Returns the exit code"""
+    parser = argparse.ArgumentParser(prog="python -m scripts.bulk_import",
+                                    description="Add the movies of a CSV or JSON-lines file to the movies folder")
+    parser.add_argument("file", help="CSV file with a header row, or JSON-lines file with one movie object per line")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="file format (guessed from the extension by default)")
+    parser.add_argument("--report", help="write the whole report as JSON to this file")
+    options = parser.parse_args(arguments)
+
+    try:
+        movies = read_movies_file(options.file, options.format)
+    except Exception as e:
+        print(f"Error reading {options.file}: {str(e)}")
+        return 1
+
+    start_time = time.perf_counter()
+    try:
+        report = load.bulk_add_movies(movies)
+    except Exception as e:
+        print(f"Error adding movies: {str(e)}")
+        return 1
+    print_report(report, time.perf_counter() - start_time)
+
+    if options.report:
+        with open(options.report, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+    return 0
+
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,418 @@
+import main, bisect
+from scripts import records
+
+
+
+def get_duration_category_or_none(duration):
+    """Get the duration category of a movie, or None if its duration is not a number"""
+    try:
+        return main.get_duration_category(duration)
+    except (ValueError, TypeError):
+        return None
+
+
+
+def get_movie_key(movie):
+    """Get the (lowercased name, genre, year, duration category) key used to find a movie"""
+    if isinstance(movie, records.Movie):
+        return (movie.name.strip().lower(), movie.genre.strip(), movie.year.strip(), movie.duration_category)
+    duration_category = get_duration_category_or_none(str(movie.get("duration", "")).strip())
+    return (str(movie.get("name", "")).strip().lower(),
+            str(movie.get("genre", "")).strip(),
+            str(movie.get("year", "")).strip(),
+            duration_category)
+
+
+
+def get_movie_fingerprint(movie):
+    """Get a hashable key with the cleaned value of every main.HEADER field"""
+    return tuple(str(movie.get(field, "")).strip() for field in main.HEADER)
+
+
+
+# Fields with a hash index (value -> sequences) and with a sorted index (field -> parsed value)
+VALUE_FIELDS = ("genre", "language")
+RANGE_FIELDS = {"year": "year_value", "duration": "duration_value", "rating": "rating_value"}
+# Fields with a trigram index for case-insensitive substring search
+TEXT_FIELDS = ("name", "director")
+
+
+
+def get_trigrams(text):
+    """Get the set of three-character substrings of a normalized (lowercased) text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+
+class MovieCatalog(list):
+    """List of records.Movie that keeps its indexes up to date.
+
+    Besides the primary-key index used by find, genre and language have
+    hash indexes and year, duration and rating have sorted indexes used by
+    query. Name and director get a trigram index for search_text, built the
+    first time it is needed. Every movie gets a sequence number when it is
+    added, so query results come back in catalog order. Per-genre counts
+    and duration sums are kept as aggregates, see check_aggregates.
+
+    append, extend and remove update the indexes; a movie edited in place
+    must be passed to reindex together with a copy of its previous values.
+    version changes on every update so derived data can tell it is stale.
+    Dictionaries added to the catalog are converted to records.Movie.
+    """
+
+    def __init__(self, movies=()):
+        super().__init__(records.as_movie(movie) for movie in movies)
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        """Build every index from the movies in the list"""
+        self.version = getattr(self, "version", 0) + 1
+        self.key_index = {}
+        self.value_indexes = {field: {} for field in VALUE_FIELDS}
+        self.sorted_indexes = {field: ([], []) for field in RANGE_FIELDS}  # (sorted values, sequences)
+        self.invalid_values = {field: 0 for field in RANGE_FIELDS}
+        self.sequences = {}  # id(movie) -> sequence
+        self.movies_by_sequence = {}
+        self.next_sequence = 0
+        self.text_values = None  # field -> {value: sequences}, built by _build_text_indexes
+        self.trigram_indexes = None  # field -> {trigram: values}
+        self.genre_aggregates = {}  # genre -> {"amount", "duration_sum", "first_sequence"}
+        self.total_duration = 0
+        # Sort the range values once instead of inserting every movie in order
+        range_values = {field: [] for field in RANGE_FIELDS}
+        for movie in self:
+            self._index_movie(movie, self._assign_sequence(movie), range_values)
+        for field, pairs in range_values.items():
+            pairs.sort()
+            self.sorted_indexes[field] = ([value for value, _ in pairs], [sequence for _, sequence in pairs])
+
+    def _build_text_indexes(self):
+        self.text_values = {field: {} for field in TEXT_FIELDS}
+        self.trigram_indexes = {field: {} for field in TEXT_FIELDS}
+        for movie in self:
+            self._index_text(movie, self.sequences[id(movie)])
+
+    def _index_text(self, movie, sequence):
+        for field in TEXT_FIELDS:
+            value = getattr(movie, field)
+            value_sequences = self.text_values[field].get(value)
+            if value_sequences is None:
+                value_sequences = self.text_values[field][value] = set()
+                for trigram in get_trigrams(value.lower()):
+                    self.trigram_indexes[field].setdefault(trigram, set()).add(value)
+            value_sequences.add(sequence)
+
+    def _unindex_text(self, previous_movie, sequence):
+        for field in TEXT_FIELDS:
+            value = getattr(previous_movie, field)
+            value_sequences = self.text_values[field].get(value, set())
+            value_sequences.discard(sequence)
+            if value_sequences:
+                continue
+            self.text_values[field].pop(value, None)
+            for trigram in get_trigrams(value.lower()):
+                trigram_values = self.trigram_indexes[field].get(trigram, set())
+                trigram_values.discard(value)
+                if not trigram_values:
+                    self.trigram_indexes[field].pop(trigram, None)
+
+    def _assign_sequence(self, movie):
+        sequence = self.next_sequence
+        self.next_sequence += 1
+        self.sequences[id(movie)] = sequence
+        self.movies_by_sequence[sequence] = movie
+        return sequence
+
+    def _index_movie(self, movie, sequence, range_values=None):
+        # range_values collects (value, sequence) pairs to sort later instead of updating the sorted indexes
+        self.key_index.setdefault(get_movie_key(movie), []).append(movie)
+        for field in VALUE_FIELDS:
+            self.value_indexes[field].setdefault(getattr(movie, field), set()).add(sequence)
+        for field, attribute in RANGE_FIELDS.items():
+            value = getattr(movie, attribute)
+            if value is None:
+                self.invalid_values[field] += 1
+                continue
+            if range_values is not None:
+                range_values[field].append((value, sequence))
+                continue
+            values, sequences = self.sorted_indexes[field]
+            position = bisect.bisect_right(values, value)
+            values.insert(position, value)
+            sequences.insert(position, sequence)
+        if self.text_values is not None:
+            self._index_text(movie, sequence)
+        
+        aggregate = self.genre_aggregates.setdefault(movie.genre, {"amount": 0, "duration_sum": 0, "first_sequence": sequence})
+        aggregate["amount"] += 1
+        aggregate["first_sequence"] = min(aggregate["first_sequence"], sequence)
+        if movie.duration_value is not None:
+            aggregate["duration_sum"] += movie.duration_value
+            self.total_duration += movie.duration_value
+
+    def _unindex_movie(self, movie, sequence, previous_movie=None):
+        # previous_movie holds the values the movie was indexed with
+        previous_movie = movie if previous_movie is None else previous_movie
+        key = get_movie_key(previous_movie)
+        bucket = self.key_index.get(key, [])
+        for i, indexed_movie in enumerate(bucket):
+            if indexed_movie is movie:
+                del bucket[i]
+                break
+        if not bucket:
+            self.key_index.pop(key, None)
+        
+        for field in VALUE_FIELDS:
+            value = getattr(previous_movie, field)
+            value_sequences = self.value_indexes[field].get(value, set())
+            value_sequences.discard(sequence)
+            if not value_sequences:
+                self.value_indexes[field].pop(value, None)
+        
+        for field, attribute in RANGE_FIELDS.items():
+            value = getattr(previous_movie, attribute)
+            if value is None:
+                self.invalid_values[field] -= 1
+                continue
+            values, sequences = self.sorted_indexes[field]
+            position = sequences.index(sequence, bisect.bisect_left(values, value), bisect.bisect_right(values, value))
+            del values[position]
+            del sequences[position]
+        
+        if self.text_values is not None:
+            self._unindex_text(previous_movie, sequence)
+        
+        aggregate = self.genre_aggregates[previous_movie.genre]
+        aggregate["amount"] -= 1
+        if previous_movie.duration_value is not None:
+            aggregate["duration_sum"] -= previous_movie.duration_value
+            self.total_duration -= previous_movie.duration_value
+        if not aggregate["amount"]:
+            del self.genre_aggregates[previous_movie.genre]
+        elif aggregate["first_sequence"] == sequence:
+            aggregate["first_sequence"] = min(self.value_indexes["genre"][previous_movie.genre])
+
+    def append(self, movie):
+        movie = records.as_movie(movie)
+        super().append(movie)
+        self._index_movie(movie, self._assign_sequence(movie))
+        self.version += 1
+
+    def extend(self, movies):
+        movies = [records.as_movie(movie) for movie in movies]
+        if len(movies) < 16:
+            for movie in movies:
+                self.append(movie)
+            return
+        # Merge the range values of many movies into the sorted indexes with one sort
+        super().extend(movies)
+        range_values = {field: [] for field in RANGE_FIELDS}
+        for movie in movies:
+            self._index_movie(movie, self._assign_sequence(movie), range_values)
+        for field, pairs in range_values.items():
+            if pairs:
+                values, sequences = self.sorted_indexes[field]
+                pairs.extend(zip(values, sequences))
+                pairs.sort()
+                self.sorted_indexes[field] = ([value for value, _ in pairs], [sequence for _, sequence in pairs])
+        self.version += 1
+
+    def remove(self, movie):
+        position = self.index(movie)
+        removed_movie = self[position]
+        del self[position]
+        sequence = self.sequences.pop(id(removed_movie))
+        del self.movies_by_sequence[sequence]
+        self._unindex_movie(removed_movie, sequence)
+        self.version += 1
+
+    def reindex(self, movie, previous_movie):
+        """Move a movie edited in place from the index entries of its previous values"""
+        sequence = self.sequences[id(movie)]
+        self._unindex_movie(movie, sequence, records.as_movie(previous_movie))
+        self._index_movie(movie, sequence)
+        self.version += 1
+
+    def __reduce__(self):
+        # Pickle the movies as columns and the indexes that do not hold movies; the rest is
+        # rebuilt by restore_catalog without parsing or sorting anything again
+        state = dict(self.__dict__)
+        for attribute in ("key_index", "sequences", "movies_by_sequence"):
+            del state[attribute]
+        columns = [[getattr(movie, slot) for movie in self] for slot in records.Movie.__slots__]
+        return restore_catalog, (columns, [self.sequences[id(movie)] for movie in self], state)
+
+    def find(self, name, genre, year, duration_category):
+        """Find the first movie that matches all search criteria"""
+        bucket = self.key_index.get((name.strip().lower(), genre, year, duration_category))
+        if not bucket:
+            return None
+        return min(bucket, key=lambda movie: self.sequences[id(movie)])
+
+    def find_identical(self, movie):
+        """Find the first movie with exactly the same fields, or None"""
+        fingerprint = get_movie_fingerprint(movie)
+        identical_movies = [indexed_movie for indexed_movie in self.key_index.get(get_movie_key(movie), [])
+                            if get_movie_fingerprint(indexed_movie) == fingerprint]
+        if not identical_movies:
+            return None
+        return min(identical_movies, key=lambda indexed_movie: self.sequences[id(indexed_movie)])
+
+    def contains_identical(self, movie):
+        """Check if a movie with exactly the same fields is already in the catalog"""
+        fingerprint = get_movie_fingerprint(movie)
+        return any(get_movie_fingerprint(indexed_movie) == fingerprint
+                for indexed_movie in self.key_index.get(get_movie_key(movie), []))
+
+    def search_text(self, field, text):
+        """Get the movies whose name or director contains text (ignoring case), in catalog order"""
+        if field not in TEXT_FIELDS:
+            raise ValueError(f"Field '{field}' cannot be searched")
+        if self.text_values is None:
+            self._build_text_indexes()
+        
+        text = text.lower()
+        trigrams = get_trigrams(text)
+        if trigrams:
+            # Only values that have every trigram of the text can contain it
+            postings = sorted((self.trigram_indexes[field].get(trigram, set()) for trigram in trigrams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+        else:
+            candidates = self.text_values[field].keys()
+        
+        matching_sequences = set()
+        for value in candidates:
+            if text in value.lower():
+                matching_sequences.update(self.text_values[field][value])
+        return [self.movies_by_sequence[sequence] for sequence in sorted(matching_sequences)]
+
+    def get_genre_amounts(self):
+        """Get the number of movies of every genre in main.GENRES, or None if a movie has another genre"""
+        if any(genre not in main.GENRES for genre in self.genre_aggregates):
+            return None
+        return {genre: self.genre_aggregates[genre]["amount"] if genre in self.genre_aggregates else 0
+                for genre in main.GENRES}
+
+    def get_total_duration(self):
+        """Get the sum of all durations, or None if some duration is not a number"""
+        if self.invalid_values["duration"]:
+            return None
+        return self.total_duration
+
+    def get_genre_durations(self):
+        """Get {genre: (duration sum, amount)} in order of first appearance, or None if some duration is not a number"""
+        if self.invalid_values["duration"]:
+            return None
+        ordered_genres = sorted(self.genre_aggregates.items(), key=lambda item: item[1]["first_sequence"])
+        return {genre: (aggregate["duration_sum"], aggregate["amount"]) for genre, aggregate in ordered_genres}
+
+    def check_aggregates(self):
+        """Compare the aggregates with a full recompute, returning the genres (or "total") that differ"""
+        genre_aggregates = {}
+        total_duration = 0
+        for movie in self:
+            sequence = self.sequences[id(movie)]
+            aggregate = genre_aggregates.setdefault(movie.genre, {"amount": 0, "duration_sum": 0, "first_sequence": sequence})
+            aggregate["amount"] += 1
+            aggregate["first_sequence"] = min(aggregate["first_sequence"], sequence)
+            if movie.duration_value is not None:
+                aggregate["duration_sum"] += movie.duration_value
+                total_duration += movie.duration_value
+        
+        differences = [genre for genre in set(genre_aggregates) | set(self.genre_aggregates)
+                    if genre_aggregates.get(genre) != self.genre_aggregates.get(genre)]
+        if total_duration != self.total_duration:
+            differences.append("total")
+        return differences
+
+    def query(self, **criteria):
+        """Get the movies that match every criterion, in catalog order.
+
+        Genre and language take a value, year, duration and rating take an
+        inclusive (minimum, maximum) pair. Returns None if a sorted index
+        cannot answer because some movie has a value that is not a number.
+        """
+        matches = []
+        for field, value in criteria.items():
+            if field in VALUE_FIELDS:
+                matches.append(self.value_indexes[field].get(value, set()))
+            elif field in RANGE_FIELDS:
+                if self.invalid_values[field]:
+                    return None
+                value_min, value_max = value
+                values, sequences = self.sorted_indexes[field]
+                matches.append(sequences[bisect.bisect_left(values, value_min):bisect.bisect_right(values, value_max)])
+            else:
+                raise ValueError(f"Field '{field}' cannot be queried")
+        
+        if not matches:
+            return list(self)
+        
+        # Intersect starting from the smallest match
+        matches.sort(key=len)
+        matching_sequences = set(matches[0])
+        for match in matches[1:]:
+            matching_sequences.intersection_update(match)
+        return [self.movies_by_sequence[sequence] for sequence in sorted(matching_sequences)]
+
+
+
+def restore_catalog(columns, sequences, state):
+    """Rebuild a pickled MovieCatalog without indexing its movies again"""
+    movies = records.movies_from_columns(columns)
+    all_movies = MovieCatalog.__new__(MovieCatalog)
+    list.extend(all_movies, movies)
+    all_movies.__dict__.update(state)
+    all_movies.sequences = dict(zip(map(id, movies), sequences))
+    all_movies.movies_by_sequence = dict(zip(sequences, movies))
+    all_movies.key_index = {}
+    for movie in movies:
+        all_movies.key_index.setdefault(get_movie_key(movie), []).append(movie)
+    return all_movies
+
+
+
+def as_catalog(all_movies):
+    """Return all_movies as a MovieCatalog, indexing it if it is a plain list"""
+    if isinstance(all_movies, MovieCatalog):
+        return all_movies
+    return MovieCatalog(all_movies)
+
+
+
+
+def query_movies(all_movies, **criteria):
+    """Query a catalog (or a lazy partitions.PartitionCatalog), returning None for plain lists or when it cannot answer"""
+    if not hasattr(all_movies, "query"):
+        return None
+    return all_movies.query(**criteria)
+
+
+
+
+def search_movies(all_movies, field, text):
+    """Search the trigram index of a catalog (or a lazy partitions.PartitionCatalog), returning None for plain lists"""
+    if not hasattr(all_movies, "search_text"):
+        return None
+    return all_movies.search_text(field, text)
+
+
+
+
+def count_by_genre(all_movies):
+    """Get the number of movies of every genre from the aggregates of a catalog, or None"""
+    return all_movies.get_genre_amounts() if isinstance(all_movies, MovieCatalog) else None
+
+
+
+def total_duration(all_movies):
+    """Get the sum of all durations from the aggregates of a catalog, or None"""
+    return all_movies.get_total_duration() if isinstance(all_movies, MovieCatalog) else None
+
+
+
+def duration_by_genre(all_movies):
+    """Get {genre: (duration sum, amount)} from the aggregates of a catalog, or None"""
+    return all_movies.get_genre_durations() if isinstance(all_movies, MovieCatalog) else None
@@ -0,0 +1,113 @@
+import main
+from scripts import catalog
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, show.py falls back to plain loops
+    numpy = None
+
+# Fields kept as codes into a closed vocabulary (main.GENRES, main.LANGUAGES) and as parsed numbers
+CODE_FIELDS = ("genre", "language")
+NUMBER_FIELDS = {"year": "year_value", "duration": "duration_value", "rating": "rating_value"}
+
+
+
+def get_codes(field):
+    """Map every genre in main.GENRES or language in main.LANGUAGES to its integer code"""
+    return {value: code for code, value in enumerate(main.GENRES if field == "genre" else main.LANGUAGES)}
+
+
+
+def build_snapshot(all_movies):
+    """Build the column arrays of a catalog. Values that are not numbers are NaN and
+    genres or languages outside main.GENRES and main.LANGUAGES get the code -1"""
+    movie_amount = len(all_movies)
+    snapshot = {}
+    for field in CODE_FIELDS:
+        codes = get_codes(field)
+        snapshot[field] = numpy.fromiter((codes.get(getattr(movie, field), -1) for movie in all_movies),
+                                        numpy.int64, movie_amount)
+    for field, attribute in NUMBER_FIELDS.items():
+        values = (getattr(movie, attribute) for movie in all_movies)
+        snapshot[field] = numpy.fromiter((numpy.nan if value is None else value for value in values),
+                                        numpy.float64, movie_amount)
+    return snapshot
+
+
+
+def get_snapshot(all_movies):
+    """Get the cached column arrays of a catalog, or None without NumPy or a MovieCatalog"""
+    if numpy is None or not isinstance(all_movies, catalog.MovieCatalog):
+        return None
+    cached = getattr(all_movies, "columnar_snapshot", None)
+    if cached is None or cached[0] != all_movies.version or cached[1] != len(all_movies):
+        cached = (all_movies.version, len(all_movies), build_snapshot(all_movies))
+        all_movies.columnar_snapshot = cached
+    return cached[2]
+
+
+
+def query_mask(snapshot, criteria):
+    """Get the boolean mask of the movies that match every criterion, or None if a column cannot answer.
+    Genre and language take a value, year, duration and rating take an inclusive (minimum, maximum) pair"""
+    mask = numpy.ones(len(snapshot["genre"]), dtype=bool)
+    for field, value in criteria.items():
+        if field in CODE_FIELDS:
+            codes = get_codes(field)
+            if value not in codes or (snapshot[field] < 0).any():
+                return None
+            mask &= snapshot[field] == codes[value]
+        elif field in NUMBER_FIELDS:
+            values = snapshot[field]
+            if numpy.isnan(values).any():
+                return None
+            mask &= (values >= value[0]) & (values <= value[1])
+        else:
+            raise ValueError(f"Field '{field}' cannot be queried")
+    return mask
+
+
+
+def query_movies(all_movies, **criteria):
+    """Get the movies that match every criterion, in catalog order, with boolean masks over the
+    column arrays. Returns None without a snapshot or when a column cannot answer"""
+    snapshot = get_snapshot(all_movies)
+    mask = query_mask(snapshot, criteria) if snapshot is not None else None
+    if mask is None:
+        return None
+    return [all_movies[position] for position in numpy.flatnonzero(mask)]
+
+
+
+def count_by_genre(all_movies):
+    """Get the number of movies of every genre in main.GENRES, or None without a snapshot or if a movie has another genre"""
+    snapshot = get_snapshot(all_movies)
+    if snapshot is None or (snapshot["genre"] < 0).any():
+        return None
+    counts = numpy.bincount(snapshot["genre"], minlength=len(main.GENRES))
+    return {genre: int(counts[code]) for code, genre in enumerate(main.GENRES)}
+
+
+
+def total_duration(all_movies):
+    """Get the sum of all durations, or None without a snapshot or if some duration is not a number"""
+    snapshot = get_snapshot(all_movies)
+    if snapshot is None or numpy.isnan(snapshot["duration"]).any():
+        return None
+    return int(snapshot["duration"].sum())
+
+
+
+def duration_by_genre(all_movies):
+    """Get {genre: (duration sum, amount)} in order of first appearance, skipping durations that are
+    not numbers like show_average_duration_genre does, or None without a snapshot"""
+    snapshot = get_snapshot(all_movies)
+    if snapshot is None or (snapshot["genre"] < 0).any():
+        return None
+    valid = ~numpy.isnan(snapshot["duration"])
+    genre_codes = snapshot["genre"][valid]
+    sums = numpy.bincount(genre_codes, weights=snapshot["duration"][valid], minlength=len(main.GENRES))
+    amounts = numpy.bincount(genre_codes, minlength=len(main.GENRES))
+    present_codes, first_positions = numpy.unique(genre_codes, return_index=True)
+    ordered_codes = present_codes[numpy.argsort(first_positions)]
+    return {main.GENRES[code]: (int(sums[code]), int(amounts[code])) for code in ordered_codes}
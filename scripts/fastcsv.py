@@ -0,0 +1,84 @@
+import csv, io
+
+
+
+def get_column_indexes(header, fieldnames):
+    """Get the column of every field name in a header row (the last one if repeated, None if missing),
+    or None if the header is exactly fieldnames"""
+    if header == list(fieldnames):
+        return None
+    columns = {name: index for index, name in enumerate(header)}
+    return [columns.get(name) for name in fieldnames]
+
+
+
+def get_values(row, fieldnames, column_indexes):
+    """Get the values of fieldnames from a parsed row like csv.DictReader does:
+    None for the columns missing at the end of a short row and "" for fields not in the header"""
+    if column_indexes is None:
+        if len(row) == len(fieldnames):
+            return tuple(row)
+        return tuple(row[:len(fieldnames)]) + (None,) * (len(fieldnames) - len(row))
+    return tuple("" if index is None else (row[index] if index < len(row) else None)
+                for index in column_indexes)
+
+
+
+def parse_line(line):
+    """Split one CSV line into its fields, using the csv module only when it has quotes.
+    Raises csv.Error if a quoted field does not end in the same line"""
+    if '"' not in line:
+        return line.split(",")
+    return next(csv.reader((line,), strict=True))
+
+
+
+def iter_rows(file, fieldnames, header=None):
+    """Yield one tuple of fieldnames values per row of an open CSV file, in the order of fieldnames.
+    The header is read from the first row unless it is given"""
+    reader = csv.reader(file)
+    if header is None:
+        header = next((row for row in reader if row), None)
+        if header is None:
+            return
+    column_indexes = get_column_indexes(header, fieldnames)
+    for row in reader:
+        if row:
+            yield get_values(row, fieldnames, column_indexes)
+
+
+
+def parse_text(text, fieldnames, header=None):
+    """Parse the whole text of a CSV file at once, returning one tuple of fieldnames values per row.
+    Lines without quotes are split directly; if a quoted field spans lines or a line ends in a bare
+    carriage return, the whole text goes through the csv module instead.
+    header is the header row when text is a part of a file that does not start with it"""
+    if "\r" in text and text.count("\r") != text.count("\r\n"):
+        return list(iter_rows(io.StringIO(text, newline=""), fieldnames, header))
+
+    lines = text.replace("\r\n", "\n").split("\n") if "\r" in text else text.split("\n")
+    rows = []
+    column_indexes = get_column_indexes(header, fieldnames) if header is not None else None
+    header_found = header is not None
+    try:
+        for line in lines:
+            if not line:
+                continue
+            row = parse_line(line)
+            if not header_found:
+                column_indexes = get_column_indexes(row, fieldnames)
+                header_found = True
+            elif column_indexes is None and len(row) == len(fieldnames):
+                rows.append(tuple(row))
+            else:
+                rows.append(get_values(row, fieldnames, column_indexes))
+    except csv.Error:
+        return list(iter_rows(io.StringIO(text, newline=""), fieldnames, header))
+    return rows
+
+
+
+def read_rows(file_path, encoding, fieldnames):
+    """Read a whole CSV file with parse_text"""
+    with open(file_path, "r", encoding=encoding, newline="") as file:
+        return parse_text(file.read(), fieldnames)
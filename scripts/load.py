@@ -1,4 +1,5 @@
-import main, os, csv
+import main, os, io, csv, mmap, codecs, operator, tempfile, concurrent.futures
+from scripts import manifest, catalog, records, summary, fastcsv, storage, binary
 
 
 
@@ -8,16 +9,34 @@ def get_config():
     movies_folder = os.getcwd() + "\\" + path_movies_unscrapped.split("\\")[0]
     encoding = main.config["Config"]["Encoding"]
     file_format = main.config["Config"]["File_Format"]
+    # Partitions can be stored as binary files instead of text ones
+    if get_partition_format() == "binary":
+        file_format = binary.FILE_FORMAT
     return movies_folder, encoding, file_format, path_movies_unscrapped
 
 
 
+def get_partition_format():
+    """Get the format of the partition files set in config.ini, csv (default) or binary"""
+    return main.config.get("Config", "Partition_Format", fallback="csv").strip().lower()
+
+
+
 def clean_movie_data(movie):
     """Clean movie data to ensure only main.HEADER fields are present"""
     return {field: str(movie.get(field, "")).strip() for field in main.HEADER}
 
 
 
+def get_ingest_config():
+    """Get the configuration values used when ingesting the unscrapped movies"""
+    ingest_mode = main.config.get("Config", "Ingest_Mode", fallback="memory")
+    buffer_size = main.config.getint("Config", "Buffer_Size", fallback=10000)
+    workers = main.config.getint("Config", "Workers", fallback=os.cpu_count() or 1)
+    return ingest_mode, max(buffer_size, 1), max(workers, 1)
+
+
+
 def get_movie_file_path(genre, year, duration, file_format):
     """Get the file path for a movie based on its category"""
     movies_folder, _, _, _ = get_config()
@@ -28,8 +47,10 @@ def get_movie_file_path(genre, year, duration, file_format):
 
 
 def read_csv_file(file_path, encoding):
-    """Read a CSV file and return its content as list of dictionaries"""
+    """Read a CSV file (or a binary partition file) and return its content as list of dictionaries"""
     try:
+        if binary.is_binary_file(file_path):
+            return [dict(zip(main.HEADER, row)) for row in binary.read_rows(file_path)]
         with open(file_path, "r", encoding=encoding, newline="") as file:
             reader = csv.DictReader(file)
             return list(reader)
@@ -39,14 +60,45 @@ def read_csv_file(file_path, encoding):
 
 
 
+def read_clean_movies(file_path, encoding):
+    """Read a CSV file with the fast parser and return its movies cleaned like clean_movie_data"""
+    try:
+        rows = fastcsv.read_rows(file_path, encoding, main.HEADER)
+    except Exception as e:
+        print(f"Error reading {file_path}: {str(e)}")
+        return []
+    return [dict(zip(main.HEADER, (str(value).strip() for value in row))) for row in rows]
+
+
+
+def is_partition_file(file_path):
+    """Check if a path is a genre/year/duration_category movies file"""
+    _, _, file_format, _ = get_config()
+    return os.path.basename(file_path) == f"movies.{file_format}"
+
+
+
+def remove_partition_file(file_path):
+    """Remove a file, together with its summary sidecar if it is a partition file"""
+    os.remove(file_path)
+    if is_partition_file(file_path):
+        summary.remove_summary(file_path)
+
+
+
 def write_csv_file(file_path, data, encoding, fieldnames):
-    """Write data to a CSV file"""
+    """Write data to a CSV file (or a binary partition file), refreshing its summary sidecar if it is a partition file"""
     try:
-        with open(file_path, "w", encoding=encoding, newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            if data:
-                writer.writerows(data)
+        if binary.is_binary_file(file_path):
+            binary.write_movies(file_path, data or [])
+        else:
+            with open(file_path, "w", encoding=encoding, newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                if data:
+                    writer.writerows(data)
+        if is_partition_file(file_path):
+            summary.write_summary(file_path, summary.build_summary(data or []))
         return True
     except Exception as e:
         print(f"Error writing {file_path}: {str(e)}")
@@ -55,14 +107,36 @@ def write_csv_file(file_path, data, encoding, fieldnames):
 
 
 def append_to_csv_file(file_path, row, encoding, fieldnames):
-    """Append a row to a CSV file, creating header if file doesn't exist"""
+    """Append a row to a CSV file, creating header if file doesn't exist and updating its summary sidecar"""
+    return append_rows_to_csv_file(file_path, [row], encoding, fieldnames)
+
+
+
+def append_rows_to_csv_file(file_path, rows, encoding, fieldnames):
+    """Append rows to a CSV file opening it once, creating header if file doesn't exist and updating its summary sidecar"""
     file_exists = os.path.exists(file_path)
+    partition_file = is_partition_file(file_path)
+    # Read the summary before appending, afterwards it no longer matches the file
+    file_summary = (summary.read_summary(file_path) if file_exists else summary.new_summary()) if partition_file else None
     try:
-        with open(file_path, "a", encoding=encoding, newline="") as file:
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
+        if binary.is_binary_file(file_path):
+            # The string heap follows the records, so the file is written again with the new rows
+            binary.write_movies(file_path, (binary.read_rows(file_path) if file_exists else []) + list(rows))
+        else:
+            # Format every row in memory first so the file encodes and writes them at once
+            text = io.StringIO()
+            writer = csv.writer(text)
             if not file_exists:
-                writer.writeheader()
-            writer.writerow(row)
+                writer.writerow(fieldnames)
+            writer.writerows(map(operator.itemgetter(*fieldnames), rows))
+            with open(file_path, "a", encoding=encoding, newline="") as file:
+                file.write(text.getvalue())
+        if partition_file:
+            if file_summary is None:
+                file_summary = summary.build_summary(read_csv_file(file_path, encoding))
+            else:
+                summary.extend_summary(file_summary, rows)
+            summary.write_summary(file_path, file_summary)
         return True
     except Exception as e:
         print(f"Error appending to {file_path}: {str(e)}")
@@ -97,11 +171,21 @@ def select_from_menu(options, prompt="Select an option (number): "):
 
 
 
-def get_movie_search_criteria():
-    """Get movie search criteria from user"""
+def get_movie_search_criteria(all_movies=None):
+    """Get movie search criteria from user, listing titles that contain a partial name"""
     print("\nEnter search criteria:")
     name = input("Movie name: ").strip()
     
+    # Show the titles that contain the name if it is not a full title
+    matching_movies = catalog.search_movies(all_movies, "name", name) if name else None
+    if matching_movies and not any(movie["name"].lower() == name.lower() for movie in matching_movies):
+        matching_titles = sorted({movie["name"] for movie in matching_movies})
+        print(f"Titles containing '{name}':")
+        for title in matching_titles[:10]:
+            print(f"  {title}")
+        if len(matching_titles) > 10:
+            print(f"  ... and {len(matching_titles) - 10} more")
+    
     print("\n--- Select Genre ---")
     genre = select_from_menu(main.GENRES, "Select genre (number): ")
     
@@ -175,23 +259,28 @@ def get_movie_attribute_input(attribute, current_value=None):
 
 
 
-def find_movie_by_criteria(all_movies, name, genre, year, duration_category):
-    """Find a movie that matches all search criteria"""
-    for movie in all_movies:
-        if (movie["name"].strip().lower() == name.lower() and
-            movie["genre"] == genre and
-            movie["year"] == year and
-            main.get_duration_category(movie["duration"]) == duration_category):
-            return movie
-    return None
+def find_movie_by_criteria(all_movies, name, genre, year, duration_category, partial=False):
+    """Find a movie that matches all search criteria, or whose name contains name if partial"""
+    all_movies = catalog.as_catalog(all_movies)
+    movie_storage = storage.get_storage()
+    if movie_storage.name == "sqlite":
+        # Indexed query on the database only; the movie returned is a copy of the loaded one
+        return movie_storage.find(name, genre, year, duration_category, partial)
+    
+    found_movie = all_movies.find(name, genre, year, duration_category)
+    if found_movie is None and partial and name:
+        for movie in all_movies.search_text("name", name):
+            if (movie.genre == genre and
+                movie.year == year and
+                movie.duration_category == duration_category):
+                return movie
+    return found_movie
 
 
 
 def movies_are_identical(movie1, movie2):
     """Compare two movies for exact match in all fields"""
-    movie1_clean = clean_movie_data(movie1)
-    movie2_clean = clean_movie_data(movie2)
-    return all(movie1_clean[field] == movie2_clean[field] for field in main.HEADER)
+    return catalog.get_movie_fingerprint(movie1) == catalog.get_movie_fingerprint(movie2)
 
 
 
@@ -241,6 +330,75 @@ def validate_movie_fields(fields):
 
 
 
+def is_partition_file_empty(file_path, encoding="utf-8"):
+    """Check if a CSV file is empty or only has its header, without parsing the whole file"""
+    if os.path.getsize(file_path) == 0:
+        return True
+    if binary.is_binary_file(file_path):
+        with binary.BinaryPartition(file_path) as partition:
+            return len(partition) == 0
+    with open(file_path, "r", encoding=encoding, newline="") as file:
+        file.readline()  # Header
+        return not any(line.strip() for line in file)
+
+
+
+def clean_partition_folders(file_path, movies_folder, encoding):
+    """Remove a category file if it has no movies, then its duration, year and genre folders if they are empty"""
+    deleted_count = 0
+    try:
+        if os.path.exists(file_path) and is_partition_file_empty(file_path, encoding):
+            remove_partition_file(file_path)
+            print(f"Removed empty file: {file_path}")
+            deleted_count += 1
+            forget_manifest_partition(file_path)
+        elif not os.path.exists(file_path):
+            summary.remove_summary(file_path)
+    except Exception as e:
+        print(f"Error removing file {file_path}: {str(e)}")
+        return deleted_count
+    
+    # Walk up the duration, year and genre folders, stopping at the first one that is not empty
+    folder_path = os.path.dirname(file_path)
+    for _ in range(3):
+        if os.path.normcase(folder_path) == os.path.normcase(movies_folder):
+            break
+        try:
+            os.rmdir(folder_path)
+            print(f"Removed empty folder: {folder_path}")
+            deleted_count += 1
+        except FileNotFoundError:
+            pass
+        except OSError:
+            break
+        folder_path = os.path.dirname(folder_path)
+    
+    return deleted_count
+
+
+
+def clean_movies_folder():
+    """Maintenance command: remove every empty file and folder in the movies tree"""
+    movies_folder, _, _, _ = get_config()
+    print("\nCleaning up empty files and folders...")
+    if not os.path.isdir(movies_folder):
+        print("No empty items found to clean")
+        return 0
+    # Folders left empty by removed files are only found by the next sweep
+    items_cleaned = 0
+    while True:
+        sweep_cleaned = safe_clean_empty_files_and_folders(movies_folder)
+        if sweep_cleaned == 0:
+            break
+        items_cleaned += sweep_cleaned
+    if items_cleaned > 0:
+        print(f"Cleaned up {items_cleaned} empty items")
+    else:
+        print("No empty items found to clean")
+    return items_cleaned
+
+
+
 def clean_empty_files_and_folders(movies_folder):
     """Remove empty CSV files and folders recursively, including year and genre folders"""
     empty_files = []
@@ -258,16 +416,16 @@ def clean_empty_files_and_folders(movies_folder):
                 # After processing subfolders, check if this folder is now empty
                 if len(os.listdir(item_path)) == 0:
                     empty_folders.append(item_path)
-            elif item.endswith(".csv"):
+            elif item.endswith(".csv") or binary.is_binary_file(item):
                 try:
-                    with open(item_path, "r", encoding="utf-8") as f:
-                        reader = csv.reader(f)
-                        # Check if file has only header or is empty
-                        rows = list(reader)
-                        if len(rows) <= 1:  # Only header or empty
-                            empty_files.append(item_path)
+                    # Check if file has only header or is empty
+                    if is_partition_file_empty(item_path):
+                        empty_files.append(item_path)
                 except Exception as e:
                     print(f"Error reading file {item_path}: {str(e)}")
+            elif item == summary.SUMMARY_NAME and not os.path.exists(os.path.join(folder_path, f"movies.{get_config()[2]}")):
+                # Summary left without its partition file
+                empty_files.append(item_path)
         
         # If no items were processed (empty folder), add it to empty folders
         if not items_processed and len(os.listdir(folder_path)) == 0:
@@ -280,8 +438,9 @@ def clean_empty_files_and_folders(movies_folder):
     for file_path in empty_files:
         try:
             if os.path.exists(file_path):
-                os.remove(file_path)
+                remove_partition_file(file_path)
                 print(f"Removed empty file: {file_path}")
+                forget_manifest_partition(file_path)
         except Exception as e:
             print(f"Error removing file {file_path}: {str(e)}")
     
@@ -327,10 +486,68 @@ def clean_empty_files_and_folders(movies_folder):
 
 
 
-def get_all_movies() -> list:
-    """Recursively finds all movies.csv files and returns a list with all movies"""
-    movies_folder, encoding, _, _ = get_config()
+def get_read_workers():
+    """Get how many threads read partition files at the same time"""
+    return max(main.config.getint("Config", "Read_Workers", fallback=8), 1)
+
+
+
+def read_partition_file(file_path, encoding, entry=None):
+    """Read the rows of a partition file as tuples in main.HEADER order, together with its stat result.
+    Returns None if the file is missing or no longer matches its manifest entry"""
+    try:
+        if binary.is_binary_file(file_path):
+            with binary.BinaryPartition(file_path) as partition:
+                stat_result = partition.stat_result
+                if entry is not None and not manifest.entry_matches_file(entry, stat_result):
+                    return None
+                movies_data = partition.read_rows()
+        else:
+            with open(file_path, "r", encoding=encoding, newline="") as file:
+                stat_result = os.fstat(file.fileno())
+                if entry is not None and not manifest.entry_matches_file(entry, stat_result):
+                    return None
+                movies_data = fastcsv.parse_text(file.read(), main.HEADER)
+    except FileNotFoundError:
+        if entry is not None:
+            return None
+        raise
+    if entry is not None and len(movies_data) != entry["rows"]:
+        return None
+    return movies_data, stat_result
+
+
+
+def read_partition_files(file_paths, encoding, entries=None, workers=None):
+    """Read partition files with a pool of threads.
+    Returns the result of read_partition_file for every file in the order given (None for the files
+    that failed) and {file path: error message} for the files that could not be read"""
+    entries = entries if entries is not None else [None] * len(file_paths)
+    workers = workers if workers is not None else get_read_workers()
+    results = []
+    errors = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(read_partition_file, file_path, encoding, entry)
+                for file_path, entry in zip(file_paths, entries)]
+        # Take the results in submission order so the movies keep the folder order
+        for file_path, future in zip(file_paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(None)
+                errors[file_path] = str(e)
+    return results, errors
+
+
+
+def scan_all_movies(movies_folder, encoding):
+    """Recursively finds all partition files, returning all movies, a manifest of the files read
+    and {path: error message} for the folders and files that could not be read"""
     all_movies = []
+    movie_manifest = manifest.new_manifest()
+    file_paths = []
+    errors = {}
+    partition_name = f"movies.{get_config()[2]}"
     
     def find_movies_csv_files(folder_path):
         try:
@@ -339,25 +556,253 @@ def get_all_movies() -> list:
                 
                 if os.path.isdir(item_path):
                     find_movies_csv_files(item_path)
-                elif item == "movies.csv":
-                    # Read movies from CSV file and add to list
-                    movies_data = read_csv_file(item_path, encoding)
-                    for movie in movies_data:
-                        movie_dict = clean_movie_data(movie)
-                        all_movies.append(movie_dict)
+                elif item == partition_name:
+                    file_paths.append(item_path)
         except PermissionError:
-            print(f"Permission denied accessing folder: {folder_path}")
+            errors[folder_path] = "Permission denied"
         except Exception as e:
-            print(f"Error accessing folder {folder_path}: {str(e)}")
+            errors[folder_path] = str(e)
     
     find_movies_csv_files(movies_folder)
+    results, read_errors = read_partition_files(file_paths, encoding)
+    errors.update(read_errors)
+    for file_path, result in zip(file_paths, results):
+        if result is None:
+            continue
+        movies_data, stat_result = result
+        for movie in movies_data:
+            all_movies.append(records.Movie.from_values(movie))
+        if movies_data:
+            movie_manifest["partitions"][manifest.get_partition_key(movies_folder, file_path)] = \
+                manifest.get_manifest_entry(file_path, len(movies_data), stat_result)
+    return all_movies, movie_manifest, errors
+
+
+
+def read_manifest_movies(movies_folder, encoding, movie_manifest):
+    """Read the movies of every file listed in the manifest, returning None if the manifest is stale
+    or a file cannot be read"""
+    partition_items = list(movie_manifest["partitions"].items())
+    file_paths = [manifest.get_partition_file_path(movies_folder, partition_key, entry)
+                for partition_key, entry in partition_items]
+    results, errors = read_partition_files(file_paths, encoding, [entry for _, entry in partition_items])
+    if errors or None in results:
+        return None
+    
+    all_movies = []
+    for movies_data, _ in results:
+        for movie in movies_data:
+            all_movies.append(records.Movie.from_values(movie))
     return all_movies
 
 
 
+def read_folder_movies() -> catalog.MovieCatalog:
+    """Returns an indexed list with all movies, reading the files listed in the manifest or rebuilding it"""
+    movies_folder, encoding, _, _ = get_config()
+    
+    movie_manifest = manifest.load_manifest(movies_folder)
+    if movie_manifest is not None:
+        all_movies = read_manifest_movies(movies_folder, encoding, movie_manifest)
+        if all_movies is not None:
+            return catalog.MovieCatalog(all_movies)
+        print("Manifest out of date, rebuilding it...")
+    
+    all_movies, movie_manifest, errors = scan_all_movies(movies_folder, encoding)
+    for path, error in errors.items():
+        print(f"Error reading {path}: {error}")
+    if os.path.isdir(movies_folder):
+        manifest.save_manifest(movies_folder, movie_manifest)
+    return catalog.MovieCatalog(all_movies)
+
+
+
+def get_all_movies() -> catalog.MovieCatalog:
+    """Returns an indexed list with all movies from the storage set in config.ini"""
+    return storage.get_storage().load_movies()
+
+
+
+def iter_partition_files(genre=None, year_min=None, year_max=None):
+    """Yield (genre, year, file path) of the partitions in a genre and year range, pruning by folder name"""
+    movies_folder, _, file_format, _ = get_config()
+    
+    # Take the partitions from the manifest when there is one
+    movie_manifest = manifest.load_manifest(movies_folder)
+    if movie_manifest is not None:
+        partition_keys = movie_manifest["partitions"]
+    else:
+        partition_keys = []
+        genre_names = [genre] if genre is not None else (os.listdir(movies_folder) if os.path.isdir(movies_folder) else [])
+        for genre_name in genre_names:
+            genre_path = os.path.join(movies_folder, genre_name)
+            if not os.path.isdir(genre_path):
+                continue
+            for year_name in os.listdir(genre_path):
+                year_path = os.path.join(genre_path, year_name)
+                if os.path.isdir(year_path):
+                    partition_keys.extend(f"{genre_name}/{year_name}/{category}" for category in os.listdir(year_path))
+    
+    for partition_key in partition_keys:
+        parts = partition_key.split("/")
+        if len(parts) != 3 or (genre is not None and parts[0] != genre):
+            continue
+        try:
+            year = int(parts[1])
+        except ValueError:
+            continue
+        if (year_min is not None and year < year_min) or (year_max is not None and year > year_max):
+            continue
+        file_path = os.path.join(movies_folder, *parts, f"movies.{file_format}")
+        if movie_manifest is not None or os.path.exists(file_path):
+            yield parts[0], parts[1], file_path
+
+
+
+def get_partition_summary(file_path, encoding):
+    """Get the summary of a partition file from its sidecar, rebuilding the sidecar if it is missing or out of date"""
+    file_summary = summary.read_summary(file_path)
+    if file_summary is None:
+        if not os.path.exists(file_path):
+            return summary.new_summary()
+        if binary.is_binary_file(file_path):
+            with binary.BinaryPartition(file_path) as partition:
+                file_summary = partition.get_summary()
+        else:
+            file_summary = summary.build_summary(read_csv_file(file_path, encoding))
+        summary.write_summary(file_path, file_summary)
+    return file_summary
+
+
+
+def get_catalog_summary(genre=None, year_min=None, year_max=None):
+    """Summarize the catalog (or a genre and year range) without loading every movie.
+    Returns the combined summary and one summary per genre, in the order the genres are stored"""
+    summaries_by_genre = storage.get_storage().get_summaries(genre, year_min, year_max)
+    
+    genre_summaries = {genre_name: summary.merge_summaries(genre_summary_list)
+                    for genre_name, genre_summary_list in summaries_by_genre.items() if genre_name in main.GENRES}
+    return summary.merge_summaries(genre_summaries.values()), genre_summaries
+
+
+
+def convert_partitions():
+    """Rewrite the partition files of the other format (csv or binary) in the format set in config.ini,
+    so changing Partition_Format imports or exports the whole tree. Without a manifest, the one found
+    by walking the tree is saved so later starts do not walk it again. Returns how many files were converted"""
+    movies_folder, encoding, file_format, _ = get_config()
+    partition_name = f"movies.{file_format}"
+    other_names = {"movies.csv", f"movies.{binary.FILE_FORMAT}"} - {partition_name}
+    movie_manifest = manifest.load_manifest(movies_folder)
+    if movie_manifest is not None and all(entry["path"] == partition_name for entry in movie_manifest["partitions"].values()):
+        return 0
+    if not os.path.isdir(movies_folder):
+        return 0
+    
+    file_rows = {}
+    partition_paths = []
+    for folder_path, _, file_names in os.walk(movies_folder):
+        if partition_name in file_names:
+            partition_paths.append(os.path.join(folder_path, partition_name))
+        for file_name in other_names.intersection(file_names):
+            old_file_path = os.path.join(folder_path, file_name)
+            new_file_path = os.path.join(folder_path, partition_name)
+            try:
+                movies = [dict(zip(main.HEADER, row)) for row in read_partition_file(old_file_path, encoding)[0]]
+            except Exception as e:
+                print(f"Error reading {old_file_path}: {str(e)}")
+                continue
+            if write_csv_file(new_file_path, movies, encoding, main.HEADER):
+                os.remove(old_file_path)
+                file_rows[new_file_path] = len(movies)
+    
+    if movie_manifest is None:
+        movie_manifest = manifest.new_manifest()
+        for file_path in partition_paths + list(file_rows):
+            rows = file_rows[file_path] if file_path in file_rows else get_partition_summary(file_path, encoding)["rows"]
+            if rows:
+                movie_manifest["partitions"][manifest.get_partition_key(movies_folder, file_path)] = \
+                    manifest.get_manifest_entry(file_path, rows)
+        manifest.save_manifest(movies_folder, movie_manifest)
+    else:
+        update_manifest(file_rows)
+    if file_rows:
+        print(f"{len(file_rows)} partition files converted to {partition_name}")
+    return len(file_rows)
+
+
+
+def update_manifest(file_rows=None, added_rows=None):
+    """Record the row count of changed partition files in the manifest, if there is one"""
+    movies_folder, encoding, file_format, _ = get_config()
+    movie_manifest = manifest.load_manifest(movies_folder)
+    if movie_manifest is None:
+        # Without a manifest the next load scans the whole tree anyway
+        return
+    
+    partition_name = f"movies.{file_format}"
+    for file_path, rows in (file_rows or {}).items():
+        if os.path.basename(file_path) == partition_name:
+            manifest.update_manifest_entry(movie_manifest, movies_folder, file_path, rows)
+    for file_path, rows in (added_rows or {}).items():
+        if os.path.basename(file_path) != partition_name:
+            continue
+        previous_rows = manifest.get_manifest_rows(movie_manifest, movies_folder, file_path)
+        if previous_rows is None:
+            # The summary sidecar written with the rows has the count of the whole file
+            rows = get_partition_summary(file_path, encoding)["rows"] if os.path.exists(file_path) else 0
+        else:
+            rows += previous_rows
+        manifest.update_manifest_entry(movie_manifest, movies_folder, file_path, rows)
+    manifest.save_manifest(movies_folder, movie_manifest)
+
+
+
+def forget_manifest_partition(file_path):
+    """Drop a removed partition file from the manifest, if there is one and it lists the file"""
+    movies_folder, _, _, _ = get_config()
+    movie_manifest = manifest.load_manifest(movies_folder)
+    if movie_manifest is None or manifest.get_manifest_rows(movie_manifest, movies_folder, file_path) is None:
+        return
+    manifest.remove_manifest_entry(movie_manifest, movies_folder, file_path)
+    manifest.save_manifest(movies_folder, movie_manifest)
+
+
+
+def merge_category_movies(file_path, folder_path, movies, encoding):
+    """Merge new movies into a category file, returning the added movies, the duplicates, if the file was written and its row count"""
+    # Create directory structure
+    os.makedirs(folder_path, exist_ok=True)
+    
+    # Read existing movies (if file exists)
+    existing_movies = read_csv_file(file_path, encoding) if os.path.exists(file_path) else []
+    
+    # Filter duplicates
+    seen_fingerprints = {catalog.get_movie_fingerprint(movie) for movie in existing_movies}
+    unique_movies = []
+    duplicate_movies = []
+    for new_movie in movies:
+        fingerprint = catalog.get_movie_fingerprint(new_movie)
+        if fingerprint in seen_fingerprints:
+            duplicate_movies.append(new_movie)
+        else:
+            seen_fingerprints.add(fingerprint)
+            unique_movies.append(new_movie)
+    
+    # Write all movies to CSV file
+    all_movies_to_write = existing_movies + unique_movies
+    cleaned_movies = [clean_movie_data(movie) for movie in all_movies_to_write]
+    written = write_csv_file(file_path, cleaned_movies, encoding, main.HEADER)
+    
+    return unique_movies, duplicate_movies, written, len(cleaned_movies)
+
+
+
 def categorize_movies():
     """Categorizes movies into genre/year/duration_category folder structure"""
     movies_folder, encoding, file_format, path_movies_unscrapped = get_config()
+    if not os.path.exists(path_movies_unscrapped):
+        return {"error": f"CSV file not found: {path_movies_unscrapped}"}
     
     # Read and organize movies
     movies_by_category = {}
@@ -365,11 +810,9 @@ def categorize_movies():
     invalid_movies = []
     
     try:
-        all_movies = read_csv_file(path_movies_unscrapped, encoding)
+        all_movies = read_clean_movies(path_movies_unscrapped, encoding)
         
-        for movie in all_movies:
-            cleaned_movie = clean_movie_data(movie)
-            
+        for cleaned_movie in all_movies:
             # Check for empty fields
             if not all(cleaned_movie.values()):
                 invalid_movies.append(cleaned_movie)
@@ -407,6 +850,7 @@ def categorize_movies():
     }
     
     duplicate_movies = []
+    file_rows = {}
     
     for (genre, year, duration_cat), movies in movies_by_category.items():
         if not movies:
@@ -415,38 +859,24 @@ def categorize_movies():
         file_path, folder_path = get_movie_file_path(genre, year, movies[0]["duration"], file_format)
         
         try:
-            # Create directory structure
-            os.makedirs(folder_path, exist_ok=True)
+            unique_movies, category_duplicates, written, total_movies = merge_category_movies(file_path, folder_path, movies, encoding)
             stats["created_folders"] += 1
             
-            # Read existing movies (if file exists)
-            existing_movies = read_csv_file(file_path, encoding) if os.path.exists(file_path) else []
-            
-            # Filter duplicates
-            unique_movies = []
-            for new_movie in movies:
-                is_duplicate = any(movies_are_identical(existing_movie, new_movie) for existing_movie in existing_movies)
-                is_duplicate = is_duplicate or any(movies_are_identical(unique_movie, new_movie) for unique_movie in unique_movies)
-                
-                if is_duplicate:
-                    print(f"Duplicate skipped: {new_movie[main.HEADER[0]]}")
-                    stats["duplicate_movies_skipped"] += 1
-                    duplicate_movies.append(new_movie)
-                else:
-                    unique_movies.append(new_movie)
-            
-            # Write all movies to CSV file
-            all_movies_to_write = existing_movies + unique_movies
-            cleaned_movies = [clean_movie_data(movie) for movie in all_movies_to_write]
+            for duplicate_movie in category_duplicates:
+                print(f"Duplicate skipped: {duplicate_movie[main.HEADER[0]]}")
+                stats["duplicate_movies_skipped"] += 1
+                duplicate_movies.append(duplicate_movie)
             
-            if write_csv_file(file_path, cleaned_movies, encoding, main.HEADER):
+            if written:
                 stats["created_files"] += 1
                 stats["total_categories"] += 1
                 stats["total_movies_processed"] += len(unique_movies)
+                file_rows[file_path] = total_movies
             
         except Exception as e:
             print(f"Error creating category {folder_path}: {str(e)}")
             continue
+    update_manifest(file_rows)
     
     # Update original file with remaining movies (invalid and duplicates)
     remaining_movies = invalid_movies + duplicate_movies
@@ -459,6 +889,481 @@ def categorize_movies():
 
 
 
+def iter_csv_rows(file_path, encoding):
+    """Yield the rows of a CSV file one by one as dictionaries"""
+    try:
+        with open(file_path, "r", encoding=encoding, newline="") as file:
+            for row in csv.DictReader(file):
+                yield row
+    except Exception as e:
+        print(f"Error reading {file_path}: {str(e)}")
+
+
+
+def iter_clean_movies(rows):
+    """Yield every row cleaned with clean_movie_data"""
+    for row in rows:
+        yield clean_movie_data(row)
+
+
+
+def iter_valid_movies(movies, on_invalid):
+    """Yield the valid movies, passing every invalid one to on_invalid"""
+    for movie in movies:
+        if not all(movie.values()) or validate_movie_fields(movie) != True:
+            on_invalid(movie)
+            continue
+        yield movie
+
+
+
+def iter_categorized_movies(movies):
+    """Yield (category_key, movie) pairs with the genre/year/duration category of each movie"""
+    for movie in movies:
+        duration_cat = main.get_duration_category(movie["duration"])
+        yield (movie["genre"], movie["year"], duration_cat), movie
+
+
+
+def append_spool_rows(file_path, movies):
+    """Append movies as header-less rows to a temporary spool file"""
+    with open(file_path, "a", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerows([movie[field] for field in main.HEADER] for movie in movies)
+
+
+
+def iter_spool_rows(file_path):
+    """Yield the movies stored in a spool file written by append_spool_rows"""
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, "r", encoding="utf-8", newline="") as file:
+        for row in csv.reader(file):
+            yield dict(zip(main.HEADER, row))
+
+
+
+def merge_partition(file_path, folder_path, spool_path, encoding, on_duplicate):
+    """Merge the spooled movies of one category into its CSV file, returning the added and total movies"""
+    os.makedirs(folder_path, exist_ok=True)
+    if binary.is_binary_file(file_path):
+        return merge_binary_partition(file_path, spool_path, encoding, on_duplicate)
+    temporary_path = file_path + ".tmp"
+    seen_fingerprints = set()
+    added_movies = 0
+    file_summary = summary.new_summary()
+    
+    with open(temporary_path, "w", encoding=encoding, newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=main.HEADER)
+        writer.writeheader()
+        
+        # Keep existing movies (if file exists)
+        if os.path.exists(file_path):
+            for existing_movie in iter_clean_movies(iter_csv_rows(file_path, encoding)):
+                seen_fingerprints.add(catalog.get_movie_fingerprint(existing_movie))
+                writer.writerow(existing_movie)
+                summary.add_to_summary(file_summary, existing_movie)
+        
+        # Add new movies that are not duplicates
+        for new_movie in iter_spool_rows(spool_path):
+            fingerprint = catalog.get_movie_fingerprint(new_movie)
+            if fingerprint in seen_fingerprints:
+                print(f"Duplicate skipped: {new_movie[main.HEADER[0]]}")
+                on_duplicate(new_movie)
+            else:
+                seen_fingerprints.add(fingerprint)
+                writer.writerow(new_movie)
+                summary.add_to_summary(file_summary, new_movie)
+                added_movies += 1
+    
+    os.replace(temporary_path, file_path)
+    summary.write_summary(file_path, file_summary)
+    return added_movies, file_summary["rows"]
+
+
+
+def merge_binary_partition(file_path, spool_path, encoding, on_duplicate):
+    """Merge the spooled movies of one category into its binary file, which is written at once"""
+    movies = [clean_movie_data(movie) for movie in read_csv_file(file_path, encoding)] if os.path.exists(file_path) else []
+    seen_fingerprints = {catalog.get_movie_fingerprint(movie) for movie in movies}
+    added_movies = 0
+    for new_movie in iter_spool_rows(spool_path):
+        fingerprint = catalog.get_movie_fingerprint(new_movie)
+        if fingerprint in seen_fingerprints:
+            print(f"Duplicate skipped: {new_movie[main.HEADER[0]]}")
+            on_duplicate(new_movie)
+        else:
+            seen_fingerprints.add(fingerprint)
+            movies.append(new_movie)
+            added_movies += 1
+    if not write_csv_file(file_path, movies, encoding, main.HEADER):
+        raise OSError(f"Could not write {file_path}")
+    return added_movies, len(movies)
+
+
+
+def categorize_movies_streaming(buffer_size=None):
+    """Categorizes movies like categorize_movies, streaming rows so memory does not grow with the input"""
+    _, encoding, file_format, path_movies_unscrapped = get_config()
+    if not os.path.exists(path_movies_unscrapped):
+        return {"error": f"CSV file not found: {path_movies_unscrapped}"}
+    if buffer_size is None:
+        _, buffer_size, _ = get_ingest_config()
+    
+    with tempfile.TemporaryDirectory() as spool_folder:
+        invalid_path = os.path.join(spool_folder, "invalid.csv")
+        duplicate_path = os.path.join(spool_folder, "duplicates.csv")
+        spool_paths = {}  # category_key -> (spool file, duration), in order of first appearance
+        buffers = {}
+        invalid_buffer = []
+        buffered_rows = 0
+        validation_errors = 0
+        
+        def flush_buffers():
+            nonlocal buffered_rows
+            for category_key, movies in buffers.items():
+                append_spool_rows(spool_paths[category_key][0], movies)
+            append_spool_rows(invalid_path, invalid_buffer)
+            buffers.clear()
+            invalid_buffer.clear()
+            buffered_rows = 0
+        
+        def buffer_row(buffer, movie):
+            nonlocal buffered_rows
+            buffer.append(movie)
+            buffered_rows += 1
+            if buffered_rows >= buffer_size:
+                flush_buffers()
+        
+        def on_invalid(movie):
+            nonlocal validation_errors
+            validation_errors += 1
+            buffer_row(invalid_buffer, movie)
+        
+        # Route every valid movie to the buffer of its category
+        rows = iter_csv_rows(path_movies_unscrapped, encoding)
+        movies = iter_valid_movies(iter_clean_movies(rows), on_invalid)
+        for category_key, movie in iter_categorized_movies(movies):
+            if category_key not in spool_paths:
+                spool_paths[category_key] = (os.path.join(spool_folder, f"{len(spool_paths)}.csv"), movie["duration"])
+            buffer_row(buffers.setdefault(category_key, []), movie)
+        flush_buffers()
+        
+        stats = {
+            "total_categories": 0,
+            "total_movies_processed": 0,
+            "created_folders": 0,
+            "created_files": 0,
+            "validation_errors": validation_errors,
+            "duplicate_movies_skipped": 0
+        }
+        
+        duplicate_buffer = []
+        
+        def on_duplicate(movie):
+            stats["duplicate_movies_skipped"] += 1
+            duplicate_buffer.append(movie)
+            if len(duplicate_buffer) >= buffer_size:
+                append_spool_rows(duplicate_path, duplicate_buffer)
+                duplicate_buffer.clear()
+        
+        # Merge each category into its file, one at a time
+        file_rows = {}
+        for (genre, year, duration_cat), (spool_path, duration) in spool_paths.items():
+            file_path, folder_path = get_movie_file_path(genre, year, duration, file_format)
+            
+            try:
+                os.makedirs(folder_path, exist_ok=True)
+                stats["created_folders"] += 1
+                
+                added_movies, file_rows[file_path] = merge_partition(file_path, folder_path, spool_path, encoding, on_duplicate)
+                stats["created_files"] += 1
+                stats["total_categories"] += 1
+                stats["total_movies_processed"] += added_movies
+                
+            except Exception as e:
+                print(f"Error creating category {folder_path}: {str(e)}")
+                continue
+        append_spool_rows(duplicate_path, duplicate_buffer)
+        update_manifest(file_rows)
+        
+        # Update original file with remaining movies (invalid and duplicates)
+        remaining_movies = 0
+        try:
+            with open(path_movies_unscrapped, "w", encoding=encoding, newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=main.HEADER)
+                writer.writeheader()
+                for spool_path in (invalid_path, duplicate_path):
+                    for movie in iter_spool_rows(spool_path):
+                        writer.writerow(movie)
+                        remaining_movies += 1
+            print(f"Original file updated. Remaining movies: {remaining_movies}")
+        except Exception as e:
+            print(f"Error writing {path_movies_unscrapped}: {str(e)}")
+    
+    return stats
+
+
+
+# Smallest byte range of the unscrapped file parsed by one worker
+MIN_CHUNK_SIZE = 1 << 20
+
+
+
+def get_chunk_encoding(encoding):
+    """Get the encoding used to decode byte ranges of a file, or None if rows cannot be split on newline bytes"""
+    codec_name = codecs.lookup(encoding).name
+    if codec_name == "utf-8-sig":
+        return "utf-8"
+    if "\n,\"".encode(codec_name) != b'\n,"':
+        return None
+    return codec_name
+
+
+
+def count_quotes(mapped, start, end, block_size=1 << 24):
+    """Count the quote bytes in a byte range of a mapped file, one block at a time"""
+    quotes = 0
+    for block_start in range(start, end, block_size):
+        quotes += mapped[block_start:min(block_start + block_size, end)].count(b'"')
+    return quotes
+
+
+
+def find_row_end(mapped, row_start, position):
+    """Get the offset after the first newline from position that is not inside a quoted field,
+    counting quotes from row_start (the start of a row), or the file size if there is none"""
+    quotes = 0
+    scanned = row_start
+    while True:
+        newline = mapped.find(b"\n", position)
+        if newline == -1:
+            return len(mapped)
+        quotes += count_quotes(mapped, scanned, newline)
+        scanned = newline
+        if quotes % 2 == 0:
+            return newline + 1
+        position = newline + 1
+
+
+
+def get_unscrapped_chunks(mapped, chunk_encoding, chunk_count, min_chunk_size=MIN_CHUNK_SIZE):
+    """Split a mapped CSV file into byte ranges that start and end at row boundaries.
+    Returns the header row and the (start, end) ranges of the data rows"""
+    start = len(codecs.BOM_UTF8) if mapped[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+    header = []
+    while not header and start < len(mapped):
+        header_end = find_row_end(mapped, start, start)
+        header_line = mapped[start:header_end].decode(chunk_encoding).rstrip("\r\n")
+        header = fastcsv.parse_line(header_line) if header_line else []
+        start = header_end
+    
+    chunk_size = max((len(mapped) - start) // chunk_count + 1, min_chunk_size)
+    chunks = []
+    while start < len(mapped):
+        end = find_row_end(mapped, start, start + chunk_size) if start + chunk_size < len(mapped) else len(mapped)
+        chunks.append((start, end))
+        start = end
+    return header, chunks
+
+
+
+def parse_unscrapped_chunk(file_path, start, end, chunk_encoding, header):
+    """Worker task: parse, clean and validate the rows in a byte range of the unscrapped file.
+    Returns the (category_key, movie) pairs of the valid movies and the invalid movies, in file order"""
+    with open(file_path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            text = mapped[start:end].decode(chunk_encoding)
+    
+    invalid_movies = []
+    movies = (dict(zip(main.HEADER, (str(value).strip() for value in row)))
+            for row in fastcsv.parse_text(text, main.HEADER, header))
+    categorized_movies = list(iter_categorized_movies(iter_valid_movies(movies, invalid_movies.append)))
+    return categorized_movies, invalid_movies
+
+
+
+def iter_unscrapped_parallel(executor, workers, on_invalid, min_chunk_size=MIN_CHUNK_SIZE):
+    """Yield (category_key, movie) pairs of the valid unscrapped movies in file order, parsing the
+    file in chunks in the worker processes of executor. Each worker maps the file itself, so only
+    the byte offsets and the parsed rows go between processes. Invalid movies go to on_invalid"""
+    _, encoding, _, path_movies_unscrapped = get_config()
+    chunk_encoding = get_chunk_encoding(encoding)
+    try:
+        with open(path_movies_unscrapped, "rb") as file:
+            if chunk_encoding is None or os.fstat(file.fileno()).st_size == 0:
+                chunks = None
+            else:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    header, chunks = get_unscrapped_chunks(mapped, chunk_encoding, workers * 4, min_chunk_size)
+    except Exception as e:
+        print(f"Error reading {path_movies_unscrapped}: {str(e)}")
+        return
+    
+    if chunks is None:
+        rows = iter_csv_rows(path_movies_unscrapped, encoding)
+        yield from iter_categorized_movies(iter_valid_movies(iter_clean_movies(rows), on_invalid))
+        return
+    
+    futures = [executor.submit(parse_unscrapped_chunk, path_movies_unscrapped, start, end, chunk_encoding, header)
+            for start, end in chunks]
+    for future in futures:
+        categorized_movies, invalid_movies = future.result()
+        for movie in invalid_movies:
+            on_invalid(movie)
+        yield from categorized_movies
+
+
+
+def categorize_shard(categories, encoding, file_format):
+    """Worker task: merge every (category_key, movies) pair of a shard into its CSV file"""
+    results = {}
+    for (genre, year, duration_cat), movies in categories:
+        file_path, folder_path = get_movie_file_path(genre, year, movies[0]["duration"], file_format)
+        try:
+            unique_movies, duplicate_movies, written, total_movies = merge_category_movies(file_path, folder_path, movies, encoding)
+            results[(genre, year, duration_cat)] = (file_path, len(unique_movies), duplicate_movies, written, total_movies, None)
+        except Exception as e:
+            results[(genre, year, duration_cat)] = (file_path, 0, [], False, 0, f"Error creating category {folder_path}: {str(e)}")
+    return results
+
+
+
+def categorize_movies_parallel(workers=None):
+    """Categorizes movies like categorize_movies, merging the categories of each genre in a process pool"""
+    _, encoding, file_format, path_movies_unscrapped = get_config()
+    if not os.path.exists(path_movies_unscrapped):
+        return {"error": f"CSV file not found: {path_movies_unscrapped}"}
+    if workers is None:
+        _, _, workers = get_ingest_config()
+    if workers <= 1:
+        return categorize_movies()
+    
+    results = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        # Read and organize movies, parsing chunks of the file in the workers
+        movies_by_category = {}
+        invalid_movies = []
+        for category_key, movie in iter_unscrapped_parallel(executor, workers, invalid_movies.append):
+            movies_by_category.setdefault(category_key, []).append(movie)
+        
+        # Shard categories by genre so each genre folder is owned by one worker
+        shards = [[] for _ in range(workers)]
+        genre_shards = {}
+        for category_key, movies in movies_by_category.items():
+            genre = category_key[0]
+            if genre not in genre_shards:
+                genre_shards[genre] = len(genre_shards) % workers
+            shards[genre_shards[genre]].append((category_key, movies))
+        
+        futures = [executor.submit(categorize_shard, shard, encoding, file_format) for shard in shards if shard]
+        for future in concurrent.futures.as_completed(futures):
+            results.update(future.result())
+    
+    stats = {
+        "total_categories": 0,
+        "total_movies_processed": 0,
+        "created_folders": 0,
+        "created_files": 0,
+        "validation_errors": len(invalid_movies),
+        "duplicate_movies_skipped": 0
+    }
+    
+    # Merge worker results in the same order as the serial path
+    duplicate_movies = []
+    file_rows = {}
+    for category_key in movies_by_category:
+        file_path, added_movies, category_duplicates, written, total_movies, error = results[category_key]
+        if error:
+            print(error)
+            continue
+        stats["created_folders"] += 1
+        for duplicate_movie in category_duplicates:
+            print(f"Duplicate skipped: {duplicate_movie[main.HEADER[0]]}")
+            stats["duplicate_movies_skipped"] += 1
+            duplicate_movies.append(duplicate_movie)
+        if written:
+            stats["created_files"] += 1
+            stats["total_categories"] += 1
+            stats["total_movies_processed"] += added_movies
+            file_rows[file_path] = total_movies
+    update_manifest(file_rows)
+    
+    # Update original file with remaining movies (invalid and duplicates)
+    remaining_movies = invalid_movies + duplicate_movies
+    if write_csv_file(path_movies_unscrapped, remaining_movies, encoding, main.HEADER):
+        print(f"Original file updated. Remaining movies: {len(remaining_movies)}")
+    
+    return stats
+
+
+
+def categorize_movies_database(movie_storage):
+    """Inserts the valid unscrapped movies that are not stored yet into a database storage in one transaction"""
+    _, encoding, _, path_movies_unscrapped = get_config()
+    if not os.path.exists(path_movies_unscrapped):
+        return {"error": f"CSV file not found: {path_movies_unscrapped}"}
+    
+    stats = {
+        "total_categories": 0,
+        "total_movies_processed": 0,
+        "created_folders": 0,
+        "created_files": 0,
+        "validation_errors": 0,
+        "duplicate_movies_skipped": 0
+    }
+    invalid_movies = []
+    duplicate_movies = []
+    unique_movies = []
+    categories = set()
+    seen_fingerprints = movie_storage.get_fingerprints()
+    
+    for movie in read_clean_movies(path_movies_unscrapped, encoding):
+        if not all(movie.values()) or validate_movie_fields(movie) != True:
+            invalid_movies.append(movie)
+            stats["validation_errors"] += 1
+            continue
+        fingerprint = catalog.get_movie_fingerprint(movie)
+        if fingerprint in seen_fingerprints:
+            print(f"Duplicate skipped: {movie[main.HEADER[0]]}")
+            duplicate_movies.append(movie)
+            stats["duplicate_movies_skipped"] += 1
+            continue
+        seen_fingerprints.add(fingerprint)
+        unique_movies.append(movie)
+        categories.add((movie["genre"], movie["year"], main.get_duration_category(movie["duration"])))
+    
+    try:
+        movie_storage.add_movies(unique_movies)
+    except Exception as e:
+        return {"error": f"Error saving movies: {str(e)}"}
+    stats["total_categories"] = len(categories)
+    stats["total_movies_processed"] = len(unique_movies)
+    
+    # Update original file with remaining movies (invalid and duplicates)
+    cleaned_remaining = [clean_movie_data(movie) for movie in invalid_movies + duplicate_movies]
+    if write_csv_file(path_movies_unscrapped, cleaned_remaining, encoding, main.HEADER):
+        print(f"Original file updated. Remaining movies: {len(cleaned_remaining)}")
+    
+    return stats
+
+
+
+def ingest_movies():
+    """Categorizes the unscrapped movies with the ingest mode set in config.ini, or inserts them
+    into the database when the storage is sqlite"""
+    movie_storage = storage.get_storage()
+    if movie_storage.name == "sqlite":
+        return categorize_movies_database(movie_storage)
+    ingest_mode, _, _ = get_ingest_config()
+    if ingest_mode == "streaming":
+        return categorize_movies_streaming()
+    if ingest_mode == "parallel":
+        return categorize_movies_parallel()
+    return categorize_movies()
+
+
+
 def add_new_movie(all_movies):
     """Adds a new movie by user input and saves it to the appropriate CSV file"""
     print("\n--- Add New Movie ---")
@@ -489,7 +1394,8 @@ def add_new_movie(all_movies):
         return all_movies
     
     # Check for duplicates
-    if any(movies_are_identical(existing_movie, new_movie) for existing_movie in all_movies):
+    all_movies = catalog.as_catalog(all_movies)
+    if all_movies.contains_identical(new_movie):
         print(f"\nMovie '{new_movie['name']}' already exists in the database")
         return all_movies
     
@@ -497,32 +1403,115 @@ def add_new_movie(all_movies):
     all_movies.append(new_movie)
     print(f"\nMovie '{new_movie['name']}' added to the list")
     
-    # Save to CSV in appropriate folder
-    movies_folder, encoding, file_format, _ = get_config()
-    file_path, folder_path = get_movie_file_path(
-        new_movie["genre"], 
-        new_movie["year"], 
-        new_movie["duration"], 
-        file_format
-    )
-    
-    os.makedirs(folder_path, exist_ok=True)
-    if append_to_csv_file(file_path, new_movie, encoding, main.HEADER):
-        print(f"Movie saved to: {file_path}")
+    # Save it in the storage
+    try:
+        storage.get_storage().add_movie(new_movie)
+    except Exception as e:
+        print(f"Error saving movie: {str(e)}")
     
     return all_movies
 
 
 
+def is_plainly_valid(values, genres, languages):
+    """Quick check of the cleaned values of a movie in main.HEADER order that passes most valid movies;
+    validate_movie_fields decides for the rest. Year and duration must be ASCII digits that are not
+    all zeros and the rating ASCII digits with at most one decimal, checked with string methods"""
+    name, genre, year, duration, rating, director, language = values
+    return bool(name and director and genre in genres and language in languages and
+                year.isdigit() and year.isascii() and year.strip("0") and
+                duration.isdigit() and duration.isascii() and duration.strip("0") and rating.isascii() and
+                (rating.isdigit() or (rating[-2:-1] == "." and rating[:-2].isdigit() and rating[-1].isdigit())))
+
+
+
+def bulk_add_movies(movies, all_movies=None):
+    """Adds movies (dictionaries or rows of values in main.HEADER order) without asking for input.
+    Movies that fail validate_movie_fields are rejected and movies already in all_movies (in the storage if
+    not given) or earlier in movies are duplicates; the rest are saved grouped by partition and, if all_movies
+    was given, added to it.
+    Returns {"accepted": [movies], "duplicates": [movies], "rejected": [{"row", "movie", "error"}]}"""
+    if all_movies is not None:
+        seen_fingerprints = {catalog.get_movie_fingerprint(movie) for movie in all_movies}
+    else:
+        seen_fingerprints = storage.get_storage().get_fingerprints()
+    genres, languages = set(main.GENRES), set(main.LANGUAGES)
+    report = {"accepted": [], "duplicates": [], "rejected": []}
+    
+    for row_number, movie in enumerate(movies, 1):
+        # The cleaned values in main.HEADER order, which are also the fingerprint of the movie
+        if hasattr(movie, "get"):
+            values = tuple(clean_movie_data(movie).values())
+        else:
+            try:
+                values = tuple(map(str.strip, movie))
+            except TypeError:
+                # Numbers, or the None of the columns missing from a short row
+                values = tuple("" if value is None else str(value).strip() for value in movie)
+            if len(values) != len(main.HEADER):
+                values = (values + ("",) * len(main.HEADER))[:len(main.HEADER)]
+        if not is_plainly_valid(values, genres, languages):
+            movie = dict(zip(main.HEADER, values))
+            validation_result = validate_movie_fields(movie)
+            if validation_result != True:
+                report["rejected"].append({"row": row_number, "movie": movie, "error": validation_result})
+                continue
+        if values in seen_fingerprints:
+            report["duplicates"].append(dict(zip(main.HEADER, values)))
+            continue
+        seen_fingerprints.add(values)
+        report["accepted"].append(dict(zip(main.HEADER, values)))
+    
+    if report["accepted"]:
+        storage.get_storage().add_movies(report["accepted"])
+        if all_movies is not None:
+            all_movies.extend(report["accepted"])
+    return report
+
+
+
+def replace_movie_in_file(file_path, encoding, original_movie, new_movie=None):
+    """Remove a movie from a category file, putting new_movie in its place if given.
+    Returns if the movie was found and how many movies are left; the file is removed if it becomes empty"""
+    movies_data = read_csv_file(file_path, encoding) if os.path.exists(file_path) else []
+    
+    updated_movies = []
+    movie_found = False
+    for movie in movies_data:
+        if movies_are_identical(movie, original_movie):
+            movie_found = True
+            if new_movie is not None:
+                updated_movies.append(new_movie.copy())
+        else:
+            updated_movies.append(movie)
+    
+    # Add to the file if it was not there
+    if not movie_found and new_movie is not None:
+        updated_movies.append(new_movie.copy())
+    
+    # Write the file only if there are movies
+    if updated_movies:
+        if movie_found or new_movie is not None:
+            write_csv_file(file_path, updated_movies, encoding, main.HEADER)
+    elif os.path.exists(file_path):
+        # File is now empty, remove it
+        remove_partition_file(file_path)
+        print(f"Empty file removed: {file_path}")
+    
+    return movie_found, len(updated_movies)
+
+
+
 def update_movie(all_movies):
     """Searches for a movie and allows modifying one of its attributes"""
     print("\n--- Update Existing Movie ---")
     
     # Get search criteria
-    name, genre, year, duration_category = get_movie_search_criteria()
+    all_movies = catalog.as_catalog(all_movies)
+    name, genre, year, duration_category = get_movie_search_criteria(all_movies)
     
-    # Find movie
-    found_movie = find_movie_by_criteria(all_movies, name, genre, year, duration_category)
+    # Find movie (a partial name is enough if it identifies it)
+    found_movie = find_movie_by_criteria(all_movies, name, genre, year, duration_category, partial=True)
     if not found_movie:
         print("\nNo movie found that matches all the specified criteria.")
         return all_movies
@@ -549,97 +1538,30 @@ def update_movie(all_movies):
         print(f"\nValidation error: {validation_result}")
         return all_movies
     
-    # Update in memory
+    # Update in memory, editing the loaded movie when the SQLite storage found a copy of it
+    if storage.get_storage().name == "sqlite":
+        loaded_movie = all_movies.find_identical(found_movie)
+        if loaded_movie is None:
+            all_movies.append(original_movie.copy())
+            loaded_movie = all_movies[-1]
+        found_movie = loaded_movie
     previous_value = found_movie[attribute]
     found_movie[attribute] = new_value
+    all_movies.reindex(found_movie, original_movie)
     
     print(f"\nAttribute '{attribute}' modified:")
     print(f"  Previous value: {previous_value}")
     print(f"  New value: {new_value}")
     
-    # Update files
-    movies_folder, encoding, file_format, _ = get_config()
-    
+    # Update the storage
     try:
-        # Calculate new path (in case category changed)
-        new_file_path, new_folder_path = get_movie_file_path(
-            found_movie["genre"], 
-            found_movie["year"], 
-            found_movie["duration"], 
-            file_format
-        )
-        
-        os.makedirs(new_folder_path, exist_ok=True)
-        
-        # First: Collect all files that need to be updated
-        files_to_process = []
-        
-        def collect_csv_files(folder_path):
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isdir(item_path):
-                    collect_csv_files(item_path)
-                elif item.endswith(f".{file_format}"):
-                    files_to_process.append(item_path)
-        
-        collect_csv_files(movies_folder)
-        
-        # Second: Process each file (no recursion during modification)
-        for file_path in files_to_process:
-            try:
-                movies_data = read_csv_file(file_path, encoding)
-                if not movies_data:
-                    continue
-                
-                updated_movies = []
-                movie_found = False
-                
-                for movie in movies_data:
-                    if movies_are_identical(movie, original_movie):
-                        movie_found = True
-                        if file_path == new_file_path:
-                            updated_movies.append(found_movie.copy())
-                            print(f"Movie updated in: {file_path}")
-                        else:
-                            print(f"Movie removed from: {file_path}")
-                    else:
-                        updated_movies.append(movie)
-                
-                # Add to target file if not found
-                if not movie_found and file_path == new_file_path:
-                    updated_movies.append(found_movie.copy())
-                    print(f"Movie added to: {file_path}")
-                
-                # Write the file only if there are movies
-                if updated_movies:
-                    write_csv_file(file_path, updated_movies, encoding, main.HEADER)
-                else:
-                    # File is now empty, remove it
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        print(f"Empty file removed: {file_path}")
-                        
-            except Exception as e:
-                print(f"Error processing file {file_path}: {str(e)}")
-        
-        # Create target file if it doesn't exist
-        if not os.path.exists(new_file_path):
-            write_csv_file(new_file_path, [found_movie], encoding, main.HEADER)
-            print(f"New file created with updated movie: {new_file_path}")
-        
-        # Use a safer cleanup function that doesn't modify during iteration
-        print("\nCleaning up empty files and folders...")
-        items_cleaned = safe_clean_empty_files_and_folders(movies_folder)
-        if items_cleaned > 0:
-            print(f"Cleaned up {items_cleaned} empty items")
-        else:
-            print("No empty items found to clean")
-        
+        storage.get_storage().update_movie(original_movie, found_movie)
         print("Movie successfully updated in all files!")
         
     except Exception as e:
         print(f"Error updating files: {str(e)}")
         found_movie[attribute] = previous_value
+        all_movies.reindex(found_movie, test_movie)
         print("Changes reverted in memory due to file update error.")
 
     return all_movies
@@ -660,15 +1582,14 @@ def safe_clean_empty_files_and_folders(movies_folder):
                 collect_empty_items(item_path)
                 if len(os.listdir(item_path)) == 0:
                     empty_folders.append(item_path)
-            elif item.endswith(".csv"):
+            elif item.endswith(".csv") or binary.is_binary_file(item):
                 try:
-                    with open(item_path, "r", encoding="utf-8") as f:
-                        reader = csv.reader(f)
-                        rows = list(reader)
-                        if len(rows) <= 1:
-                            empty_files.append(item_path)
+                    if is_partition_file_empty(item_path):
+                        empty_files.append(item_path)
                 except:
                     pass
+            elif item == summary.SUMMARY_NAME and not os.path.exists(os.path.join(folder_path, f"movies.{get_config()[2]}")):
+                empty_files.append(item_path)
     
     collect_empty_items(movies_folder)
     
@@ -679,9 +1600,10 @@ def safe_clean_empty_files_and_folders(movies_folder):
     for file_path in empty_files:
         try:
             if os.path.exists(file_path):
-                os.remove(file_path)
+                remove_partition_file(file_path)
                 print(f"Removed empty file: {file_path}")
                 deleted_count += 1
+                forget_manifest_partition(file_path)
         except Exception as e:
             print(f"Error removing file {file_path}: {str(e)}")
     
@@ -762,10 +1684,11 @@ def delete_movie(all_movies):
     print("\n--- Delete Movie ---")
     
     # Get search criteria
-    name, genre, year, duration_category = get_movie_search_criteria()
+    all_movies = catalog.as_catalog(all_movies)
+    name, genre, year, duration_category = get_movie_search_criteria(all_movies)
     
-    # Find movie
-    found_movie = find_movie_by_criteria(all_movies, name, genre, year, duration_category)
+    # Find movie (a partial name is enough if it identifies it)
+    found_movie = find_movie_by_criteria(all_movies, name, genre, year, duration_category, partial=True)
     if not found_movie:
         print("\nNo movie found that matches all the specified criteria.")
         return all_movies
@@ -791,72 +1714,13 @@ def delete_movie(all_movies):
     all_movies.remove(found_movie)
     print(f"\nMovie '{found_movie['name']}' removed from memory.")
     
-    # Remove from CSV files
-    movies_folder, encoding, file_format, _ = get_config()
-    
+    # Remove from the storage
     try:
-        # Track if we found and removed the movie from any file
-        movie_removed = False
-        
-        # First: Collect all CSV files
-        files_to_process = []
-        
-        def collect_csv_files(folder_path):
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isdir(item_path):
-                    collect_csv_files(item_path)
-                elif item.endswith(f".{file_format}"):
-                    files_to_process.append(item_path)
-        
-        collect_csv_files(movies_folder)
-        
-        # Second: Process each file
-        for file_path in files_to_process:
-            try:
-                # Read current movies from file
-                movies_data = read_csv_file(file_path, encoding)
-                if not movies_data:
-                    continue
-                
-                # Filter out the movie to delete
-                updated_movies = []
-                file_modified = False
-                
-                for movie in movies_data:
-                    if not movies_are_identical(movie, found_movie):
-                        updated_movies.append(movie)
-                    else:
-                        movie_removed = True
-                        file_modified = True
-                        print(f"Movie removed from: {file_path}")
-                
-                # Write updated movies back to file (or delete file if empty)
-                if updated_movies:
-                    if file_modified:  # Only write if something changed
-                        write_csv_file(file_path, updated_movies, encoding, main.HEADER)
-                else:
-                    # File is now empty, remove it
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        print(f"Empty file removed: {file_path}")
-                        
-            except Exception as e:
-                print(f"Error processing file {file_path}: {str(e)}")
-        
-        if not movie_removed:
-            print("Warning: Movie was not found in any CSV file, but was removed from memory.")
+        if not storage.get_storage().delete_movie(found_movie):
+            print("Warning: Movie was not found in the storage, but was removed from memory.")
         else:
             print("Movie successfully deleted from all files!")
         
-        # Clean up any empty files and folders with the safe function
-        print("\nCleaning up empty files and folders...")
-        items_cleaned = safe_clean_empty_files_and_folders(movies_folder)
-        if items_cleaned > 0:
-            print(f"Cleaned up {items_cleaned} empty items")
-        else:
-            print("No empty items found to clean")
-        
     except Exception as e:
         print(f"Error during file deletion: {str(e)}")
         # Note: We don't add the movie back to memory since deletion was confirmed
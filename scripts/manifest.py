@@ -0,0 +1,103 @@
+import os, json
+
+MANIFEST_NAME = "manifest.json"
+
+
+
+def get_manifest_path(movies_folder):
+    """Get the path of the manifest file at the root of the movies folder"""
+    return os.path.join(movies_folder, MANIFEST_NAME)
+
+
+
+def get_partition_key(movies_folder, file_path):
+    """Get the genre/year/duration_category key of a partition file"""
+    relative_path = os.path.relpath(os.path.dirname(file_path), movies_folder)
+    return "/".join(relative_path.split(os.sep))
+
+
+
+def load_manifest(movies_folder):
+    """Read the manifest file, returning None if it is missing or unreadable"""
+    try:
+        with open(get_manifest_path(movies_folder), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if not isinstance(manifest.get("partitions"), dict):
+            return None
+        return manifest
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading manifest: {str(e)}")
+        return None
+
+
+
+def save_manifest(movies_folder, manifest):
+    """Write the manifest file atomically"""
+    manifest_path = get_manifest_path(movies_folder)
+    temporary_path = manifest_path + ".tmp"
+    try:
+        os.makedirs(movies_folder, exist_ok=True)
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=1)
+        os.replace(temporary_path, manifest_path)
+        return True
+    except Exception as e:
+        print(f"Error writing manifest: {str(e)}")
+        return False
+
+
+
+def new_manifest():
+    """Create an empty manifest"""
+    return {"partitions": {}}
+
+
+
+def get_manifest_entry(file_path, rows, stat_result=None):
+    """Build the manifest entry of a partition file"""
+    if stat_result is None:
+        stat_result = os.stat(file_path)
+    return {
+        "path": os.path.basename(file_path),
+        "rows": rows,
+        "size": stat_result.st_size,
+        "mtime_ns": stat_result.st_mtime_ns
+    }
+
+
+
+def get_partition_file_path(movies_folder, partition_key, entry):
+    """Get the full path of a partition file listed in the manifest"""
+    return os.path.join(movies_folder, *partition_key.split("/"), entry["path"])
+
+
+
+def entry_matches_file(entry, stat_result):
+    """Check if a manifest entry still describes a file"""
+    return (entry["size"] == stat_result.st_size and
+            entry["mtime_ns"] == stat_result.st_mtime_ns)
+
+
+
+def update_manifest_entry(manifest, movies_folder, file_path, rows):
+    """Record the current state of a partition file, dropping it if it has no movies"""
+    partition_key = get_partition_key(movies_folder, file_path)
+    if not rows or not os.path.exists(file_path):
+        manifest["partitions"].pop(partition_key, None)
+        return
+    manifest["partitions"][partition_key] = get_manifest_entry(file_path, rows)
+
+
+
+def remove_manifest_entry(manifest, movies_folder, file_path):
+    """Forget a partition file that was removed"""
+    manifest["partitions"].pop(get_partition_key(movies_folder, file_path), None)
+
+
+
+def get_manifest_rows(manifest, movies_folder, file_path):
+    """Get the number of movies recorded for a partition file, or None if unknown"""
+    entry = manifest["partitions"].get(get_partition_key(movies_folder, file_path))
+    return entry["rows"] if entry else None
@@ -0,0 +1,241 @@
+import main, os, csv, json
+from scripts import load, summary, binary
+
+LOG_NAME = "mutations.log"
+# Written while a compaction moves the new partition files in place
+COMPACTION_NAME = "mutations.compact"
+
+
+
+def get_log_path(movies_folder):
+    """Get the path of the mutation log at the root of the movies folder"""
+    return os.path.join(movies_folder, LOG_NAME)
+
+
+
+def is_enabled():
+    """Check if adds, updates and deletes go to the mutation log, as set in config.ini"""
+    return main.config.getboolean("Config", "Mutation_Log", fallback=False)
+
+
+
+def append_mutation(operation, movie=None, new_movie=None):
+    """Append one add, update or delete (a tombstone) record to the log and wait until it is on disk"""
+    record = {"op": operation}
+    if movie is not None:
+        record["movie"] = load.clean_movie_data(movie)
+    if new_movie is not None:
+        record["new"] = load.clean_movie_data(new_movie)
+    return append_records([record])
+
+
+
+def append_records(records):
+    """Append log records with one write and wait until they are on disk"""
+    movies_folder, _, _, _ = load.get_config()
+    os.makedirs(movies_folder, exist_ok=True)
+    log_path = get_log_path(movies_folder)
+    # A crash can leave the last record without its newline, so the new records start on a line of their own
+    try:
+        with open(log_path, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            torn_record = file.read(1) != b"\n"
+    except OSError:  # No log yet, or an empty one
+        torn_record = False
+    with open(log_path, "a", encoding="utf-8") as file:
+        file.write(("\n" if torn_record else "") + "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records))
+        file.flush()
+        os.fsync(file.fileno())
+    return log_path
+
+
+
+def read_mutations():
+    """Read the records of the log in order, skipping records cut short by a crash"""
+    movies_folder, _, _, _ = load.get_config()
+    try:
+        with open(get_log_path(movies_folder), "r", encoding="utf-8") as file:
+            lines = file.read().split("\n")
+    except FileNotFoundError:
+        return []
+
+    mutations = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            mutations.append(json.loads(line))
+        except ValueError:
+            print(f"Skipped unreadable mutation log record: {line[:80]}")
+    return mutations
+
+
+
+def replay_mutations(all_movies, mutations):
+    """Apply logged mutations to a catalog in order"""
+    for mutation in mutations:
+        operation = mutation.get("op")
+        if operation == "add":
+            all_movies.append(mutation["movie"])
+        elif operation == "update":
+            found_movie = all_movies.find_identical(mutation["movie"])
+            if found_movie is not None:
+                previous_movie = found_movie.copy()
+                for field in main.HEADER:
+                    found_movie[field] = mutation["new"][field]
+                all_movies.reindex(found_movie, previous_movie)
+            else:
+                # Like replace_movie_in_file, the new values are added if the movie is not there
+                all_movies.append(mutation["new"])
+        elif operation == "delete":
+            found_movie = all_movies.find_identical(mutation["movie"])
+            if found_movie is not None:
+                all_movies.remove(found_movie)
+    return all_movies
+
+
+
+def get_file_path(movie):
+    """Get the partition file of a movie"""
+    _, _, file_format, _ = load.get_config()
+    return load.get_movie_file_path(movie["genre"], movie["year"], movie["duration"], file_format)[0]
+
+
+
+def get_file_mutations(mutations):
+    """Split the logged mutations into {partition file: [(movie to remove, movie to add)]} in log order"""
+    file_mutations = {}
+    for mutation in mutations:
+        operation = mutation.get("op")
+        if operation == "add":
+            file_mutations.setdefault(get_file_path(mutation["movie"]), []).append((None, mutation["movie"]))
+        elif operation == "delete":
+            file_mutations.setdefault(get_file_path(mutation["movie"]), []).append((mutation["movie"], None))
+        elif operation == "update":
+            old_file_path = get_file_path(mutation["movie"])
+            new_file_path = get_file_path(mutation["new"])
+            if old_file_path == new_file_path:
+                file_mutations.setdefault(new_file_path, []).append((mutation["movie"], mutation["new"]))
+            else:
+                file_mutations.setdefault(old_file_path, []).append((mutation["movie"], None))
+                file_mutations.setdefault(new_file_path, []).append((None, mutation["new"]))
+    return file_mutations
+
+
+
+def apply_file_mutations(movies, file_mutations):
+    """Apply (movie to remove, movie to add) pairs to the movies of one partition like replay_mutations"""
+    for old_movie, new_movie in file_mutations:
+        position = None
+        if old_movie is not None:
+            position = next((index for index, movie in enumerate(movies) if load.movies_are_identical(movie, old_movie)), None)
+        if new_movie is None:
+            if position is not None:
+                del movies[position]
+        elif position is not None:
+            movies[position] = new_movie
+        else:
+            movies.append(new_movie)
+    return movies
+
+
+
+def get_marker_path(movies_folder):
+    """Get the path of the file listing the partitions a compaction is replacing"""
+    return os.path.join(movies_folder, COMPACTION_NAME)
+
+
+
+def write_temporary_partition(file_path, movies, encoding):
+    """Write the movies of a partition next to it, in a temporary file that is on disk when this returns"""
+    temporary_path = file_path + ".tmp"
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if binary.is_binary_file(file_path):
+        with open(temporary_path, "wb") as file:
+            file.write(binary.encode_movies(movies))
+            file.flush()
+            os.fsync(file.fileno())
+    else:
+        with open(temporary_path, "w", encoding=encoding, newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=main.HEADER)
+            writer.writeheader()
+            writer.writerows(movies)
+            file.flush()
+            os.fsync(file.fileno())
+    return temporary_path
+
+
+
+def finish_compaction():
+    """Move the temporary partition files of a compaction listed in the marker over the partition files,
+    then remove the log and the marker. Safe to run again if it is interrupted. Returns how many files changed"""
+    movies_folder, encoding, _, _ = load.get_config()
+    marker_path = get_marker_path(movies_folder)
+    try:
+        with open(marker_path, "r", encoding="utf-8") as file:
+            file_rows = json.load(file)
+    except FileNotFoundError:
+        return 0
+
+    for file_path, rows in file_rows.items():
+        temporary_path = file_path + ".tmp"
+        if os.path.exists(temporary_path):
+            os.replace(temporary_path, file_path)
+        if rows and os.path.exists(file_path):
+            summary.write_summary(file_path, summary.build_summary(load.read_csv_file(file_path, encoding)))
+        elif not rows and os.path.exists(file_path):
+            load.remove_partition_file(file_path)
+    load.update_manifest(file_rows)
+    for file_path in file_rows:
+        load.clean_partition_folders(file_path, movies_folder, encoding)
+
+    log_path = get_log_path(movies_folder)
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    os.remove(marker_path)
+    return len(file_rows)
+
+
+
+def compact_log():
+    """Fold the mutation log into the partition files and remove it. The new partitions are written to
+    temporary files first and listed in a marker file; only then are they moved over the partition files
+    with os.replace, so an interrupted compaction is finished (never replayed twice) the next time.
+    Returns how many partition files were written"""
+    movies_folder, encoding, _, _ = load.get_config()
+    if os.path.exists(get_marker_path(movies_folder)):
+        print("\nFinishing an interrupted compaction of the mutation log...")
+        return finish_compaction()
+    mutations = read_mutations()
+    if not mutations:
+        if os.path.exists(get_log_path(movies_folder)):
+            os.remove(get_log_path(movies_folder))
+        return 0
+
+    print(f"\nCompacting {len(mutations)} logged changes...")
+    file_rows = {}
+    for file_path, file_mutations in get_file_mutations(mutations).items():
+        try:
+            rows = load.read_partition_file(file_path, encoding)[0] if os.path.exists(file_path) else []
+            movies = apply_file_mutations([load.clean_movie_data(dict(zip(main.HEADER, row))) for row in rows], file_mutations)
+            if movies:
+                write_temporary_partition(file_path, movies, encoding)
+        except Exception as e:
+            # Nothing was replaced yet: drop the temporary files and keep the log
+            print(f"Error compacting {file_path}, the mutation log is kept: {str(e)}")
+            for written_path in list(file_rows) + [file_path]:
+                if os.path.exists(written_path + ".tmp"):
+                    os.remove(written_path + ".tmp")
+            return 0
+        file_rows[file_path] = len(movies)
+
+    marker_path = get_marker_path(movies_folder)
+    with open(marker_path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(file_rows, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(marker_path + ".tmp", marker_path)
+
+    files_written = finish_compaction()
+    print(f"Mutation log compacted into {files_written} partition files")
+    return files_written
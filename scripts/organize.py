@@ -1,52 +1,154 @@
-import main, os
+import main, os, errno, time, json, collections
+
+# Bytes copied per call when a file has to be copied to another device
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Folders never searched for data files, besides hidden ones
+IGNORED_FOLDERS = {"__pycache__", "node_modules", "venv", "env", "site-packages"}
+
+# File with the last known location of every expected file
+LOCATIONS_FILE = ".file_locations.json"
+
+
+
+def copy_chunk(source_fd, destination_fd, offset, count):
+    # Copy bytes from offset of the source to the current position of the destination inside the kernel
+    if hasattr(os, "copy_file_range"):
+        try:
+            return os.copy_file_range(source_fd, destination_fd, count, offset)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    return os.sendfile(destination_fd, source_fd, offset, count)
+
+
+
+def copy_file(source_path, destination_path):
+    # Copy a file in bounded chunks (in the kernel when the platform allows it) and sync it to disk
+    temporary_path = destination_path + ".tmp"
+    try:
+        with open(source_path, "rb") as source_file, open(temporary_path, "wb") as destination_file:
+            use_kernel = hasattr(os, "copy_file_range") or hasattr(os, "sendfile")
+            copied = 0
+            while True:
+                if use_kernel:
+                    try:
+                        copied_now = copy_chunk(source_file.fileno(), destination_file.fileno(), copied, COPY_CHUNK_SIZE)
+                    except OSError:
+                        # Not supported for these files, copy through a buffer from the start instead
+                        if copied:
+                            raise
+                        use_kernel = False
+                        continue
+                else:
+                    chunk = source_file.read(COPY_CHUNK_SIZE)
+                    destination_file.write(chunk)
+                    copied_now = len(chunk)
+                if not copied_now:
+                    break
+                copied += copied_now
+            
+            destination_file.flush()
+            os.fsync(destination_file.fileno())
+        os.replace(temporary_path, destination_path)
+        return copied
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
 
 
 
 def move_file(source_path, destination_path):
-    # Move file from one location to another
+    # Move file from one location to another, renaming it when both are on the same device
+    start_time = time.perf_counter()
     try:
-        # Read content from original file
-        with open(source_path, "rb", newline="") as source_file:
-            content = source_file.read()
-        
-        # Write content to new location
-        with open(destination_path, "wb", newline="") as destination_file:
-            destination_file.write(content)
+        bytes_moved = os.path.getsize(source_path)
+        destination_directory = os.path.dirname(os.path.abspath(destination_path))
+        moved = False
+        if os.stat(source_path).st_dev == os.stat(destination_directory).st_dev:
+            try:
+                os.replace(source_path, destination_path)
+                moved = True
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
         
-        # Delete original file
-        os.remove(source_path)
+        if not moved:
+            # Different devices: copy in chunks, then delete original file
+            bytes_moved = copy_file(source_path, destination_path)
+            os.remove(source_path)
         
-        print(f"File moved: {source_path} -> {destination_path}")
+        elapsed_time = time.perf_counter() - start_time
+        print(f"File moved: {source_path} -> {destination_path} ({bytes_moved} bytes in {elapsed_time:.3f} s)")
+        return bytes_moved, elapsed_time
         
     except Exception as e:
         print(f"Error moving file {source_path}: {e}")
+        return None
+
+
 
+def is_ignored_folder(name):
+    # Ignore rules for the search: hidden folders, caches and virtual environments
+    return name.startswith(".") or name in IGNORED_FOLDERS
 
 
-def search_files(directory, found_files=None):
-    # Recursively search for CSV files in directory
+
+def search_files(directory, found_files=None, expected_files=None, max_depth=None, pruned_folders=()):
+    # Search for CSV files in directory, shallowest first, skipping ignored folders, folders deeper than
+    # max_depth and the subfolders of pruned_folders. Stops once every expected file was found
     if found_files is None:
         found_files = {}
+    pruned_folders = {os.path.normcase(os.path.abspath(folder)) for folder in pruned_folders}
     
-    try:
-        # Iterate through all directory elements
-        for element in os.listdir(directory):
-            full_path = os.path.join(directory, element)
-            
-            if os.path.isdir(full_path):
-                # Recursive call for subdirectories
-                search_files(full_path, found_files)
-            elif os.path.isfile(full_path) and element.lower().endswith(".csv"):
-                # Store found CSV file
-                found_files[element.lower()] = full_path
-                
-    except PermissionError:
-        print(f"No permission to access: {directory}")
+    pending_folders = collections.deque([(directory, 0)])
+    while pending_folders:
+        folder, depth = pending_folders.popleft()
+        search_subfolders = ((max_depth is None or depth < max_depth) and
+                            os.path.normcase(os.path.abspath(folder)) not in pruned_folders)
+        try:
+            with os.scandir(folder) as elements:
+                for element in elements:
+                    if element.is_dir(follow_symlinks=False):
+                        if search_subfolders and not is_ignored_folder(element.name):
+                            pending_folders.append((element.path, depth + 1))
+                    elif element.is_file() and element.name.lower().endswith(".csv"):
+                        # Store found CSV file
+                        found_files.setdefault(element.name.lower(), element.path)
+        except PermissionError:
+            print(f"No permission to access: {folder}")
+        except OSError as e:
+            print(f"Error accessing {folder}: {e}")
+        
+        if expected_files is not None and all(name in found_files for name in expected_files):
+            break
     
     return found_files
 
 
 
+def load_file_locations(base_directory):
+    # Read the last known location of the expected files
+    try:
+        with open(os.path.join(base_directory, LOCATIONS_FILE), "r", encoding="utf-8") as file:
+            locations = json.load(file)
+        return locations if isinstance(locations, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+
+def save_file_locations(base_directory, locations):
+    # Remember where the expected files are for the next startup
+    try:
+        with open(os.path.join(base_directory, LOCATIONS_FILE), "w", encoding="utf-8") as file:
+            json.dump(locations, file, indent=1)
+    except OSError as e:
+        print(f"Error saving file locations: {e}")
+
+
+
 def organize_files():
     # Main function to organize system files
     
@@ -81,17 +183,40 @@ def organize_files():
         "movies_unscrapped." + file_format: os.path.join(base_directory, path_movies_unscrapped),
     }
     
-    # Search for all data files in directory
-    print(f"Searching for {file_format} files...")
-    found_files = search_files(base_directory)
+    # Check where each file was last found and its destination first, and search only for the files in neither.
+    # A file last found outside its destination was moved in from there, so a new copy there is moved in too
+    file_locations = load_file_locations(base_directory)
+    found_files = {}
+    for expected_file, destination_path in expected_locations.items():
+        last_path = file_locations.get(expected_file)
+        if not isinstance(last_path, str):
+            continue
+        for candidate_path in [last_path] if last_path == destination_path else [last_path, destination_path]:
+            if os.path.isfile(candidate_path):
+                found_files[expected_file] = candidate_path
+                break
+    missing_files = [expected_file for expected_file in expected_locations if expected_file not in found_files]
+    if missing_files:
+        print(f"Searching for {file_format} files...")
+        search_depth = main.config.getint("Config", "Search_Depth", fallback=3)
+        search_results = search_files(base_directory, expected_files=missing_files,
+                                    max_depth=search_depth, pruned_folders=[movies_folder])
+        found_files.update((expected_file, search_results[expected_file])
+                        for expected_file in missing_files if expected_file in search_results)
     
-    # Process each expected file
+    # Process each expected file, remembering where it was found
+    new_locations = {}
     for expected_file, destination_path in expected_locations.items():
         name_without_extension = expected_file.replace("." + file_format, "")
         
         if expected_file in found_files:
             # File found - move if necessary
             found_path = found_files[expected_file]
+            # Remember the place the file was moved in from, which is checked again while it stays at its destination
+            last_path = file_locations.get(expected_file)
+            if found_path != destination_path or not isinstance(last_path, str):
+                last_path = found_path
+            new_locations[expected_file] = last_path
             
             if found_path != destination_path:
                 # Create destination directory if it doesn't exist
@@ -116,9 +241,13 @@ def organize_files():
                 with open(destination_path, "w", encoding=encoding, newline="") as f:
                     f.writelines(",".join(main.HEADER))
                 organized_paths[name_without_extension] = destination_path
+                new_locations[expected_file] = destination_path
                 print(f"Created: {destination_path}")
             except Exception as e:
                 print(f"Error creating {destination_path}: {e}")
     
+    if new_locations != {expected_file: file_locations.get(expected_file) for expected_file in new_locations}:
+        save_file_locations(base_directory, new_locations)
+    
     print("Organization completed!")
     return organized_paths
\ No newline at end of file
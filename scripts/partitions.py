@@ -0,0 +1,161 @@
+import main, os, collections
+from scripts import load, records, catalog, binary
+
+
+
+def get_cache_size():
+    """Get how many parsed partition files the lazy catalog keeps in memory"""
+    return max(main.config.getint("Config", "Partition_Cache", fallback=64), 1)
+
+
+
+def get_partition_category(file_path):
+    """Get the duration category folder of a partition file"""
+    return os.path.basename(os.path.dirname(file_path))
+
+
+
+def get_duration_categories(duration_min, duration_max):
+    """Get the duration categories that can hold movies in an inclusive duration range"""
+    categories = []
+    if duration_min < 90:
+        categories.append("short")
+    if duration_min <= 120 and duration_max >= 90:
+        categories.append("medium")
+    if duration_max > 120:
+        categories.append("long")
+    return categories
+
+
+
+def movie_matches(movie, criteria):
+    """Check a movie against the criteria of MovieCatalog.query, returning None if a range value is not a number"""
+    for field, value in criteria.items():
+        if field in catalog.VALUE_FIELDS:
+            if getattr(movie, field) != value:
+                return False
+        elif field in catalog.RANGE_FIELDS:
+            movie_value = getattr(movie, catalog.RANGE_FIELDS[field])
+            if movie_value is None:
+                return None
+            if not value[0] <= movie_value <= value[1]:
+                return False
+        else:
+            raise ValueError(f"Field '{field}' cannot be queried")
+    return True
+
+
+
+class PartitionCatalog:
+    """Lazy view of the movies folder that reads a partition file only when a query needs it.
+
+    query and iter_movies prune by folder name first: a genre reads one
+    subtree, a year range only the matching year folders and a duration
+    range only the duration categories it overlaps. Parsed partitions are
+    kept in a least recently used cache of cache_size files and read again
+    when their size or modification time changes.
+    """
+
+    def __init__(self, cache_size=None):
+        self.cache_size = cache_size if cache_size is not None else get_cache_size()
+        self.partitions = collections.OrderedDict()  # file path -> (size, mtime_ns, movies)
+        self.reads = 0
+
+    def get_tree(self):
+        """Get the partitions as {genre: {year: [duration categories]}} without reading them"""
+        tree = {}
+        for genre, year, file_path in load.iter_partition_files():
+            tree.setdefault(genre, {}).setdefault(year, []).append(get_partition_category(file_path))
+        return tree
+
+    def load_partition(self, file_path):
+        """Get the movies of a partition file, from the cache when it has not changed"""
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            self.partitions.pop(file_path, None)
+            return []
+
+        cached = self.partitions.get(file_path)
+        if cached is not None and cached[:2] == (stat_result.st_size, stat_result.st_mtime_ns):
+            self.partitions.move_to_end(file_path)
+            return cached[2]
+
+        _, encoding, _, _ = load.get_config()
+        try:
+            movies = [records.Movie.from_values(row) for row in load.read_partition_file(file_path, encoding)[0]]
+        except Exception as e:
+            print(f"Error reading {file_path}: {str(e)}")
+            movies = []
+        self.reads += 1
+        self.partitions[file_path] = (stat_result.st_size, stat_result.st_mtime_ns, movies)
+        self.partitions.move_to_end(file_path)
+        while len(self.partitions) > self.cache_size:
+            self.partitions.popitem(last=False)
+        return movies
+
+    def iter_movies(self, genre=None, year_min=None, year_max=None, categories=None):
+        """Yield the movies of the partitions in a genre, year range and duration categories"""
+        for _, _, file_path in load.iter_partition_files(genre, year_min, year_max):
+            if categories is None or get_partition_category(file_path) in categories:
+                yield from self.load_partition(file_path)
+
+    def __iter__(self):
+        return self.iter_movies()
+
+    def __len__(self):
+        _, encoding, _, _ = load.get_config()
+        return sum(load.get_partition_summary(file_path, encoding)["rows"]
+                for _, _, file_path in load.iter_partition_files())
+
+    def __bool__(self):
+        return next(load.iter_partition_files(), None) is not None
+
+    def query(self, **criteria):
+        """Get the movies that match every criterion, taking the same criteria as MovieCatalog.query.
+        Returns None if some movie read has a range value that is not a number"""
+        year_min = year_max = categories = None
+        if "year" in criteria:
+            year_min, year_max = criteria["year"]
+        if "duration" in criteria:
+            categories = get_duration_categories(*criteria["duration"])
+
+        _, _, file_format, _ = load.get_config()
+        if file_format == binary.FILE_FORMAT:
+            return self.query_binary(criteria, year_min, year_max, categories)
+
+        matching_movies = []
+        for movie in self.iter_movies(criteria.get("genre"), year_min, year_max, categories):
+            matches = movie_matches(movie, criteria)
+            if matches is None:
+                return None
+            if matches:
+                matching_movies.append(movie)
+        return matching_movies
+
+    def query_binary(self, criteria, year_min, year_max, categories):
+        """Query binary partition files over their mapped columns, decoding only the matching movies"""
+        matching_movies = []
+        for _, _, file_path in load.iter_partition_files(criteria.get("genre"), year_min, year_max):
+            if categories is not None and get_partition_category(file_path) not in categories:
+                continue
+            try:
+                with binary.BinaryPartition(file_path) as partition:
+                    indexes = partition.query_indexes(**criteria)
+                    if indexes is None:
+                        return None
+                    matching_movies.extend(records.Movie.from_values(partition.get_row(index)) for index in indexes)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print(f"Error reading {file_path}: {str(e)}")
+                continue
+            self.reads += 1
+        return matching_movies
+
+    def search_text(self, field, text):
+        """Get the movies whose name or director contains text (ignoring case)"""
+        if field not in catalog.TEXT_FIELDS:
+            raise ValueError(f"Field '{field}' cannot be searched")
+        text = text.lower()
+        return [movie for movie in self if text in getattr(movie, field).lower()]
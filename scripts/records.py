@@ -0,0 +1,148 @@
+import main, sys
+from collections.abc import MutableMapping
+
+# Parsed numbers shared between records, like interned strings
+_shared_numbers = {}
+
+# Fields whose values repeat a lot across movies and are interned
+INTERNED_FIELDS = ("genre", "year", "duration", "rating", "director", "language")
+
+
+
+def parse_number(text, number_type):
+    """Parse text as number_type, returning a shared instance or None if it is not a valid number"""
+    try:
+        number = number_type(text)
+    except (ValueError, TypeError):
+        return None
+    return _shared_numbers.setdefault((number_type, number), number)
+
+
+
+class Movie(MutableMapping):
+    """Compact movie record with dictionary-style access to the main.HEADER fields.
+
+    Fields keep their text exactly as loaded, so movie["year"] is still a
+    string; year_value, duration_value, rating_value and duration_category
+    hold the values already parsed.
+    """
+
+    __slots__ = ("name", "genre", "year", "duration", "rating", "director", "language",
+                "year_value", "duration_value", "rating_value", "duration_category")
+
+    def __init__(self, movie=None):
+        movie = movie if movie is not None else {}
+        for field in main.HEADER:
+            self._set_field(field, str(movie.get(field, "")).strip())
+
+    @classmethod
+    def from_values(cls, values):
+        """Build a record from a row of values in main.HEADER order, as returned by fastcsv"""
+        movie = object.__new__(cls)
+        for field, value in zip(main.HEADER, values):
+            movie._set_field(field, str(value).strip())
+        return movie
+
+    def _set_field(self, field, text):
+        if field in INTERNED_FIELDS:
+            text = sys.intern(text)
+        setattr(self, field, text)
+        if field == "year":
+            self.year_value = parse_number(text, int)
+        elif field == "duration":
+            self.duration_value = parse_number(text, int)
+            self.duration_category = (main.get_duration_category(self.duration_value)
+                                    if self.duration_value is not None else None)
+        elif field == "rating":
+            self.rating_value = parse_number(text, float)
+
+    def __getitem__(self, field):
+        if field not in main.HEADER:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in main.HEADER:
+            raise KeyError(field)
+        self._set_field(field, str(value))
+
+    def __delitem__(self, field):
+        raise TypeError("Movie fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(main.HEADER)
+
+    def __len__(self):
+        return len(main.HEADER)
+
+    def __contains__(self, field):
+        return field in main.HEADER
+
+    def __eq__(self, other):
+        if isinstance(other, Movie):
+            return all(getattr(self, field) == getattr(other, field) for field in main.HEADER)
+        return super().__eq__(other)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def copy(self):
+        """Return a new record with the same values"""
+        movie_copy = object.__new__(Movie)
+        for slot in Movie.__slots__:
+            setattr(movie_copy, slot, getattr(self, slot))
+        return movie_copy
+
+
+
+def movies_from_columns(columns):
+    """Rebuild records from one list of values per slot, in Movie.__slots__ order"""
+    movies = []
+    new_movie = object.__new__
+    for (name, genre, year, duration, rating, director, language,
+            year_value, duration_value, rating_value, duration_category) in zip(*columns):
+        movie = new_movie(Movie)
+        movie.name, movie.genre, movie.year, movie.duration = name, genre, year, duration
+        movie.rating, movie.director, movie.language = rating, director, language
+        movie.year_value, movie.duration_value, movie.rating_value = year_value, duration_value, rating_value
+        movie.duration_category = duration_category
+        movies.append(movie)
+    return movies
+
+
+
+def as_movie(movie):
+    """Return movie as a Movie record, converting it if it is a dictionary"""
+    return movie if isinstance(movie, Movie) else Movie(movie)
+
+
+
+def get_year(movie):
+    """Get the release year of a movie as an integer"""
+    if isinstance(movie, Movie) and movie.year_value is not None:
+        return movie.year_value
+    return int(movie["year"])
+
+
+
+def get_duration(movie):
+    """Get the duration of a movie in minutes as an integer"""
+    if isinstance(movie, Movie) and movie.duration_value is not None:
+        return movie.duration_value
+    return int(movie["duration"])
+
+
+
+def get_rating(movie):
+    """Get the rating of a movie as a float"""
+    if isinstance(movie, Movie) and movie.rating_value is not None:
+        return movie.rating_value
+    return float(movie["rating"])
+
+
+
+def get_duration_category(movie):
+    """Get the duration category of a movie"""
+    if isinstance(movie, Movie) and movie.duration_category is not None:
+        return movie.duration_category
+    return main.get_duration_category(movie["duration"])
@@ -1,4 +1,5 @@
 import main, os
+from scripts import records, columnar, catalog, load
 
 
 
@@ -17,7 +18,7 @@ def show_movies(all_movies):
             movies_folder,
             movie[main.HEADER[1]],
             movie[main.HEADER[2]],
-            main.get_duration_category(movie[main.HEADER[3]])
+            records.get_duration_category(movie)
         ]
         movie_path = "\\".join(path_attributes)
         print("")
@@ -26,28 +27,49 @@ def show_movies(all_movies):
 
 
 
-def show_movie_amount(all_movies):
-    """Display total number of movies"""
-    if not all_movies:
+def get_summaries():
+    """Get the (total, {genre: summary}) of the partition summaries, or None if they hold no movies"""
+    total, genre_summaries = load.get_catalog_summary()
+    if not total["rows"]:
+        return None
+    return total, genre_summaries
+
+
+
+def show_movie_amount(all_movies=None):
+    """Display total number of movies, from the partition summaries when no catalog is loaded"""
+    summaries = get_summaries() if all_movies is None else None
+    if not all_movies and summaries is None:
         print("\nNo movies to count")
         return
-    print(f"\n-- Total number of movies: {len(all_movies)} --")
+    movie_amount = summaries[0]["rows"] if summaries is not None else len(all_movies)
+    print(f"\n-- Total number of movies: {movie_amount} --")
 
 
 
-def show_movie_amount_genre(all_movies):
-    """Display number of movies by genre"""
-    if not all_movies:
+def show_movie_amount_genre(all_movies=None):
+    """Display number of movies by genre, from the partition summaries when no catalog is loaded"""
+    summaries = get_summaries() if all_movies is None else None
+    if not all_movies and summaries is None:
         print("\nNo movies to count by genre")
         return
     
-    # Initialize counter for all genres
-    genre_amount = {genre: 0 for genre in main.GENRES}
-    
-    # Count movies per genre
-    for movie in all_movies:
-        movie_genre = movie[main.HEADER[1]]
-        genre_amount[movie_genre] += 1
+    if summaries is not None:
+        genre_summaries = summaries[1]
+        genre_amount = {genre: genre_summaries[genre]["rows"] if genre in genre_summaries else 0
+                        for genre in main.GENRES}
+    else:
+        # Count movies per genre, from the catalog aggregates or vectorized when possible
+        genre_amount = catalog.count_by_genre(all_movies)
+        if genre_amount is None:
+            genre_amount = columnar.count_by_genre(all_movies)
+    if genre_amount is None:
+        # Initialize counter for all genres
+        genre_amount = {genre: 0 for genre in main.GENRES}
+        
+        for movie in all_movies:
+            movie_genre = movie[main.HEADER[1]]
+            genre_amount[movie_genre] += 1
     
     print("\n-- Number of movies by genre --")
     for genre, amount in genre_amount.items():
@@ -55,40 +77,60 @@ def show_movie_amount_genre(all_movies):
 
 
 
-def show_average_duration(all_movies):
-    """Calculate and display average duration of all movies"""
-    if not all_movies:
+def show_average_duration(all_movies=None):
+    """Calculate and display average duration of all movies, from the partition summaries when no catalog is loaded"""
+    summaries = get_summaries() if all_movies is None else None
+    if not all_movies and summaries is None:
         print("\nNo movies to calculate average duration")
         return
     
-    total_duration = 0
-    movie_amount = len(all_movies)
-    
-    # Sum all movie durations
-    for movie in all_movies:
-        movie_duration = movie[main.HEADER[3]]
-        total_duration += int(movie_duration)
+    if summaries is not None:
+        movie_amount = summaries[0]["rows"]
+        total_duration = summaries[0]["duration_sum"]
+    else:
+        movie_amount = len(all_movies)
+        # Sum all movie durations, from the catalog aggregates or vectorized when possible
+        total_duration = catalog.total_duration(all_movies)
+        if total_duration is None:
+            total_duration = columnar.total_duration(all_movies)
+    if total_duration is None:
+        total_duration = 0
+        for movie in all_movies:
+            total_duration += records.get_duration(movie)
     
     average_duration = total_duration / movie_amount
     print(f"\n-- Average duration of all movies: {average_duration:.2f} minutes --")
 
 
 
-def show_average_duration_genre(all_movies):
-    """Calculate and display average duration by genre"""
-    if not all_movies:
+def show_average_duration_genre(all_movies=None):
+    """Calculate and display average duration by genre, from the partition summaries when no catalog is loaded"""
+    summaries = get_summaries() if all_movies is None else None
+    if not all_movies and summaries is None:
         print("\nNo movies to calculate average duration by genre")
         return
     
     genre_duration_amount = {}
     
-    for movie in all_movies:
+    if summaries is not None:
+        duration_sums = {genre: (genre_summary["duration_sum"], genre_summary["rows"])
+                        for genre, genre_summary in summaries[1].items() if genre_summary["rows"]}
+    else:
+        # Sums from the catalog aggregates or vectorized when possible
+        duration_sums = catalog.duration_by_genre(all_movies)
+        if duration_sums is None:
+            # The aggregates cannot skip durations that are not numbers, the columns can
+            duration_sums = columnar.duration_by_genre(all_movies)
+    if duration_sums is not None:
+        for movie_genre, (duration_sum, amount) in duration_sums.items():
+            genre_duration_amount[movie_genre] = {main.HEADER[3]: duration_sum, "amount": amount}
+    
+    for movie in all_movies if duration_sums is None else ():
         movie_genre = movie[main.HEADER[1]]  # genre
-        movie_duration = movie[main.HEADER[3]]  # duration
         
-        # Convert duration to integer
+        # Get duration as integer
         try:
-            movie_duration = int(movie_duration)
+            movie_duration = records.get_duration(movie)
         except (ValueError, TypeError):
             continue  # Skip if cannot convert to integer
         
@@ -111,6 +153,50 @@ def show_average_duration_genre(all_movies):
 
 
 
+def show_summary_statistics():
+    """Display statistics read only from the partition summaries, optionally for one genre and year range"""
+    print("\n-- Choose genre for the statistics --")
+    for i, genre_item in enumerate(main.GENRES, 1):
+        print(f"{i}. {genre_item}")
+    print("0. All genres")
+    option = main.insert_option(range_max=len(main.GENRES))
+    if option is None:
+        return
+    genre = main.GENRES[option-1] if option else None
+    
+    year_min = main.insert_option(text = "Minimum year (0 for no limit): ") or None
+    year_max = main.insert_option(text = "Maximum year (0 for no limit): ") or None
+    if year_min and year_max and year_min > year_max:
+        year_min, year_max = year_max, year_min
+    
+    total, genre_summaries = load.get_catalog_summary(genre, year_min, year_max)
+    filter_condition = genre or "all genres"
+    if year_min or year_max:
+        filter_condition += f", years {year_min or 'up'} to {year_max or 'now'}"
+    if not total["rows"]:
+        print(f"\nNo movies found for {filter_condition}")
+        return
+    
+    print(f"\n-- Statistics for {filter_condition} --")
+    print(f"Total number of movies: {total['rows']}")
+    print(f"Average duration: {total['duration_sum'] / total['rows']:.2f} minutes")
+    print(f"Rating: minimum {total['rating_min']}, maximum {total['rating_max']}, mean {total['rating_mean']:.2f}")
+    
+    languages = sorted(total["languages"].items(), key=lambda item: (-item[1], item[0]))
+    print("Movies by language: " + ", ".join(f"{language} ({amount})" for language, amount in languages))
+    directors = sorted(total["directors"].items(), key=lambda item: (-item[1], item[0]))[:5]
+    print("Most frequent directors: " + ", ".join(f"{director} ({amount})" for director, amount in directors))
+    
+    print("\n--- By genre ---")
+    for genre_name in main.GENRES:
+        if genre_name not in genre_summaries:
+            continue
+        genre_summary = genre_summaries[genre_name]
+        average_duration = genre_summary["duration_sum"] / genre_summary["rows"]
+        print(f"{genre_name}: {genre_summary['rows']} movies, {average_duration:.2f} minutes on average")
+
+
+
 def show_sorted_movies(all_movies):
     """Display movies sorted by a selected attribute"""
     if not all_movies:
@@ -146,6 +232,15 @@ def show_sorted_movies(all_movies):
 
 
 
+def query_movies(all_movies, **criteria):
+    """Filter with the NumPy columns, or with the catalog indexes, returning None if neither can answer"""
+    filtered_movies = columnar.query_movies(all_movies, **criteria)
+    if filtered_movies is None:
+        filtered_movies = catalog.query_movies(all_movies, **criteria)
+    return filtered_movies
+
+
+
 def show_filtered_movies(all_movies):
     """Display movies filtered by various criteria"""
     if not all_movies:
@@ -190,9 +285,9 @@ def show_filtered_movies(all_movies):
                 case 0:
                     return
         filter_condition = f"{attribute} ({genre})"
-        for movie in all_movies:
-            if (movie[attribute] == genre):
-                filtered_movies.append(movie)
+        filtered_movies = query_movies(all_movies, **{attribute: genre})
+        if filtered_movies is None:
+            filtered_movies = [movie for movie in all_movies if movie[attribute] == genre]
     
     # Filter by year range
     elif attribute == main.HEADER[2]:  # HEADER[2] is year
@@ -208,10 +303,13 @@ def show_filtered_movies(all_movies):
                 year_min, year_max = year_max, year_min
                 
             filter_condition = f"{attribute} ({year_min}-{year_max})"
-            for movie in all_movies:
-                movie_year = int(movie[attribute])
-                if year_min <= movie_year <= year_max:
-                    filtered_movies.append(movie)
+            filtered_movies = query_movies(all_movies, **{attribute: (year_min, year_max)})
+            if filtered_movies is None:
+                filtered_movies = []
+                for movie in all_movies:
+                    movie_year = records.get_year(movie)
+                    if year_min <= movie_year <= year_max:
+                        filtered_movies.append(movie)
         except ValueError:
             print("Error: You must enter valid numbers for years")
             return
@@ -231,10 +329,13 @@ def show_filtered_movies(all_movies):
                 duration_min, duration_max = duration_max, duration_min
                 
             filter_condition = f"{attribute} ({duration_min}-{duration_max} minutes)"
-            for movie in all_movies:
-                movie_duration = int(movie[attribute])
-                if duration_min <= movie_duration <= duration_max:
-                    filtered_movies.append(movie)
+            filtered_movies = query_movies(all_movies, **{attribute: (duration_min, duration_max)})
+            if filtered_movies is None:
+                filtered_movies = []
+                for movie in all_movies:
+                    movie_duration = records.get_duration(movie)
+                    if duration_min <= movie_duration <= duration_max:
+                        filtered_movies.append(movie)
         except ValueError:
             print("Error: You must enter valid numbers for duration")
             return
@@ -265,10 +366,13 @@ def show_filtered_movies(all_movies):
                 return
                 
             filter_condition = f"{attribute} ({rating_min}-{rating_max})"
-            for movie in all_movies:
-                movie_rating = float(movie[attribute])
-                if rating_min <= movie_rating <= rating_max:
-                    filtered_movies.append(movie)
+            filtered_movies = query_movies(all_movies, **{attribute: (rating_min, rating_max)})
+            if filtered_movies is None:
+                filtered_movies = []
+                for movie in all_movies:
+                    movie_rating = records.get_rating(movie)
+                    if rating_min <= movie_rating <= rating_max:
+                        filtered_movies.append(movie)
         except ValueError:
             print("Error: You must enter valid numbers for rating")
             return
@@ -283,10 +387,13 @@ def show_filtered_movies(all_movies):
             return
             
         filter_condition = f"{attribute} ({director_search})"
-        for movie in all_movies:
-            movie_director = movie[attribute]
-            if director_search.lower() in movie_director.lower():
-                filtered_movies.append(movie)
+        filtered_movies = catalog.search_movies(all_movies, attribute, director_search)
+        if filtered_movies is None:
+            filtered_movies = []
+            for movie in all_movies:
+                movie_director = movie[attribute]
+                if director_search.lower() in movie_director.lower():
+                    filtered_movies.append(movie)
     
     # Filter by language (exact match)
     elif attribute == main.HEADER[6]:  # HEADER[6] is language
@@ -304,10 +411,9 @@ def show_filtered_movies(all_movies):
             return
             
         filter_condition = f"{attribute} ({language_search})"
-        for movie in all_movies:
-            movie_language = movie[attribute]
-            if movie_language == language_search:
-                filtered_movies.append(movie)
+        filtered_movies = query_movies(all_movies, **{attribute: language_search})
+        if filtered_movies is None:
+            filtered_movies = [movie for movie in all_movies if movie[attribute] == language_search]
     
     # Display filtered results
     print(f"\n--- Movies filtered by {filter_condition} ---")
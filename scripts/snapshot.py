@@ -0,0 +1,127 @@
+import main, os, gc, hashlib, pickle
+from scripts import load, storage
+
+SNAPSHOT_NAME = "catalog.pickle"
+# Changes whenever the snapshot layout changes, so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+
+def get_snapshot_path(movies_folder):
+    """Get the path of the catalog snapshot at the root of the movies folder"""
+    return os.path.join(movies_folder, SNAPSHOT_NAME)
+
+
+
+def get_fingerprint():
+    """Fingerprint the stored movies and the unscrapped file from the size and modification time of
+    every file of the storage and of the unscrapped file. Returns None if the storage files are unknown"""
+    _, _, _, path_movies_unscrapped = load.get_config()
+    movie_storage = storage.get_storage()
+    file_paths = movie_storage.get_fingerprint_files()
+    if file_paths is None:
+        return None
+
+    digest = hashlib.sha1(f"{SNAPSHOT_VERSION}:{movie_storage.name}".encode())
+    file_paths.append(("unscrapped", path_movies_unscrapped))
+    for name, file_path in file_paths:
+        try:
+            stat_result = os.stat(file_path)
+            digest.update(f"{name}:{stat_result.st_size}:{stat_result.st_mtime_ns}\n".encode())
+        except OSError:
+            digest.update(f"{name}:missing\n".encode())
+    return digest.hexdigest()
+
+
+
+def is_unscrapped_settled(all_movies):
+    """Check that ingesting the unscrapped file again would not add any movie to all_movies"""
+    _, encoding, _, path_movies_unscrapped = load.get_config()
+    if not os.path.exists(path_movies_unscrapped):
+        return True
+    for movie in load.read_clean_movies(path_movies_unscrapped, encoding):
+        if (all(movie.values()) and load.validate_movie_fields(movie) == True and
+                not all_movies.contains_identical(movie)):
+            return False
+    return True
+
+
+
+def is_check_enabled():
+    """Check if the aggregates of a loaded snapshot are compared with a full recompute, as set in config.ini"""
+    return main.config.getboolean("Config", "Check_Snapshot", fallback=False)
+
+
+
+def read_snapshot_header(snapshot_file):
+    """Read the header written before the catalog, or None if it is not a current snapshot"""
+    header = pickle.load(snapshot_file)
+    if not isinstance(header, dict) or header.get("version") != SNAPSHOT_VERSION:
+        return None
+    return header
+
+
+
+def load_snapshot():
+    """Get the catalog saved in the snapshot if the movies tree and the unscrapped file did not change
+    since and ingesting the unscrapped file would not add anything. Returns None otherwise"""
+    movies_folder, _, _, _ = load.get_config()
+    fingerprint = get_fingerprint()
+    if fingerprint is None:
+        return None
+
+    try:
+        with open(get_snapshot_path(movies_folder), "rb") as snapshot_file:
+            header = read_snapshot_header(snapshot_file)
+            if header is None or header["fingerprint"] != fingerprint or not header["settled"]:
+                return None
+            # Loading creates millions of objects that the garbage collector does not need to track yet
+            gc.disable()
+            try:
+                all_movies = pickle.load(snapshot_file)
+            finally:
+                gc.enable()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error reading catalog snapshot: {str(e)}")
+        return None
+
+    if is_check_enabled():
+        differences = all_movies.check_aggregates()
+        if differences:
+            print(f"Catalog snapshot aggregates differ for: {', '.join(sorted(differences))}, reading the movies again")
+            return None
+    return all_movies
+
+
+
+def save_snapshot(all_movies):
+    """Save all_movies with the current fingerprint, unless the snapshot is already up to date"""
+    movies_folder, _, _, _ = load.get_config()
+    fingerprint = get_fingerprint()
+    if fingerprint is None:
+        return False
+    snapshot_path = get_snapshot_path(movies_folder)
+
+    try:
+        with open(snapshot_path, "rb") as snapshot_file:
+            header = read_snapshot_header(snapshot_file)
+        if header is not None and header["fingerprint"] == fingerprint:
+            return True
+    except (OSError, pickle.UnpicklingError, EOFError):
+        pass
+
+    temporary_path = snapshot_path + ".tmp"
+    try:
+        header = {"version": SNAPSHOT_VERSION, "fingerprint": fingerprint, "settled": is_unscrapped_settled(all_movies)}
+        with open(temporary_path, "wb") as snapshot_file:
+            pickle.dump(header, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(all_movies, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, snapshot_path)
+        return True
+    except Exception as e:
+        print(f"Error writing catalog snapshot: {str(e)}")
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        return False
@@ -0,0 +1,525 @@
+import main, os, sqlite3
+from scripts import load, manifest, records, catalog, summary, partitions, mutations, writeback
+
+DATABASE_NAME = "movies.db"
+
+# Columns of the movies table besides main.HEADER, parsed once so range filters can use an index
+VALUE_COLUMNS = ("year_value", "duration_value", "rating_value", "duration_category", "name_key")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movies (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL, genre TEXT NOT NULL, year TEXT NOT NULL, duration TEXT NOT NULL,
+    rating TEXT NOT NULL, director TEXT NOT NULL, language TEXT NOT NULL,
+    year_value INTEGER, duration_value INTEGER, rating_value REAL,
+    duration_category TEXT, name_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS movies_genre ON movies (genre);
+CREATE INDEX IF NOT EXISTS movies_year ON movies (year_value);
+CREATE INDEX IF NOT EXISTS movies_duration ON movies (duration_value);
+CREATE INDEX IF NOT EXISTS movies_rating ON movies (rating_value);
+CREATE INDEX IF NOT EXISTS movies_director ON movies (director);
+CREATE INDEX IF NOT EXISTS movies_language ON movies (language);
+CREATE INDEX IF NOT EXISTS movies_key ON movies (name_key, genre, year, duration_category);
+"""
+
+# Storage instances by name, so the database connection is opened once
+_storages = {}
+
+
+
+def get_storage_name():
+    """Get the storage backend set in config.ini"""
+    return main.config.get("Config", "Storage", fallback="folder").strip().lower()
+
+
+
+def get_storage():
+    """Get the storage backend set in config.ini, folder (default) or sqlite"""
+    storage_name = get_storage_name()
+    if storage_name not in _storages:
+        if storage_name == "sqlite":
+            _storages[storage_name] = SQLiteStorage()
+        elif mutations.is_enabled():
+            _storages[storage_name] = LoggedFolderStorage()
+        else:
+            _storages[storage_name] = FolderStorage()
+    return _storages[storage_name]
+
+
+
+class FolderStorage:
+    """Movies stored as one CSV file per genre/year/duration category folder.
+
+    Added movies are appended to their file right away, or, when
+    Write_Buffer_Rows is above 1, wait in a writeback.WriteBuffer and are
+    appended to their files in groups; updates and deletes write the
+    buffer first.
+
+    Every backend has the same methods: load_movies, add_movie, add_movies,
+    flush, flush_if_due, update_movie, delete_movie, get_summaries,
+    get_lazy_catalog, get_fingerprint_files and export_tree. Mutations
+    print what they did and raise if the storage could not be written.
+    """
+
+    name = "folder"
+
+    def __init__(self):
+        self.write_buffer = None
+
+    def load_movies(self):
+        """Get every movie as a catalog.MovieCatalog"""
+        return load.read_folder_movies()
+
+    def add_movie(self, movie):
+        """Append a movie to the file of its category, or queue it if the write buffer is enabled"""
+        _, encoding, file_format, _ = load.get_config()
+        file_path, folder_path = load.get_movie_file_path(movie["genre"], movie["year"], movie["duration"], file_format)
+        if self.write_buffer is None and writeback.is_enabled():
+            self.write_buffer = writeback.WriteBuffer()
+        if self.write_buffer is not None:
+            self.write_buffer.add(file_path, load.clean_movie_data(movie))
+            return
+
+        os.makedirs(folder_path, exist_ok=True)
+        if load.append_to_csv_file(file_path, movie, encoding, main.HEADER):
+            print(f"Movie saved to: {file_path}")
+            load.update_manifest(added_rows={file_path: 1})
+
+    def add_movies(self, movies):
+        """Append several movies, grouped by the file of their category so every file is opened once.
+        Returns {file path: movies added}"""
+        # Keep the queued movies before the new ones
+        self.flush()
+        _, encoding, file_format, _ = load.get_config()
+        file_paths = {}
+        movies_by_file = {}
+        for movie in movies:
+            path_key = (movie["genre"], movie["year"], movie["duration"])
+            file_path = file_paths.get(path_key)
+            if file_path is None:
+                file_path = file_paths[path_key] = load.get_movie_file_path(*path_key, file_format)[0]
+            movies_by_file.setdefault(file_path, []).append(movie)
+
+        added_rows = {}
+        for file_path, file_movies in movies_by_file.items():
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if not load.append_rows_to_csv_file(file_path, file_movies, encoding, main.HEADER):
+                raise OSError(f"Could not append to {file_path}")
+            added_rows[file_path] = len(file_movies)
+        load.update_manifest(added_rows=added_rows)
+        return added_rows
+
+    def get_fingerprints(self):
+        """Get the set of catalog.get_movie_fingerprint of every stored and queued movie, reading the
+        partition rows without building a catalog"""
+        _, encoding, _, _ = load.get_config()
+        file_paths = [file_path for _, _, file_path in load.iter_partition_files()]
+        results, errors = load.read_partition_files(file_paths, encoding)
+        for file_path, error in errors.items():
+            print(f"Error reading {file_path}: {error}")
+        fingerprints = {tuple(str(value).strip() for value in row)
+                        for result in results if result is not None for row in result[0]}
+        if self.write_buffer is not None:
+            fingerprints.update(catalog.get_movie_fingerprint(movie) for movie in self.write_buffer.iter_pending())
+        return fingerprints
+
+    def flush(self):
+        """Write the queued movies, returning how many were written"""
+        return self.write_buffer.flush() if self.write_buffer is not None else 0
+
+    def flush_if_due(self):
+        """Write the queued movies if they have waited too long"""
+        return self.write_buffer.flush_if_due() if self.write_buffer is not None else 0
+
+    def update_movie(self, original_movie, new_movie):
+        """Replace a movie in the file of its category, moving it if its category changed"""
+        movies_folder, encoding, file_format, _ = load.get_config()
+        # The movie may still be queued
+        self.flush()
+
+        # Calculate old and new paths (in case category changed)
+        old_file_path, _ = load.get_movie_file_path(
+            original_movie["genre"],
+            original_movie["year"],
+            original_movie["duration"],
+            file_format
+        )
+        new_file_path, new_folder_path = load.get_movie_file_path(
+            new_movie["genre"],
+            new_movie["year"],
+            new_movie["duration"],
+            file_format
+        )
+
+        os.makedirs(new_folder_path, exist_ok=True)
+        file_rows = {}
+
+        if old_file_path == new_file_path:
+            # Same category: replace the movie in its own file
+            movie_found, file_rows[new_file_path] = load.replace_movie_in_file(new_file_path, encoding, original_movie, new_movie)
+            if movie_found:
+                print(f"Movie updated in: {new_file_path}")
+            else:
+                print(f"Movie added to: {new_file_path}")
+        else:
+            # Category changed: remove from the old file and add to the new one
+            movie_found, file_rows[old_file_path] = load.replace_movie_in_file(old_file_path, encoding, original_movie)
+            if movie_found:
+                print(f"Movie removed from: {old_file_path}")
+
+            file_existed = os.path.exists(new_file_path)
+            _, file_rows[new_file_path] = load.replace_movie_in_file(new_file_path, encoding, original_movie, new_movie)
+            if file_existed:
+                print(f"Movie added to: {new_file_path}")
+            else:
+                print(f"New file created with updated movie: {new_file_path}")
+        load.update_manifest(file_rows)
+
+        # Clean up only the files that changed and their folders
+        print("\nCleaning up empty files and folders...")
+        items_cleaned = sum(load.clean_partition_folders(file_path, movies_folder, encoding)
+                            for file_path in file_rows)
+        if items_cleaned > 0:
+            print(f"Cleaned up {items_cleaned} empty items")
+        else:
+            print("No empty items found to clean")
+
+    def delete_movie(self, movie):
+        """Remove a movie from the file of its category, returning if it was found"""
+        movies_folder, encoding, file_format, _ = load.get_config()
+        # The movie may still be queued
+        self.flush()
+
+        # Only the file of the movie's category can contain it
+        file_path, _ = load.get_movie_file_path(
+            movie["genre"],
+            movie["year"],
+            movie["duration"],
+            file_format
+        )
+        movie_removed, rows_left = load.replace_movie_in_file(file_path, encoding, movie)
+        load.update_manifest({file_path: rows_left})
+        if movie_removed:
+            print(f"Movie removed from: {file_path}")
+
+        # Clean up the movie's file and its folders
+        print("\nCleaning up empty files and folders...")
+        items_cleaned = load.clean_partition_folders(file_path, movies_folder, encoding)
+        if items_cleaned > 0:
+            print(f"Cleaned up {items_cleaned} empty items")
+        else:
+            print("No empty items found to clean")
+        return movie_removed
+
+    def get_summaries(self, genre=None, year_min=None, year_max=None):
+        """Get {genre: [summaries]} for a genre and year range from the summary sidecars and the queued movies"""
+        _, encoding, _, _ = load.get_config()
+        summaries_by_genre = {}
+        for genre_name, _, file_path in load.iter_partition_files(genre, year_min, year_max):
+            summaries_by_genre.setdefault(genre_name, []).append(load.get_partition_summary(file_path, encoding))
+
+        queued_by_genre = {}
+        for movie in (self.write_buffer.iter_pending() if self.write_buffer is not None else ()):
+            year = records.get_year(movie)
+            if ((genre is None or movie["genre"] == genre) and
+                    (year_min is None or year >= year_min) and (year_max is None or year <= year_max)):
+                queued_by_genre.setdefault(movie["genre"], []).append(movie)
+        for genre_name, movies in queued_by_genre.items():
+            summaries_by_genre.setdefault(genre_name, []).append(summary.build_summary(movies))
+        return summaries_by_genre
+
+    def get_lazy_catalog(self):
+        """Get a view that answers queries without loading every movie"""
+        return partitions.PartitionCatalog()
+
+    def get_fingerprint_files(self):
+        """Get (name, path) of every file the stored movies depend on, or None if they are unknown"""
+        movies_folder, _, _, _ = load.get_config()
+        movie_manifest = manifest.load_manifest(movies_folder)
+        if movie_manifest is None:
+            return None
+        return [(partition_key, manifest.get_partition_file_path(movies_folder, partition_key, entry))
+                for partition_key, entry in movie_manifest["partitions"].items()]
+
+    def export_tree(self):
+        """Write the movies in the folder layout; they are already stored that way"""
+        print("\nMovies are already stored in the folder layout")
+        return 0
+
+
+
+class LoggedFolderStorage(FolderStorage):
+    """Folder storage that appends adds, updates and deletes to the mutation log instead of
+    rewriting partition files. Loading replays the log over the partitions and
+    mutations.compact_log folds it back into them.
+    """
+
+    def load_movies(self):
+        """Get every movie as a catalog.MovieCatalog, with the logged changes applied"""
+        movies_folder, _, _, _ = load.get_config()
+        if os.path.exists(mutations.get_marker_path(movies_folder)):
+            mutations.finish_compaction()
+        return mutations.replay_mutations(load.read_folder_movies(), mutations.read_mutations())
+
+    def add_movie(self, movie):
+        """Log a new movie"""
+        print(f"Movie logged to: {mutations.append_mutation('add', movie)}")
+
+    def add_movies(self, movies):
+        """Log several new movies with one write"""
+        movies = list(movies)
+        log_path = mutations.append_records([{"op": "add", "movie": load.clean_movie_data(movie)} for movie in movies])
+        return {log_path: len(movies)}
+
+    def update_movie(self, original_movie, new_movie):
+        """Log the new values of a movie"""
+        print(f"Movie update logged to: {mutations.append_mutation('update', original_movie, new_movie)}")
+
+    def delete_movie(self, movie):
+        """Log a tombstone for a movie; it was found in the loaded movies, which include the logged ones"""
+        print(f"Movie deletion logged to: {mutations.append_mutation('delete', movie)}")
+        return True
+
+    def get_fingerprints(self):
+        """Get the set of catalog.get_movie_fingerprint of every movie, with the logged changes applied"""
+        if not mutations.read_mutations():
+            return super().get_fingerprints()
+        return {catalog.get_movie_fingerprint(movie) for movie in self.load_movies()}
+
+    def get_summaries(self, genre=None, year_min=None, year_max=None):
+        """Get {genre: [summaries]} for a genre and year range, from the loaded movies while the log has changes"""
+        if not mutations.read_mutations():
+            return super().get_summaries(genre, year_min, year_max)
+        movies_by_genre = {}
+        for movie in self.load_movies():
+            year = movie.year_value
+            if ((genre is None or movie.genre == genre) and
+                    (year_min is None or (year is not None and year >= year_min)) and
+                    (year_max is None or (year is not None and year <= year_max))):
+                movies_by_genre.setdefault(movie.genre, []).append(movie)
+        return {genre_name: [summary.build_summary(movies)] for genre_name, movies in movies_by_genre.items()}
+
+    def get_lazy_catalog(self):
+        """Get the lazy view of the partitions, or every movie while the log has changes the partitions lack"""
+        if not mutations.read_mutations():
+            return super().get_lazy_catalog()
+        return self.load_movies()
+
+    def get_fingerprint_files(self):
+        """Get (name, path) of every partition file and of the mutation log"""
+        file_paths = super().get_fingerprint_files()
+        if file_paths is not None:
+            movies_folder, _, _, _ = load.get_config()
+            file_paths.append(("mutations", mutations.get_log_path(movies_folder)))
+        return file_paths
+
+
+
+class SQLiteStorage:
+    """Movies stored in a SQLite database in the movies folder, with an index per filterable column.
+
+    The database is created the first time it is used, importing the movies
+    of the folder tree if there are any. Every mutation is one transaction,
+    query and search_text answer the filters of show_filtered_movies with
+    SQL and export_tree writes the folder layout on demand.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, database_path=None):
+        self.database_path = database_path
+        self.connection = None
+
+    def flush(self):
+        """Every mutation is already committed"""
+        return 0
+
+    def flush_if_due(self):
+        """Every mutation is already committed"""
+        return 0
+
+    def connect(self):
+        """Open the database, creating it from the folder tree if it does not exist"""
+        if self.connection is not None:
+            return self.connection
+        if self.database_path is None:
+            movies_folder, _, _, _ = load.get_config()
+            self.database_path = os.path.join(movies_folder, DATABASE_NAME)
+
+        database_exists = os.path.exists(self.database_path)
+        os.makedirs(os.path.dirname(self.database_path), exist_ok=True)
+        self.connection = sqlite3.connect(self.database_path)
+        self.connection.create_function("py_lower", 1, str.lower, deterministic=True)
+        self.connection.executescript(SCHEMA)
+        if not database_exists and next(load.iter_partition_files(), None) is not None:
+            folder_movies = load.read_folder_movies()
+            if folder_movies:
+                self.add_movies(folder_movies)
+                print(f"{len(folder_movies)} movies imported from the folder tree into {self.database_path}")
+        return self.connection
+
+    def get_row(self, movie):
+        """Get the values of every column of the movies table, in table order"""
+        movie = records.as_movie(movie)
+        return tuple(movie[field] for field in main.HEADER) + (
+            movie.year_value, movie.duration_value, movie.rating_value,
+            movie.duration_category, movie.name.strip().lower())
+
+    def select(self, where="", parameters=()):
+        """Get the movies that match a WHERE clause, in insertion order"""
+        rows = self.connect().execute(f"SELECT {', '.join(main.HEADER)} FROM movies {where} ORDER BY id", parameters)
+        return [records.Movie.from_values(row) for row in rows]
+
+    def load_movies(self):
+        """Get every movie as a catalog.MovieCatalog"""
+        return catalog.MovieCatalog(self.select())
+
+    def add_movies(self, movies):
+        """Insert several movies in one transaction. Returns {database path: movies added}"""
+        columns = main.HEADER + list(VALUE_COLUMNS)
+        with self.connect() as connection:
+            cursor = connection.executemany(f"INSERT INTO movies ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                (self.get_row(movie) for movie in movies))
+        return {self.database_path: cursor.rowcount}
+
+    def add_movie(self, movie):
+        """Insert a movie"""
+        self.add_movies([movie])
+        print(f"Movie saved to: {self.database_path}")
+
+    def find_movie_id(self, connection, movie):
+        """Get the id of the first row with exactly the fields of movie, or None"""
+        movie = records.as_movie(movie)
+        row = connection.execute(
+            "SELECT id FROM movies WHERE name_key = ? AND genre = ? AND year = ? AND duration_category IS ? AND "
+            + " AND ".join(f"{field} = ?" for field in main.HEADER) + " ORDER BY id LIMIT 1",
+            (movie.name.strip().lower(), movie.genre, movie.year, movie.duration_category)
+            + tuple(movie[field] for field in main.HEADER)).fetchone()
+        return row[0] if row else None
+
+    def update_movie(self, original_movie, new_movie):
+        """Replace a movie in one transaction, adding it if it is not stored"""
+        columns = main.HEADER + list(VALUE_COLUMNS)
+        with self.connect() as connection:
+            movie_id = self.find_movie_id(connection, original_movie)
+            if movie_id is None:
+                connection.execute(f"INSERT INTO movies ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                self.get_row(new_movie))
+                print(f"Movie added to: {self.database_path}")
+            else:
+                connection.execute(f"UPDATE movies SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                                self.get_row(new_movie) + (movie_id,))
+                print(f"Movie updated in: {self.database_path}")
+
+    def delete_movie(self, movie):
+        """Delete a movie in one transaction, returning if it was found"""
+        with self.connect() as connection:
+            movie_id = self.find_movie_id(connection, movie)
+            if movie_id is None:
+                return False
+            connection.execute("DELETE FROM movies WHERE id = ?", (movie_id,))
+        print(f"Movie removed from: {self.database_path}")
+        return True
+
+    def get_fingerprints(self):
+        """Get the set of catalog.get_movie_fingerprint of every stored movie"""
+        return {tuple(value.strip() for value in row)
+                for row in self.connect().execute(f"SELECT {', '.join(main.HEADER)} FROM movies")}
+
+    def find(self, name, genre, year, duration_category, partial=False):
+        """Find the first movie with a name (ignoring case), genre, year and duration category, using the key index,
+        or if partial and there is none, the first one whose name contains name"""
+        movies = self.select("WHERE name_key = ? AND genre = ? AND year = ? AND duration_category IS ?",
+                            (name.strip().lower(), genre, year, duration_category))
+        if not movies and partial and name:
+            movies = self.select("WHERE genre = ? AND year = ? AND duration_category IS ? AND instr(py_lower(name), ?) > 0",
+                                (genre, year, duration_category, name.lower()))
+        return movies[0] if movies else None
+
+    def query(self, **criteria):
+        """Get the movies that match every criterion, taking the same criteria as MovieCatalog.query.
+        Returns None if some movie has a value that is not a number in a range field"""
+        conditions = []
+        parameters = []
+        for field, value in criteria.items():
+            if field in catalog.VALUE_FIELDS:
+                conditions.append(f"{field} = ?")
+                parameters.append(value)
+            elif field in catalog.RANGE_FIELDS:
+                column = catalog.RANGE_FIELDS[field]
+                if self.connect().execute(f"SELECT 1 FROM movies WHERE {column} IS NULL LIMIT 1").fetchone():
+                    return None
+                conditions.append(f"{column} BETWEEN ? AND ?")
+                parameters.extend(value)
+            else:
+                raise ValueError(f"Field '{field}' cannot be queried")
+        return self.select(f"WHERE {' AND '.join(conditions)}" if conditions else "", parameters)
+
+    def search_text(self, field, text):
+        """Get the movies whose name or director contains text (ignoring case)"""
+        if field not in catalog.TEXT_FIELDS:
+            raise ValueError(f"Field '{field}' cannot be searched")
+        return self.select(f"WHERE instr(py_lower({field}), ?) > 0", (text.lower(),))
+
+    def __iter__(self):
+        return iter(self.select())
+
+    def __len__(self):
+        return self.connect().execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def __bool__(self):
+        return self.connect().execute("SELECT 1 FROM movies LIMIT 1").fetchone() is not None
+
+    def get_summaries(self, genre=None, year_min=None, year_max=None):
+        """Get {genre: [summary]} for a genre and year range, with an indexed query"""
+        conditions = []
+        parameters = []
+        if genre is not None:
+            conditions.append("genre = ?")
+            parameters.append(genre)
+        if year_min is not None:
+            conditions.append("year_value >= ?")
+            parameters.append(year_min)
+        if year_max is not None:
+            conditions.append("year_value <= ?")
+            parameters.append(year_max)
+
+        movies_by_genre = {}
+        for movie in self.select(f"WHERE {' AND '.join(conditions)}" if conditions else "", parameters):
+            movies_by_genre.setdefault(movie.genre, []).append(movie)
+        return {genre_name: [summary.build_summary(movies)] for genre_name, movies in movies_by_genre.items()}
+
+    def get_lazy_catalog(self):
+        """Get a view that answers queries without loading every movie"""
+        return self
+
+    def get_fingerprint_files(self):
+        """Get (name, path) of every file the stored movies depend on"""
+        self.connect()
+        return [("database", self.database_path)]
+
+    def export_tree(self):
+        """Write the stored movies in the folder layout, replacing the partition files there.
+        Returns the number of files written"""
+        movies_folder, encoding, file_format, _ = load.get_config()
+        movies_by_file = {}
+        for movie in self.select():
+            file_path, _ = load.get_movie_file_path(movie.genre, movie.year, movie.duration, file_format)
+            movies_by_file.setdefault(file_path, []).append(load.clean_movie_data(movie))
+
+        # Remove the partition files that have no movies anymore
+        for folder_path, _, file_names in os.walk(movies_folder):
+            file_path = os.path.join(folder_path, f"movies.{file_format}")
+            if f"movies.{file_format}" in file_names and file_path not in movies_by_file and load.is_partition_file(file_path):
+                load.remove_partition_file(file_path)
+
+        movie_manifest = manifest.new_manifest()
+        for file_path, movies in movies_by_file.items():
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if load.write_csv_file(file_path, movies, encoding, main.HEADER):
+                manifest.update_manifest_entry(movie_manifest, movies_folder, file_path, len(movies))
+        manifest.save_manifest(movies_folder, movie_manifest)
+        load.clean_movies_folder()
+        print(f"{len(movies_by_file)} files exported to {movies_folder}")
+        return len(movies_by_file)
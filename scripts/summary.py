@@ -0,0 +1,127 @@
+import os, json
+
+SUMMARY_NAME = "summary.json"
+
+
+
+def get_summary_path(file_path):
+    """Get the path of the summary sidecar of a partition file"""
+    return os.path.join(os.path.dirname(file_path), SUMMARY_NAME)
+
+
+
+def new_summary():
+    """Create an empty summary"""
+    return {
+        "rows": 0,
+        "duration_sum": 0,
+        "rating_sum": 0.0,
+        "rating_min": None,
+        "rating_max": None,
+        "rating_mean": None,
+        "directors": {},
+        "languages": {}
+    }
+
+
+
+def add_to_summary(summary, movie):
+    """Add one movie to a summary"""
+    return extend_summary(summary, (movie,))
+
+
+
+def extend_summary(summary, movies):
+    """Add several movies to a summary, keeping the running values in local variables"""
+    rows, duration_sum, rating_sum = summary["rows"], summary["duration_sum"], summary["rating_sum"]
+    rating_min, rating_max = summary["rating_min"], summary["rating_max"]
+    directors, languages = summary["directors"], summary["languages"]
+    for movie in movies:
+        rows += 1
+        try:
+            duration_sum += int(movie.get("duration", ""))
+        except (ValueError, TypeError):
+            pass
+        try:
+            rating = float(movie.get("rating", ""))
+        except (ValueError, TypeError):
+            pass
+        else:
+            rating_sum += rating
+            if rating_min is None or rating < rating_min:
+                rating_min = rating
+            if rating_max is None or rating > rating_max:
+                rating_max = rating
+        director = str(movie.get("director", "")).strip()
+        directors[director] = directors.get(director, 0) + 1
+        language = str(movie.get("language", "")).strip()
+        languages[language] = languages.get(language, 0) + 1
+
+    summary.update(rows=rows, duration_sum=duration_sum, rating_sum=rating_sum, rating_min=rating_min, rating_max=rating_max)
+    if rows:
+        summary["rating_mean"] = round(rating_sum / rows, 4)
+    return summary
+
+
+
+def build_summary(movies):
+    """Build the summary of a list of movies"""
+    return extend_summary(new_summary(), movies)
+
+
+
+def write_summary(file_path, summary):
+    """Write the summary sidecar of a partition file, recording the file size and mtime it describes"""
+    try:
+        stat_result = os.stat(file_path)
+        summary["size"] = stat_result.st_size
+        summary["mtime_ns"] = stat_result.st_mtime_ns
+        with open(get_summary_path(file_path), "w", encoding="utf-8") as file:
+            json.dump(summary, file)
+        return True
+    except Exception as e:
+        print(f"Error writing summary of {file_path}: {str(e)}")
+        return False
+
+
+
+def read_summary(file_path):
+    """Read the summary sidecar of a partition file, returning None if it is missing or out of date"""
+    try:
+        with open(get_summary_path(file_path), "r", encoding="utf-8") as file:
+            summary = json.load(file)
+        stat_result = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    if summary.get("size") != stat_result.st_size or summary.get("mtime_ns") != stat_result.st_mtime_ns:
+        return None
+    return summary
+
+
+
+def remove_summary(file_path):
+    """Remove the summary sidecar of a partition file if it exists"""
+    try:
+        os.remove(get_summary_path(file_path))
+    except FileNotFoundError:
+        pass
+
+
+
+def merge_summaries(summaries):
+    """Combine several summaries into one"""
+    total = new_summary()
+    for summary in summaries:
+        total["rows"] += summary["rows"]
+        total["duration_sum"] += summary["duration_sum"]
+        total["rating_sum"] += summary["rating_sum"]
+        for bound, pick in (("rating_min", min), ("rating_max", max)):
+            if summary[bound] is not None:
+                total[bound] = summary[bound] if total[bound] is None else pick(total[bound], summary[bound])
+        for histogram in ("directors", "languages"):
+            for value, amount in summary[histogram].items():
+                total[histogram][value] = total[histogram].get(value, 0) + amount
+    if total["rows"]:
+        total["rating_mean"] = round(total["rating_sum"] / total["rows"], 4)
+    return total
+
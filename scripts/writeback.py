@@ -0,0 +1,84 @@
+import main, os, time, atexit
+from scripts import load
+
+
+
+def get_buffer_config():
+    """Get how many added movies and how many seconds the write-back buffer holds before writing them"""
+    max_rows = main.config.getint("Config", "Write_Buffer_Rows", fallback=1)
+    max_seconds = main.config.getfloat("Config", "Write_Buffer_Seconds", fallback=60)
+    return max(max_rows, 1), max(max_seconds, 0)
+
+
+
+def is_enabled():
+    """Check if added movies are queued instead of written right away, as set in config.ini"""
+    max_rows, _ = get_buffer_config()
+    return max_rows > 1
+
+
+
+class WriteBuffer:
+    """Added movies waiting to be appended to their partition files.
+
+    Movies are grouped by partition file and each group is appended with
+    one open of the file when the buffer reaches max_rows movies, when its
+    oldest movie has waited max_seconds (checked by flush_if_due), and when
+    the interpreter exits.
+    """
+
+    def __init__(self, max_rows=None, max_seconds=None):
+        default_rows, default_seconds = get_buffer_config()
+        self.max_rows = max_rows if max_rows is not None else default_rows
+        self.max_seconds = max_seconds if max_seconds is not None else default_seconds
+        self.pending = {}  # partition file -> movies, in order of first add
+        self.pending_rows = 0
+        self.flushed_rows = 0
+        self.oldest_time = None
+        atexit.register(self.flush)
+
+    def add(self, file_path, movie):
+        """Queue a movie for its partition file, writing the buffer if it is full"""
+        self.pending.setdefault(file_path, []).append(movie)
+        self.pending_rows += 1
+        if self.oldest_time is None:
+            self.oldest_time = time.monotonic()
+        print(f"Movie queued for: {file_path} ({self.pending_rows} pending)")
+        if self.pending_rows >= self.max_rows:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Write the buffer if its oldest movie has waited longer than max_seconds"""
+        if self.oldest_time is not None and time.monotonic() - self.oldest_time >= self.max_seconds:
+            return self.flush()
+        return 0
+
+    def iter_pending(self):
+        """Yield the movies that are not written yet"""
+        for movies in self.pending.values():
+            yield from movies
+
+    def flush(self):
+        """Append every pending movie to its partition file, opening each file once. Returns how many were written"""
+        if not self.pending:
+            return 0
+        _, encoding, _, _ = load.get_config()
+        added_rows = {}
+        for file_path, movies in list(self.pending.items()):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            if not load.append_rows_to_csv_file(file_path, movies, encoding, main.HEADER):
+                # Keep the movies that could not be written for the next flush
+                continue
+            added_rows[file_path] = len(movies)
+            del self.pending[file_path]
+        load.update_manifest(added_rows=added_rows)
+
+        written_rows = sum(added_rows.values())
+        self.pending_rows -= written_rows
+        self.flushed_rows += written_rows
+        self.oldest_time = time.monotonic() if self.pending else None
+        print(f"Write buffer flushed: {written_rows} movies to {len(added_rows)} files "
+            f"({self.pending_rows} pending, {self.flushed_rows} flushed this session)")
+        return written_rows
@@ -0,0 +1,78 @@
+import os, csv, random, configparser
+import pytest
+import main
+from scripts import load, storage
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+
+def make_movies(amount, seed=0):
+    """Build valid movies with quoted, multi-line and non-ASCII values"""
+    generator = random.Random(seed)
+    movies = []
+    for index in range(amount):
+        name = f"Movie {index}"
+        if index % 7 == 0:
+            name += ', "the sequel"'
+        if index % 11 == 0:
+            name += "\nPart Two"
+        director = generator.choice(["Nolan", "Almodóvar", "Bong, Joon-ho", 'Sam "Raimi"', "Line\r\nBreak"])
+        movies.append({
+            "name": name,
+            "genre": generator.choice(main.GENRES),
+            "year": str(generator.randint(1990, 2009)),
+            "duration": str(generator.randint(60, 200)),
+            "rating": generator.choice([str(generator.randint(0, 10)), f"{generator.randint(0, 9)}.{generator.randint(0, 9)}"]),
+            "director": director,
+            "language": generator.choice(main.LANGUAGES)
+        })
+    return movies
+
+
+
+def get_rows(movies):
+    """Get the cleaned values of movies in main.HEADER order, sorted"""
+    return sorted(tuple(str(movie[field]).strip() for field in main.HEADER) for movie in movies)
+
+
+
+def write_unscrapped(movies):
+    """Write movies to the unscrapped file of the current tree"""
+    _, encoding, _, path_movies_unscrapped = load.get_config()
+    with open(path_movies_unscrapped, "w", encoding=encoding, newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=main.HEADER)
+        writer.writeheader()
+        writer.writerows(movies)
+
+
+
+def read_tree():
+    """Get {relative path: bytes} of every partition file of the current tree"""
+    movies_folder, _, _, _ = load.get_config()
+    tree = {}
+    for folder_path, _, file_names in os.walk(movies_folder):
+        for file_name in file_names:
+            if file_name.startswith("movies."):
+                file_path = os.path.join(folder_path, file_name)
+                with open(file_path, "rb") as file:
+                    tree[os.path.relpath(file_path, movies_folder)] = file.read()
+    return tree
+
+
+
+@pytest.fixture
+def use_tree(tmp_path, monkeypatch):
+    """Get a function that switches to an empty movies tree under tmp_path with config.ini values overridden"""
+    def switch(name="tree", **values):
+        tree_path = tmp_path / name
+        tree_path.mkdir(exist_ok=True)
+        monkeypatch.chdir(tree_path)
+        config = configparser.ConfigParser()
+        config.read(os.path.join(REPO_FOLDER, "config.ini"), encoding="utf-8-sig")
+        for option, value in values.items():
+            config["Config"][option] = str(value)
+        monkeypatch.setattr(main, "config", config)
+        monkeypatch.setattr(storage, "_storages", {})
+        return tree_path
+    return switch
@@ -0,0 +1,74 @@
+import os
+import pytest
+import main
+from scripts import binary, load, summary
+from tests.conftest import make_movies, read_tree, write_unscrapped
+
+# Values the columns cannot hold exactly, kept verbatim in the raw heap entry
+ODD_MOVIES = [
+    ("Zero padded", "Drama", "0999", "090", "7", "Nobody", "English"),
+    ("Too long", "Action", "2001", "70000", "10.0", "Some One", "Korean"),
+    ("Out of the lists", "Noir", "1999", "100", "8.25", "Some One", "Klingon"),
+    ("Not numbers", "Comedy", "soon", "long", "great", "Some One", "French"),
+    ("Empty", "Western", "", "", "", "", "Spanish"),
+]
+
+
+
+def test_encode_decode_round_trip(tmp_path):
+    """Every row read back from a binary partition is the row that was written"""
+    rows = [tuple(movie[field] for field in main.HEADER) for movie in make_movies(300)] + ODD_MOVIES
+    file_path = str(tmp_path / "movies.bin")
+    binary.write_movies(file_path, rows)
+    
+    assert binary.read_rows(file_path) == rows
+    with binary.BinaryPartition(file_path) as partition:
+        assert len(partition) == len(rows)
+        assert [partition.get_row(index) for index in range(len(rows))] == rows
+
+
+
+def test_ascii_round_trip(tmp_path):
+    """Rows of an ASCII-only heap are decoded without going through bytes"""
+    movies = [movie for movie in make_movies(200) if movie["director"].isascii()]
+    file_path = str(tmp_path / "movies.bin")
+    binary.write_movies(file_path, movies)
+    
+    assert binary.read_rows(file_path) == [tuple(movie[field] for field in main.HEADER) for movie in movies]
+
+
+
+def test_summary_and_query_match_the_rows(tmp_path):
+    """The mapped columns give the same summary and query answers as the decoded rows"""
+    movies = make_movies(300)
+    file_path = str(tmp_path / "movies.bin")
+    binary.write_movies(file_path, movies)
+    
+    expected_summary = summary.build_summary(movies)
+    with binary.BinaryPartition(file_path) as partition:
+        file_summary = partition.get_summary()
+        indexes = partition.query_indexes(genre="Drama", year=(1970, 1990), rating=(5.0, 8.5))
+    # The tenths are summed as integers, so the sum can differ in the last bit
+    assert file_summary.pop("rating_sum") == pytest.approx(expected_summary.pop("rating_sum"))
+    assert file_summary == expected_summary
+    assert indexes == [index for index, movie in enumerate(movies) if movie["genre"] == "Drama" and
+                    1970 <= int(movie["year"]) <= 1990 and 5.0 <= float(movie["rating"]) <= 8.5]
+
+
+
+def test_convert_tree_to_binary_and_back(use_tree):
+    """Converting the partitions to binary and back to CSV gives the same files"""
+    use_tree()
+    write_unscrapped(make_movies(500))
+    load.ingest_movies()
+    csv_tree = read_tree()
+    movies = sorted(map(tuple, load.get_all_movies()))
+    
+    use_tree(Partition_Format="binary")
+    assert load.convert_partitions() == len(csv_tree)
+    assert all(os.path.basename(file_path) == "movies.bin" for file_path in read_tree())
+    assert sorted(map(tuple, load.get_all_movies())) == movies
+    
+    use_tree(Partition_Format="csv")
+    assert load.convert_partitions() == len(csv_tree)
+    assert read_tree() == csv_tree
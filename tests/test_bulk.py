@@ -0,0 +1,105 @@
+import itertools
+import pytest
+import main
+from scripts import load, catalog
+from tests.conftest import get_rows, make_movies, write_unscrapped
+
+# Values that fail one rule of validate_movie_fields, or that pass it in a form is_plainly_valid leaves to it
+ODD_VALUES = {
+    "name": ["", " "],
+    "genre": ["drama", "Unknown"],
+    "year": ["0", "-5", "19x9", "２０００", "0010", "1999.0"],
+    "duration": ["0", "abc", "90.5", " 95 "],
+    "rating": ["-1", "7.25", "seven", "10", "7.", ".5", "1e1", "nan", "inf", "8.0"],
+    "director": ["", "\n"],
+    "language": ["english", ""]
+}
+
+
+
+def make_rows(seed=0):
+    """Build valid, invalid, duplicated and repeated movies as dictionaries, tuples and short rows"""
+    valid_movies = make_movies(300, seed=seed)
+    rows = []
+    for index, movie in enumerate(valid_movies):
+        if index % 3 == 0:
+            rows.append(movie)
+        elif index % 3 == 1:
+            rows.append(tuple(movie[field] for field in main.HEADER))
+        else:
+            rows.append([f" {movie[field]} " for field in main.HEADER])
+    odd_values = ((field, value) for field, values in ODD_VALUES.items() for value in values)
+    for (field, value), movie in zip(odd_values, itertools.cycle(make_movies(50, seed=seed + 1))):
+        rows.append(dict(movie, **{field: value}))
+    rows.extend(valid_movies[:20])
+    rows.append(tuple(valid_movies[0][field] for field in main.HEADER[:5]))
+    rows.append((valid_movies[1]["name"], valid_movies[1]["genre"], 2001, 95, 7.5, "Nolan", "English"))
+    return rows
+
+
+
+def check_by_validation(rows, known_fingerprints):
+    """Sort rows into accepted, duplicates and rejected with validate_movie_fields, one row at a time"""
+    report = {"accepted": [], "duplicates": [], "rejected": []}
+    seen_fingerprints = set(known_fingerprints)
+    for row_number, row in enumerate(rows, 1):
+        if hasattr(row, "get"):
+            movie = load.clean_movie_data(row)
+        else:
+            row = list(row) + [""] * (len(main.HEADER) - len(row))
+            movie = {field: str(value).strip() for field, value in zip(main.HEADER, row)}
+        validation_result = load.validate_movie_fields(movie)
+        if validation_result != True:
+            report["rejected"].append({"row": row_number, "movie": movie, "error": validation_result})
+        elif catalog.get_movie_fingerprint(movie) in seen_fingerprints:
+            report["duplicates"].append(movie)
+        else:
+            seen_fingerprints.add(catalog.get_movie_fingerprint(movie))
+            report["accepted"].append(movie)
+    return report
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree. Returns the movies"""
+    use_tree()
+    movies = make_movies(100, seed=5)
+    write_unscrapped(movies)
+    load.ingest_movies()
+    return movies
+
+
+
+def test_report_matches_validation(movies):
+    """Rows are accepted, rejected and found duplicated like validate_movie_fields and the stored movies say"""
+    rows = make_rows() + [dict(movie, name=f"  {movie['name']}  ") for movie in movies[:10]]
+    expected_report = check_by_validation(rows, map(catalog.get_movie_fingerprint, movies))
+    report = load.bulk_add_movies(rows)
+    assert report == expected_report
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + expected_report["accepted"])
+
+
+
+def test_catalog_is_extended(movies):
+    """With all_movies given, duplicates are checked against it and the accepted movies are added to it"""
+    all_movies = load.get_all_movies()
+    rows = make_rows(seed=3)
+    expected_report = check_by_validation(rows, map(catalog.get_movie_fingerprint, all_movies))
+    report = load.bulk_add_movies(rows, all_movies)
+    assert report == expected_report
+    assert get_rows(all_movies) == get_rows(movies + expected_report["accepted"])
+    assert get_rows(all_movies.query(genre="Drama")) == get_rows(
+        movie for movie in movies + expected_report["accepted"] if movie["genre"] == "Drama")
+
+
+
+def test_quick_check_agrees_with_validation():
+    """is_plainly_valid never passes a movie that validate_movie_fields rejects"""
+    genres, languages = set(main.GENRES), set(main.LANGUAGES)
+    for movie in make_movies(50):
+        for field, values in ODD_VALUES.items():
+            for value in values:
+                values_in_order = tuple(str(value if name == field else movie[name]).strip() for name in main.HEADER)
+                if load.is_plainly_valid(values_in_order, genres, languages):
+                    assert load.validate_movie_fields(dict(zip(main.HEADER, values_in_order))) == True
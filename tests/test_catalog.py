@@ -0,0 +1,124 @@
+import main
+from scripts import catalog
+from tests.conftest import make_movies
+
+
+
+def get_key(movie):
+    """Get the (lowercased name, genre, year, duration category) of a movie"""
+    return (movie["name"].strip().lower(), movie["genre"], movie["year"], main.get_duration_category(movie["duration"]))
+
+
+
+def find_by_scan(movies, name, genre, year, duration_category):
+    """Find the first movie with a key by looking at every movie"""
+    return next((movie for movie in movies if get_key(movie) == (name.strip().lower(), genre, year, duration_category)), None)
+
+
+
+def change_catalog(all_movies):
+    """Add, remove and edit movies of a catalog in place. Returns the removed movies and the previous values of the edited ones"""
+    for movie in make_movies(30, seed=1):
+        all_movies.append(dict(movie, name=movie["name"] + " (new)"))
+    removed_movies = list(all_movies[10:40:3])
+    for movie in removed_movies:
+        all_movies.remove(movie)
+    previous_movies = []
+    for movie in all_movies[50:80:3]:
+        previous_movie = movie.copy()
+        previous_movies.append(previous_movie)
+        movie["name"] = movie["name"] + " (renamed)"
+        movie["genre"] = "War"
+        movie["duration"] = "95"
+        all_movies.reindex(movie, previous_movie)
+    return removed_movies, previous_movies
+
+
+
+def test_find_matches_scan():
+    """Every movie is found by its key, whatever the case of its name"""
+    movies = make_movies(500)
+    all_movies = catalog.MovieCatalog(movies)
+    for movie in movies:
+        name, genre, year, duration_category = get_key(movie)
+        assert all_movies.find(name.upper(), genre, year, duration_category) == movie
+    assert all_movies.find("Missing", "Drama", "2000", "short") is None
+
+
+
+def test_find_after_changes():
+    """The key index follows appended, removed and edited movies"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    removed_movies, previous_movies = change_catalog(all_movies)
+    
+    for movie in all_movies:
+        assert all_movies.find(*get_key(movie)) is find_by_scan(all_movies, *get_key(movie))
+    for movie in removed_movies + previous_movies:
+        assert all_movies.find(*get_key(movie)) is None
+
+
+
+def query_by_scan(movies, **criteria):
+    """Get the movies that match every criterion by looking at every movie"""
+    parse = {"year": int, "duration": int, "rating": float}
+    return [movie for movie in movies if all(
+        movie[field] == value if field not in parse else value[0] <= parse[field](movie[field]) <= value[1]
+        for field, value in criteria.items())]
+
+
+
+def test_query_matches_scan():
+    """The hash and sorted indexes give the movies a scan gives, in catalog order"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    change_catalog(all_movies)
+    for criteria in ({}, {"genre": "Drama"}, {"language": "Korean"}, {"year": (1995, 2000)},
+                    {"duration": (90, 120)}, {"rating": (5.0, 8.5)}, {"genre": "War", "duration": (95, 95)},
+                    {"genre": "Drama", "year": (2000, 2009), "rating": (7.0, 10.0)}, {"genre": "Noir"}):
+        assert list(map(id, all_movies.query(**criteria))) == list(map(id, query_by_scan(all_movies, **criteria)))
+
+
+
+def test_query_with_values_that_are_not_numbers():
+    """A range that some movie cannot be compared with is not answered; the other fields are"""
+    movies = make_movies(50)
+    all_movies = catalog.MovieCatalog(movies + [dict(movies[0], name="Soon", year="soon")])
+    assert all_movies.query(year=(1990, 2009)) is None
+    assert len(all_movies.query(genre=movies[0]["genre"])) == len(query_by_scan(all_movies, genre=movies[0]["genre"]))
+
+
+
+def test_search_text_matches_scan():
+    """The trigram index finds the movies whose name or director contains a text, in catalog order"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    all_movies.search_text("name", "movie")
+    change_catalog(all_movies)
+    for field, text in (("name", "movie 1"), ("name", "SEQUEL"), ("name", "\npart"), ("name", "zz"),
+                        ("name", "(renamed)"), ("director", "on"), ("director", "Ó"), ("director", "")):
+        expected_movies = [movie for movie in all_movies if text.lower() in movie[field].lower()]
+        assert list(map(id, all_movies.search_text(field, text))) == list(map(id, expected_movies))
+
+
+
+def test_aggregates_follow_changes():
+    """The per-genre counts and duration sums match a recompute after adds, removes and edits"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    change_catalog(all_movies)
+    assert all_movies.check_aggregates() == []
+    
+    genre_durations = {}
+    for movie in all_movies:
+        duration_sum, amount = genre_durations.get(movie["genre"], (0, 0))
+        genre_durations[movie["genre"]] = (duration_sum + int(movie["duration"]), amount + 1)
+    assert all_movies.get_genre_amounts() == {genre: genre_durations.get(genre, (0, 0))[1] for genre in main.GENRES}
+    assert all_movies.get_total_duration() == sum(int(movie["duration"]) for movie in all_movies)
+    assert list(all_movies.get_genre_durations().items()) == list(genre_durations.items())
+
+
+
+def test_check_aggregates_finds_differences():
+    """check_aggregates reports the genres whose aggregates are wrong"""
+    all_movies = catalog.MovieCatalog(make_movies(100))
+    genre = all_movies[0]["genre"]
+    all_movies.genre_aggregates[genre]["amount"] += 1
+    all_movies.total_duration += 1
+    assert sorted(all_movies.check_aggregates()) == sorted([genre, "total"])
@@ -0,0 +1,54 @@
+import os
+import main
+from scripts import load
+from tests.conftest import make_movies, write_unscrapped
+
+
+
+def categorize_by_scan(movies, stored_movies):
+    """Split the valid movies into the movies of every category and the duplicates, comparing every
+    new movie with every stored and accepted movie of its category like the original categorize_movies"""
+    movies_by_category = {}
+    for movie in movies:
+        movie = load.clean_movie_data(movie)
+        if all(movie.values()) and load.validate_movie_fields(movie) == True:
+            category_key = (movie["genre"], movie["year"], main.get_duration_category(movie["duration"]))
+            movies_by_category.setdefault(category_key, []).append(movie)
+    
+    category_movies = {}
+    duplicate_movies = []
+    for category_key, movies in movies_by_category.items():
+        kept_movies = list(stored_movies.get(category_key, []))
+        for movie in movies:
+            if any(load.movies_are_identical(movie, kept_movie) for kept_movie in kept_movies):
+                duplicate_movies.append(movie)
+            else:
+                kept_movies.append(movie)
+        category_movies[category_key] = kept_movies
+    return category_movies, duplicate_movies
+
+
+
+def test_duplicates_match_pairwise_comparison(use_tree):
+    """Fingerprint sets skip the same movies as comparing every pair, and write back the same rows"""
+    use_tree()
+    _, encoding, file_format, path_movies_unscrapped = load.get_config()
+    movies = make_movies(600)
+    write_unscrapped(movies[:300])
+    load.categorize_movies()
+    stored_movies, _ = categorize_by_scan(movies[:300], {})
+    
+    invalid_movie = dict(movies[0], genre="Noir")
+    padded_movies = [{field: f"  {value} " for field, value in movie.items()} for movie in movies[:300:10]]
+    case_movies = [dict(movie, name=movie["name"].upper()) for movie in movies[300:600:10]]
+    new_movies = movies[300:] + padded_movies + movies[450:500] + case_movies + [invalid_movie]
+    write_unscrapped(new_movies)
+    stats = load.categorize_movies()
+    category_movies, duplicate_movies = categorize_by_scan(new_movies, stored_movies)
+    
+    assert stats["duplicate_movies_skipped"] == len(duplicate_movies) == 30 + 50
+    assert stats["validation_errors"] == 1
+    assert load.read_csv_file(path_movies_unscrapped, encoding) == [load.clean_movie_data(invalid_movie)] + duplicate_movies
+    for (genre, year, _), kept_movies in category_movies.items():
+        file_path, _ = load.get_movie_file_path(genre, year, kept_movies[0]["duration"], file_format)
+        assert load.read_csv_file(file_path, encoding) == kept_movies
@@ -0,0 +1,55 @@
+import pytest
+import main
+from scripts import catalog, columnar
+from tests.conftest import make_movies
+
+numpy = pytest.importorskip("numpy")
+
+
+
+def test_query_matches_scan():
+    """The boolean masks select the movies a scan selects, in catalog order"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    parse = {"year": int, "duration": int, "rating": float}
+    for criteria in ({"genre": "Drama"}, {"language": "Korean"}, {"year": (1995, 2000)}, {"duration": (90, 120)},
+                    {"rating": (5.0, 8.5)}, {"genre": "Drama", "year": (2000, 2009), "rating": (7.0, 10.0)}):
+        expected_movies = [movie for movie in all_movies if all(
+            movie[field] == value if field not in parse else value[0] <= parse[field](movie[field]) <= value[1]
+            for field, value in criteria.items())]
+        assert list(map(id, columnar.query_movies(all_movies, **criteria))) == list(map(id, expected_movies))
+
+
+
+def test_statistics_match_loops():
+    """The genre counts, total duration and durations by genre match plain loops"""
+    all_movies = catalog.MovieCatalog(make_movies(500))
+    genre_durations = {}
+    for movie in all_movies:
+        duration_sum, amount = genre_durations.get(movie["genre"], (0, 0))
+        genre_durations[movie["genre"]] = (duration_sum + int(movie["duration"]), amount + 1)
+    assert columnar.count_by_genre(all_movies) == {genre: genre_durations.get(genre, (0, 0))[1] for genre in main.GENRES}
+    assert columnar.total_duration(all_movies) == sum(int(movie["duration"]) for movie in all_movies)
+    assert list(columnar.duration_by_genre(all_movies).items()) == list(genre_durations.items())
+
+
+
+def test_snapshot_follows_the_catalog():
+    """The cached columns are built again after the catalog changes"""
+    movies = make_movies(100)
+    all_movies = catalog.MovieCatalog(movies[:50])
+    assert columnar.total_duration(all_movies) == sum(int(movie["duration"]) for movie in movies[:50])
+    all_movies.append(movies[50])
+    all_movies.remove(all_movies[0])
+    assert columnar.total_duration(all_movies) == sum(int(movie["duration"]) for movie in movies[1:51])
+
+
+
+def test_values_outside_the_columns():
+    """Columns holding a value that is not a number or not in the lists do not answer what they cannot"""
+    movies = make_movies(50)
+    all_movies = catalog.MovieCatalog(movies + [dict(movies[0], name="Soon", duration="long", language="Klingon")])
+    assert columnar.query_movies(all_movies, duration=(60, 200)) is None
+    assert columnar.query_movies(all_movies, language="Korean") is None
+    assert columnar.total_duration(all_movies) is None
+    assert sum(amount for _, amount in columnar.duration_by_genre(all_movies).values()) == 50
+    assert columnar.query_movies([dict(movie) for movie in movies], genre="Drama") is None
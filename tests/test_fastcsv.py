@@ -0,0 +1,43 @@
+import csv, io
+import pytest
+import main
+from scripts import fastcsv
+
+HEADER_LINE = ",".join(main.HEADER)
+
+TEXTS = [
+    HEADER_LINE + "\nHeat,Crime,1995,170,8.3,Michael Mann,English\n",
+    HEADER_LINE + "\r\nHeat,Crime,1995,170,8.3,Michael Mann,English\r\nUp,Comedy,2009,96,8.2,Pete Docter,English\r\n",
+    HEADER_LINE + '\n"Heat, the movie",Crime,1995,170,8.3,"Michael ""The"" Mann",English\n',
+    HEADER_LINE + '\n"Two\nlines",Crime,1995,170,8.3,"Three\r\nlines\nhere",English\nUp,Comedy,2009,96,8.2,Pete Docter,English\n',
+    HEADER_LINE + "\rHeat,Crime,1995,170,8.3,Michael Mann,English\r",
+    HEADER_LINE + "\n\nShort,Drama,2001\n\nLong,Drama,2001,100,7,Someone,French,extra,values\n",
+    "language,name,genre,year,duration,rating,director\nEnglish,Heat,Crime,1995,170,8.3,Michael Mann\n",
+    "name,year,genre,extra\nHeat,1995,Crime,x\nShort\n",
+    "name,name,genre,year,duration,rating,director,language\nFirst,Second,Crime,1995,170,8.3,Mann,English\n",
+    "",
+    HEADER_LINE + "\n",
+]
+
+
+
+def read_with_dict_reader(text):
+    """Read a CSV text with csv.DictReader, as tuples of main.HEADER values"""
+    return [tuple(row.get(field, "") for field in main.HEADER) for row in csv.DictReader(io.StringIO(text, newline=""))]
+
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_parse_text_matches_dict_reader(text):
+    """The specialized parser gives the rows csv.DictReader gives"""
+    assert fastcsv.parse_text(text, main.HEADER) == read_with_dict_reader(text)
+    assert list(fastcsv.iter_rows(io.StringIO(text, newline=""), main.HEADER)) == read_with_dict_reader(text)
+
+
+
+@pytest.mark.parametrize("text", TEXTS[:4])
+def test_read_rows_matches_dict_reader(tmp_path, text):
+    """Reading a file gives the rows csv.DictReader gives"""
+    file_path = tmp_path / "movies.csv"
+    file_path.write_text(text, encoding="utf-8", newline="")
+    assert fastcsv.read_rows(str(file_path), "utf-8", main.HEADER) == read_with_dict_reader(text)
@@ -0,0 +1,89 @@
+import os, mmap
+import pytest
+from scripts import load
+from tests.conftest import make_movies, read_tree, write_unscrapped
+
+# Rows the validation rejects, between the valid ones
+INVALID_MOVIES = [
+    {"name": "No genre", "genre": "Noir", "year": "2001", "duration": "100", "rating": "7", "director": "A, B", "language": "English"},
+    {"name": 'Quoted "year"\nand two lines', "genre": "Drama", "year": "soon", "duration": "100", "rating": "7", "director": "C", "language": "French"},
+    {"name": "Empty director", "genre": "Drama", "year": "2001", "duration": "100", "rating": "7", "director": "", "language": "French"},
+]
+
+
+
+def get_unscrapped_movies():
+    """Get valid movies with quoted multi-line values, the invalid movies and repeated movies"""
+    movies = make_movies(3000)
+    for index, movie in enumerate(INVALID_MOVIES):
+        movies.insert(index * 1000 + 500, movie)
+    return movies + movies[100:150]
+
+
+
+def ingest():
+    """Ingest part of the movies with the memory mode, then all of them with the mode set in the config.
+    Returns the stats of the second ingest, the partition files and the unscrapped file"""
+    _, _, _, path_movies_unscrapped = load.get_config()
+    movies = get_unscrapped_movies()
+    write_unscrapped(movies[:1000])
+    load.categorize_movies()
+    write_unscrapped(movies)
+    stats = load.ingest_movies()
+    with open(path_movies_unscrapped, "rb") as file:
+        return stats, read_tree(), file.read()
+
+
+
+def test_chunks_match_sequential_rows(use_tree):
+    """Parsing the unscrapped file in chunks split inside quoted fields gives the rows a sequential read gives"""
+    use_tree()
+    _, encoding, _, path_movies_unscrapped = load.get_config()
+    write_unscrapped(get_unscrapped_movies())
+    
+    sequential_invalid = []
+    rows = load.iter_csv_rows(path_movies_unscrapped, encoding)
+    sequential = list(load.iter_categorized_movies(load.iter_valid_movies(load.iter_clean_movies(rows), sequential_invalid.append)))
+    
+    chunk_encoding = load.get_chunk_encoding(encoding)
+    with open(path_movies_unscrapped, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            header, chunks = load.get_unscrapped_chunks(mapped, chunk_encoding, 64, min_chunk_size=1)
+    assert len(chunks) == 64
+    chunked = []
+    chunked_invalid = []
+    for start, end in chunks:
+        categorized_movies, invalid_movies = load.parse_unscrapped_chunk(path_movies_unscrapped, start, end, chunk_encoding, header)
+        chunked += categorized_movies
+        chunked_invalid += invalid_movies
+    
+    assert chunked == sequential
+    assert chunked_invalid == sequential_invalid == INVALID_MOVIES
+
+
+
+@pytest.mark.parametrize("mode", ["streaming", "parallel"])
+def test_ingest_matches_memory_mode(use_tree, monkeypatch, mode):
+    """Ingesting with the streaming or the parallel mode writes the files the memory mode writes"""
+    use_tree("memory", Ingest_Mode="memory")
+    expected = ingest()
+    
+    use_tree(mode, Ingest_Mode=mode, Workers=2, Buffer_Size=100)
+    # Split the file into several chunks so some of them start inside a quoted field
+    monkeypatch.setattr(load.iter_unscrapped_parallel, "__defaults__", (4096,))
+    stats, tree, unscrapped = ingest()
+    
+    assert tree == expected[1]
+    assert unscrapped == expected[2]
+    assert stats == expected[0]
+
+
+
+@pytest.mark.parametrize("mode", ["memory", "streaming", "parallel"])
+def test_missing_unscrapped_file(use_tree, mode):
+    """Every mode reports a missing unscrapped file without creating it"""
+    use_tree(Ingest_Mode=mode, Workers=2)
+    _, _, _, path_movies_unscrapped = load.get_config()
+    assert load.ingest_movies() == {"error": f"CSV file not found: {path_movies_unscrapped}"}
+    assert not os.path.exists(path_movies_unscrapped)
+    assert read_tree() == {}
@@ -0,0 +1,96 @@
+import os
+import pytest
+import main
+from scripts import load, manifest, storage
+from tests.conftest import get_rows, make_movies, read_tree, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree and load them once, which saves the manifest. Returns the movies"""
+    use_tree()
+    movies = make_movies(500)
+    write_unscrapped(movies)
+    load.categorize_movies()
+    load.get_all_movies()
+    return movies
+
+
+
+def test_manifest_lists_every_partition(movies):
+    """The manifest has one entry per partition file with its row count"""
+    movies_folder, encoding, _, _ = load.get_config()
+    movie_manifest = manifest.load_manifest(movies_folder)
+    assert len(movie_manifest["partitions"]) == len(read_tree())
+    for partition_key, entry in movie_manifest["partitions"].items():
+        file_path = manifest.get_partition_file_path(movies_folder, partition_key, entry)
+        assert entry["rows"] == len(load.read_csv_file(file_path, encoding))
+
+
+
+def test_manifest_load_does_not_walk_the_tree(movies, monkeypatch):
+    """With an up to date manifest the movies are read without scanning the movies folder"""
+    def scan_all_movies(movies_folder, encoding):
+        raise AssertionError("The movies folder was scanned")
+    monkeypatch.setattr(load, "scan_all_movies", scan_all_movies)
+    assert get_rows(load.get_all_movies()) == get_rows(movies)
+
+
+
+def test_changed_partition_is_read_again(movies):
+    """A partition file changed without the manifest is noticed and the manifest rebuilt"""
+    movies_folder, encoding, file_format, _ = load.get_config()
+    new_movie = dict(movies[0], name="Added behind the manifest")
+    file_path, _ = load.get_movie_file_path(new_movie["genre"], new_movie["year"], new_movie["duration"], file_format)
+    load.append_to_csv_file(file_path, new_movie, encoding, main.HEADER)
+    
+    assert get_rows(load.get_all_movies()) == get_rows(movies + [new_movie])
+    entry = manifest.load_manifest(movies_folder)["partitions"][manifest.get_partition_key(movies_folder, file_path)]
+    assert entry["rows"] == len(load.read_csv_file(file_path, encoding))
+
+
+
+def test_removed_partition_leaves_the_manifest(movies):
+    """Deleting the last movie of a partition drops the partition from the manifest"""
+    movies_folder, encoding, _, _ = load.get_config()
+    movie_manifest = manifest.load_manifest(movies_folder)
+    partition_key, entry = next((partition_key, entry) for partition_key, entry in movie_manifest["partitions"].items()
+                                if entry["rows"] == 1)
+    file_path = manifest.get_partition_file_path(movies_folder, partition_key, entry)
+    storage.get_storage().delete_movie(load.read_csv_file(file_path, encoding)[0])
+    
+    assert not os.path.exists(file_path)
+    assert partition_key not in manifest.load_manifest(movies_folder)["partitions"]
+
+
+
+def test_cleaned_partition_leaves_the_manifest(movies):
+    """Removing an empty partition file with the maintenance command drops it from the manifest"""
+    movies_folder, encoding, _, _ = load.get_config()
+    partition_key, entry = next(iter(manifest.load_manifest(movies_folder)["partitions"].items()))
+    file_path = manifest.get_partition_file_path(movies_folder, partition_key, entry)
+    load.write_csv_file(file_path, [], encoding, main.HEADER)
+    load.clean_movies_folder()
+    
+    assert not os.path.exists(file_path)
+    assert partition_key not in manifest.load_manifest(movies_folder)["partitions"]
+
+
+
+def test_missing_manifest_is_saved_from_one_walk(movies, monkeypatch):
+    """Without a manifest the tree is walked once and the manifest saved from that walk"""
+    movies_folder, _, _, _ = load.get_config()
+    expected_partitions = manifest.load_manifest(movies_folder)["partitions"]
+    os.remove(manifest.get_manifest_path(movies_folder))
+    walked_folders = []
+    walk = os.walk
+    
+    def walk_and_count(folder):
+        walked_folders.append(folder)
+        return walk(folder)
+    monkeypatch.setattr(load.os, "walk", walk_and_count)
+    load.convert_partitions()
+    load.convert_partitions()
+    assert walked_folders == [movies_folder]
+    assert manifest.load_manifest(movies_folder)["partitions"] == expected_partitions
@@ -0,0 +1,107 @@
+import os
+import pytest
+from scripts import load, storage, mutations, catalog
+from tests.conftest import make_movies, read_tree, write_unscrapped
+
+
+
+def apply_changes(movie_storage, movies):
+    """Add, update (in place and across partitions) and delete movies through a storage"""
+    new_movies = make_movies(20, seed=1)
+    for movie in new_movies[:10]:
+        movie_storage.add_movie(movie)
+    movie_storage.add_movies(new_movies[10:])
+    
+    updated_movie = dict(movies[0], rating="9.9")
+    movie_storage.update_movie(movies[0], updated_movie)
+    moved_movie = dict(movies[1], year="1901", duration="250")
+    movie_storage.update_movie(movies[1], moved_movie)
+    movie_storage.update_movie(updated_movie, dict(updated_movie, director="Someone Else"))
+    movie_storage.delete_movie(movies[2])
+    movie_storage.delete_movie(new_movies[3])
+    movie_storage.delete_movie(moved_movie)
+
+
+
+def fingerprints(all_movies):
+    """Get the sorted fingerprints of the movies"""
+    return sorted(map(catalog.get_movie_fingerprint, all_movies))
+
+
+
+@pytest.fixture
+def trees(use_tree):
+    """Build the same tree twice, change the first with the folder storage and the second through the log.
+    Returns the fingerprints of the changed first tree and its partition files"""
+    unscrapped_movies = make_movies(2000)
+    expected = {}
+    for name, logged in (("folder", "no"), ("logged", "yes")):
+        use_tree(name, Mutation_Log=logged)
+        write_unscrapped(unscrapped_movies)
+        load.ingest_movies()
+        movies = [load.clean_movie_data(movie) for movie in load.get_all_movies()]
+        apply_changes(storage.get_storage(), movies)
+        if name == "folder":
+            expected = {"movies": fingerprints(load.get_all_movies()), "tree": read_tree()}
+    return expected
+
+
+
+def test_replay_matches_folder_tree(trees):
+    """Replaying the log over the partitions gives the movies the folder storage wrote"""
+    movie_storage = storage.get_storage()
+    assert isinstance(movie_storage, storage.LoggedFolderStorage)
+    assert fingerprints(movie_storage.load_movies()) == trees["movies"]
+    assert movie_storage.get_fingerprints() == set(trees["movies"])
+
+
+
+def test_compaction_matches_folder_tree(trees):
+    """Compacting the log writes the partition files the folder storage wrote and removes the log"""
+    movies_folder, _, _, _ = load.get_config()
+    assert mutations.compact_log() > 0
+    assert not os.path.exists(mutations.get_log_path(movies_folder))
+    assert fingerprints(load.read_folder_movies()) == trees["movies"]
+    assert read_tree() == trees["tree"]
+
+
+
+def test_interrupted_compaction_is_finished_once(trees, monkeypatch):
+    """A compaction stopped after its marker is written is finished by the next load, not replayed twice"""
+    movies_folder, _, _, _ = load.get_config()
+    finish_compaction = mutations.finish_compaction
+    
+    def crash():
+        raise KeyboardInterrupt
+    monkeypatch.setattr(mutations, "finish_compaction", crash)
+    with pytest.raises(KeyboardInterrupt):
+        mutations.compact_log()
+    monkeypatch.setattr(mutations, "finish_compaction", finish_compaction)
+    assert os.path.exists(mutations.get_marker_path(movies_folder))
+    
+    assert fingerprints(storage.get_storage().load_movies()) == trees["movies"]
+    assert not os.path.exists(mutations.get_marker_path(movies_folder))
+    assert not os.path.exists(mutations.get_log_path(movies_folder))
+    assert read_tree() == trees["tree"]
+
+
+
+def test_append_after_torn_write(use_tree):
+    """A record cut short by a crash is skipped and the records appended after it are kept"""
+    use_tree(Mutation_Log="yes")
+    write_unscrapped(make_movies(200))
+    load.ingest_movies()
+    movies_folder, _, _, _ = load.get_config()
+    movie_storage = storage.get_storage()
+    new_movies = make_movies(3, seed=1)
+    movie_storage.add_movie(new_movies[0])
+    with open(mutations.get_log_path(movies_folder), "ab") as file:
+        file.write('{"op": "add", "movie": {"name": "Cut sh'.encode("utf-8"))
+    movie_storage.add_movie(new_movies[1])
+    movie_storage.add_movie(new_movies[2])
+    
+    assert [mutation["movie"]["name"] for mutation in mutations.read_mutations()] == [movie["name"] for movie in new_movies]
+    expected_movies = fingerprints(load.read_folder_movies() + new_movies)
+    assert fingerprints(movie_storage.load_movies()) == expected_movies
+    mutations.compact_log()
+    assert fingerprints(load.read_folder_movies()) == expected_movies
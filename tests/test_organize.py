@@ -0,0 +1,124 @@
+import os, errno
+import pytest
+from scripts import organize
+
+
+
+@pytest.fixture
+def source_path(tmp_path, monkeypatch):
+    """Write a file of a few copy chunks. Returns its path"""
+    monkeypatch.setattr(organize, "COPY_CHUNK_SIZE", 1000)
+    path = tmp_path / "source.csv"
+    path.write_bytes(os.urandom(4321))
+    return str(path)
+
+
+
+def test_move_renames_on_the_same_device(source_path, tmp_path):
+    """A move on one device is a rename that keeps the contents"""
+    with open(source_path, "rb") as file:
+        contents = file.read()
+    destination_path = str(tmp_path / "destination.csv")
+    assert organize.move_file(source_path, destination_path)[0] == len(contents)
+    assert not os.path.exists(source_path)
+    with open(destination_path, "rb") as file:
+        assert file.read() == contents
+
+
+
+def test_move_copies_across_devices(source_path, tmp_path, monkeypatch):
+    """When the rename fails with EXDEV the file is copied in chunks and the source removed"""
+    with open(source_path, "rb") as file:
+        contents = file.read()
+    replace = os.replace
+
+    def replace_on_one_device(source, destination):
+        if not source.endswith(".tmp"):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        replace(source, destination)
+    monkeypatch.setattr(organize.os, "replace", replace_on_one_device)
+    destination_path = str(tmp_path / "destination.csv")
+    assert organize.move_file(source_path, destination_path)[0] == len(contents)
+    assert not os.path.exists(source_path)
+    assert not os.path.exists(destination_path + ".tmp")
+    with open(destination_path, "rb") as file:
+        assert file.read() == contents
+
+
+
+def test_copy_without_kernel_copy(source_path, tmp_path, monkeypatch):
+    """The copy falls back to a buffered loop when the kernel cannot copy the files"""
+    with open(source_path, "rb") as file:
+        contents = file.read()
+
+    def fail(*arguments):
+        raise OSError(errno.EINVAL, "Invalid argument")
+    monkeypatch.setattr(organize, "copy_chunk", fail)
+    destination_path = str(tmp_path / "destination.csv")
+    assert organize.copy_file(source_path, destination_path) == len(contents)
+    with open(destination_path, "rb") as file:
+        assert file.read() == contents
+
+
+
+def test_failed_move_keeps_the_source(source_path, tmp_path):
+    """A move to a missing folder leaves the source in place"""
+    assert organize.move_file(source_path, str(tmp_path / "missing" / "destination.csv")) is None
+    assert os.path.exists(source_path)
+
+
+
+def test_search_skips_ignored_deep_and_pruned_folders(tmp_path):
+    """The search finds the shallowest file and never enters hidden, ignored, pruned or too deep folders"""
+    for folder in ("a", "a/b", "a/b/c", ".git", "venv", "movies/Drama"):
+        (tmp_path / folder).mkdir(parents=True)
+    for folder in ("a/b", "a/b/c", ".git", "venv", "movies/Drama"):
+        (tmp_path / folder / "other.csv").write_text("")
+    (tmp_path / "a/b/c/movies_unscrapped.csv").write_text("")
+    (tmp_path / "a/movies_unscrapped.csv").write_text("")
+
+    found_files = organize.search_files(str(tmp_path), max_depth=2, pruned_folders=[str(tmp_path / "movies")])
+    assert found_files == {"movies_unscrapped.csv": str(tmp_path / "a/movies_unscrapped.csv"),
+                        "other.csv": str(tmp_path / "a/b/other.csv")}
+    assert organize.search_files(str(tmp_path), max_depth=0) == {}
+
+
+
+def test_search_stops_once_every_file_is_found(tmp_path, monkeypatch):
+    """Folders left in the queue are not listed once the expected files were found"""
+    for folder in ("a", "b", "a/c"):
+        (tmp_path / folder).mkdir()
+    (tmp_path / "movies_unscrapped.csv").write_text("")
+    scanned_folders = []
+    scandir = os.scandir
+
+    def scandir_and_count(path):
+        scanned_folders.append(path)
+        return scandir(path)
+    monkeypatch.setattr(organize.os, "scandir", scandir_and_count)
+    found_files = organize.search_files(str(tmp_path), expected_files=["movies_unscrapped.csv"])
+    assert found_files == {"movies_unscrapped.csv": str(tmp_path / "movies_unscrapped.csv")}
+    assert scanned_folders == [str(tmp_path)]
+
+
+
+def test_file_dropped_where_it_was_found_is_moved_again(use_tree, monkeypatch):
+    """A later start checks where the file was moved in from without searching, and moves a new copy from there"""
+    tree_path = use_tree()
+    dropped_path = tree_path / "movies_unscrapped.csv"
+    dropped_path.write_text("name\nfirst\n")
+    destination_path = organize.organize_files()["movies_unscrapped"]
+    
+    def search_files(*arguments, **options):
+        raise AssertionError("The data files were searched")
+    monkeypatch.setattr(organize, "search_files", search_files)
+    assert organize.organize_files()["movies_unscrapped"] == destination_path
+    with open(destination_path) as file:
+        assert file.read() == "name\nfirst\n"
+    
+    dropped_path.write_text("name\nsecond\n")
+    assert organize.organize_files()["movies_unscrapped"] == destination_path
+    assert not dropped_path.exists()
+    with open(destination_path) as file:
+        assert file.read() == "name\nsecond\n"
+    assert organize.load_file_locations(str(tree_path)) == {"movies_unscrapped.csv": str(dropped_path)}
@@ -0,0 +1,74 @@
+import os
+import pytest
+from scripts import load
+from tests.conftest import make_movies, read_tree, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree. Returns the movies"""
+    use_tree()
+    movies = make_movies(300)
+    write_unscrapped(movies)
+    load.categorize_movies()
+    return movies
+
+
+
+def get_file_path(movie):
+    """Get the partition file of a movie"""
+    _, _, file_format, _ = load.get_config()
+    return load.get_movie_file_path(movie["genre"], movie["year"], movie["duration"], file_format)[0]
+
+
+
+def test_replace_writes_only_its_partition(movies):
+    """Replacing a movie rewrites its partition file and leaves every other file as it was"""
+    movies_folder, encoding, _, _ = load.get_config()
+    file_path = get_file_path(movies[0])
+    movie_amount = len(load.read_csv_file(file_path, encoding))
+    tree = read_tree()
+    new_movie = dict(movies[0], rating="9.9")
+    
+    assert load.replace_movie_in_file(file_path, encoding, movies[0], new_movie) == (True, movie_amount)
+    changed_tree = read_tree()
+    assert [path for path in tree if changed_tree[path] != tree[path]] == [os.path.relpath(file_path, movies_folder)]
+    file_movies = load.read_csv_file(file_path, encoding)
+    assert new_movie in file_movies and movies[0] not in file_movies
+
+
+
+def test_removing_the_last_movie_removes_the_file(movies):
+    """A partition file left without movies is removed"""
+    _, encoding, _, _ = load.get_config()
+    file_path = get_file_path(movies[0])
+    for movie in load.read_csv_file(file_path, encoding):
+        load.replace_movie_in_file(file_path, encoding, movie)
+    assert not os.path.exists(file_path)
+
+
+
+def test_clean_partition_folders_stops_at_the_first_folder_in_use(movies):
+    """Cleaning after a partition is emptied removes its empty folders up to the first one that still has files"""
+    movies_folder, encoding, _, _ = load.get_config()
+    file_path = get_file_path(movies[0])
+    year_folder = os.path.dirname(os.path.dirname(file_path))
+    other_categories = [name for name in os.listdir(year_folder) if name != os.path.basename(os.path.dirname(file_path))]
+    for movie in load.read_csv_file(file_path, encoding):
+        load.replace_movie_in_file(file_path, encoding, movie)
+    
+    assert load.clean_partition_folders(file_path, movies_folder, encoding) == (1 if other_categories else 2)
+    assert not os.path.exists(os.path.dirname(file_path))
+    assert os.path.isdir(year_folder) == bool(other_categories)
+    assert os.path.isdir(os.path.dirname(year_folder))
+
+
+
+def test_concurrent_reads_match_sequential_reads(movies, use_tree):
+    """Reading the partition files in several threads gives the movies in the order one thread gives"""
+    use_tree(Read_Workers=1)
+    expected_movies = [list(movie.values()) for movie in load.get_all_movies()]
+    assert len(expected_movies) == len(movies)
+    use_tree(Read_Workers=8)
+    assert [list(movie.values()) for movie in load.get_all_movies()] == expected_movies
@@ -0,0 +1,92 @@
+import os
+import pytest
+from scripts import load, manifest, partitions
+from tests.conftest import get_rows, make_movies, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree. Returns the movies"""
+    use_tree()
+    movies = make_movies(600)
+    write_unscrapped(movies)
+    load.categorize_movies()
+    return movies
+
+
+
+def count_partition_files(genre=None, year_min=None, year_max=None, categories=None):
+    """Count the partition files of a genre, year range and duration categories"""
+    return sum(1 for _, _, file_path in load.iter_partition_files(genre, year_min, year_max)
+            if categories is None or partitions.get_partition_category(file_path) in categories)
+
+
+
+def test_query_matches_catalog(movies):
+    """The lazy catalog answers every query like the loaded catalog"""
+    all_movies = load.get_all_movies()
+    movie_partitions = partitions.PartitionCatalog(cache_size=8)
+    for criteria in ({"genre": "Drama"}, {"language": "Korean"}, {"year": (1995, 2000)}, {"duration": (90, 120)},
+                    {"rating": (5.0, 8.5)}, {"genre": "Drama", "year": (2000, 2009), "duration": (121, 300)}):
+        assert get_rows(movie_partitions.query(**criteria)) == get_rows(all_movies.query(**criteria))
+    assert len(movie_partitions) == len(movies)
+    assert get_rows(movie_partitions) == get_rows(movies)
+
+
+
+def test_query_reads_only_matching_folders(movies):
+    """A genre reads one subtree, a year range the matching year folders and a duration range its categories"""
+    genre = movies[0]["genre"]
+    for criteria, partition_amount in (({"genre": genre}, count_partition_files(genre)),
+                                    ({"year": (1995, 1996)}, count_partition_files(year_min=1995, year_max=1996)),
+                                    ({"duration": (60, 80)}, count_partition_files(categories=["short"]))):
+        movie_partitions = partitions.PartitionCatalog()
+        movie_partitions.query(**criteria)
+        assert 0 < movie_partitions.reads == partition_amount
+
+
+
+def test_cache_keeps_the_recently_used_partitions(movies):
+    """Parsed partitions are reused until they change, and at most cache_size of them are kept"""
+    genre = movies[0]["genre"]
+    movie_partitions = partitions.PartitionCatalog(cache_size=1000)
+    movie_partitions.query(genre=genre)
+    reads = movie_partitions.reads
+    movie_partitions.query(genre=genre)
+    assert movie_partitions.reads == reads
+    
+    _, encoding, _, _ = load.get_config()
+    file_path = next(iter(movie_partitions.partitions))
+    new_movie = dict(load.read_csv_file(file_path, encoding)[0], name="Added later")
+    load.replace_movie_in_file(file_path, encoding, new_movie, new_movie)
+    assert get_rows(movie_partitions.query(genre=genre)) == get_rows([movie for movie in movies + [new_movie] if movie["genre"] == genre])
+    assert movie_partitions.reads == reads + 1
+    
+    movie_partitions = partitions.PartitionCatalog(cache_size=4)
+    movie_partitions.query(genre=genre)
+    assert len(movie_partitions.partitions) == 4
+
+
+
+@pytest.mark.parametrize("with_manifest", [True, False])
+def test_tree_lists_partitions_without_reading_them(movies, monkeypatch, with_manifest):
+    """The genre/year/duration category tree comes from the manifest or the folder names, not from the files"""
+    movies_folder, _, file_format, _ = load.get_config()
+    expected_tree = {}
+    for movie in movies:
+        file_path, _ = load.get_movie_file_path(movie["genre"], movie["year"], movie["duration"], file_format)
+        expected_tree.setdefault(movie["genre"], {}).setdefault(movie["year"], set()).add(partitions.get_partition_category(file_path))
+    if with_manifest:
+        # Loading the movies once saves the manifest
+        load.get_all_movies()
+    assert os.path.exists(manifest.get_manifest_path(movies_folder)) == with_manifest
+    
+    def read_partition(*arguments):
+        raise AssertionError("A partition file was read")
+    monkeypatch.setattr(load, "read_csv_file", read_partition)
+    monkeypatch.setattr(load, "read_partition_files", read_partition)
+    movie_partitions = partitions.PartitionCatalog()
+    tree = movie_partitions.get_tree()
+    assert movie_partitions.reads == 0
+    assert {genre: {year: set(categories) for year, categories in years.items()} for genre, years in tree.items()} == expected_tree
@@ -0,0 +1,42 @@
+import pytest
+from scripts import records, catalog
+from tests.conftest import make_movies
+
+HEAT = {"name": " Heat ", "genre": "Crime", "year": "1995", "duration": "170", "rating": "8.3", "director": "Michael Mann", "language": "English"}
+
+
+
+def test_movie_keeps_text_and_parsed_values():
+    """A record returns the cleaned text of every field and keeps the numbers parsed once"""
+    movie = records.Movie(HEAT)
+    assert dict(movie) == dict(HEAT, name="Heat")
+    assert (movie.year_value, movie.duration_value, movie.rating_value, movie.duration_category) == (1995, 170, 8.3, "long")
+    
+    movie["duration"] = "100"
+    assert (movie["duration"], movie.duration_value, movie.duration_category) == ("100", 100, "medium")
+    movie["year"] = "soon"
+    assert movie.year_value is None
+    with pytest.raises(KeyError):
+        movie["budget"] = "1"
+
+
+
+def test_movie_behaves_like_a_dictionary():
+    """Records compare equal to dictionaries, copy independently and have no instance dictionary"""
+    movie = records.Movie(HEAT)
+    movie_copy = movie.copy()
+    movie_copy["rating"] = "9.0"
+    assert movie == dict(HEAT, name="Heat") and movie != movie_copy
+    assert records.get_rating(movie) == 8.3 and records.get_rating(movie_copy) == 9.0
+    with pytest.raises(AttributeError):
+        movie.budget = 1
+
+
+
+def test_catalog_holds_records():
+    """Dictionaries added to a catalog become records with the same values"""
+    movies = make_movies(50)
+    all_movies = catalog.MovieCatalog(movies[:25])
+    all_movies.extend(movies[25:])
+    assert all(isinstance(movie, records.Movie) for movie in all_movies)
+    assert list(all_movies) == movies
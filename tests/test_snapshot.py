@@ -0,0 +1,67 @@
+import csv
+import pytest
+import main
+from scripts import load, storage, snapshot, catalog
+from tests.conftest import make_movies, write_unscrapped
+
+
+
+@pytest.fixture
+def saved_snapshot(use_tree):
+    """Ingest a tree and save the snapshot of its catalog. Returns the catalog"""
+    use_tree()
+    write_unscrapped(make_movies(500))
+    load.ingest_movies()
+    all_movies = load.get_all_movies()
+    assert snapshot.save_snapshot(all_movies)
+    return all_movies
+
+
+
+def append_unscrapped(movie):
+    """Append a movie to the unscrapped file"""
+    _, encoding, _, path_movies_unscrapped = load.get_config()
+    with open(path_movies_unscrapped, "a", encoding=encoding, newline="") as file:
+        csv.DictWriter(file, fieldnames=main.HEADER).writerow(movie)
+
+
+
+def test_unchanged_tree_loads_snapshot(saved_snapshot):
+    """The snapshot of an unchanged tree is the catalog that was saved"""
+    all_movies = snapshot.load_snapshot()
+    assert isinstance(all_movies, catalog.MovieCatalog)
+    assert list(map(catalog.get_movie_fingerprint, all_movies)) == list(map(catalog.get_movie_fingerprint, saved_snapshot))
+    assert not all_movies.check_aggregates()
+
+
+
+def test_changed_partition_invalidates_snapshot(saved_snapshot):
+    """Adding a movie to a partition file invalidates the snapshot until it is saved again"""
+    movie_storage = storage.get_storage()
+    movie_storage.add_movie(make_movies(1, seed=1)[0])
+    movie_storage.flush()
+    assert snapshot.load_snapshot() is None
+    
+    assert snapshot.save_snapshot(load.get_all_movies())
+    assert len(snapshot.load_snapshot()) == len(saved_snapshot) + 1
+
+
+
+def test_changed_unscrapped_file_invalidates_snapshot(saved_snapshot):
+    """A movie added to the unscrapped file invalidates the snapshot, and one saved before ingesting it is not used"""
+    append_unscrapped(make_movies(1, seed=1)[0])
+    assert snapshot.load_snapshot() is None
+    
+    # The movie is not in the catalog yet, so this snapshot is not settled
+    assert snapshot.save_snapshot(saved_snapshot)
+    assert snapshot.load_snapshot() is None
+
+
+
+def test_invalid_unscrapped_movie_keeps_snapshot_settled(saved_snapshot):
+    """A snapshot saved after an invalid movie was added to the unscrapped file is used"""
+    append_unscrapped(dict(make_movies(1, seed=1)[0], genre="Noir"))
+    assert snapshot.load_snapshot() is None
+    
+    assert snapshot.save_snapshot(saved_snapshot)
+    assert len(snapshot.load_snapshot()) == len(saved_snapshot)
@@ -0,0 +1,104 @@
+import os
+import pytest
+from scripts import load, storage, catalog
+from tests.conftest import get_rows, make_movies, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a folder tree, then switch the same tree to the SQLite storage. Returns the movies"""
+    use_tree()
+    movies = make_movies(600)
+    write_unscrapped(movies)
+    load.ingest_movies()
+    use_tree(Storage="sqlite")
+    return movies
+
+
+
+def test_database_imports_the_folder_tree(movies):
+    """The database is created from the folder tree and loads the same movies"""
+    movie_storage = storage.get_storage()
+    assert isinstance(movie_storage, storage.SQLiteStorage)
+    assert get_rows(movie_storage.load_movies()) == get_rows(movies)
+    assert os.path.exists(movie_storage.database_path)
+    assert len(movie_storage) == len(movies)
+    assert movie_storage.get_fingerprints() == {catalog.get_movie_fingerprint(movie) for movie in movies}
+
+
+
+def test_changes_are_stored(movies):
+    """Added, updated and deleted movies are stored and kept by a new connection"""
+    movie_storage = storage.get_storage()
+    new_movies = make_movies(20, seed=1)
+    movie_storage.add_movie(new_movies[0])
+    movie_storage.add_movies(new_movies[1:])
+    updated_movie = dict(movies[0], rating="9.9", year="1901")
+    movie_storage.update_movie(movies[0], updated_movie)
+    assert movie_storage.delete_movie(movies[1])
+    assert not movie_storage.delete_movie(movies[1])
+
+    expected_movies = [updated_movie] + movies[2:] + new_movies
+    assert get_rows(movie_storage.load_movies()) == get_rows(expected_movies)
+    assert get_rows(storage.SQLiteStorage(movie_storage.database_path).load_movies()) == get_rows(expected_movies)
+
+
+
+def test_query_matches_catalog(movies):
+    """Queries, text searches and finds answer like the loaded catalog"""
+    movie_storage = storage.get_storage()
+    all_movies = catalog.MovieCatalog(movies)
+    for criteria in ({"genre": "Drama"}, {"language": "Korean"}, {"year": (1995, 2000)}, {"duration": (90, 120)},
+                    {"rating": (5.0, 8.5)}, {"genre": "Drama", "year": (2000, 2009), "duration": (121, 300)}):
+        assert get_rows(movie_storage.query(**criteria)) == get_rows(all_movies.query(**criteria))
+    for field, text in (("name", "sequel"), ("director", "JOON"), ("name", "part two")):
+        assert get_rows(movie_storage.search_text(field, text)) == get_rows(all_movies.search_text(field, text))
+
+    for movie in movies[:50]:
+        duration_category = catalog.get_duration_category_or_none(movie["duration"])
+        found_movie = movie_storage.find(f" {movie['name'].upper()} ", movie["genre"], movie["year"], duration_category)
+        assert get_rows([found_movie]) == get_rows([all_movies.find(movie["name"], movie["genre"], movie["year"], duration_category)])
+
+
+
+def test_find_by_partial_name(movies):
+    """A partial find falls back to the first movie of the category whose name contains the text"""
+    movie_storage = storage.get_storage()
+    movie = movies[3]
+    duration_category = catalog.get_duration_category_or_none(movie["duration"])
+    assert movie_storage.find("ovie 3", movie["genre"], movie["year"], duration_category) is None
+    found_movie = movie_storage.find("OVIE 3", movie["genre"], movie["year"], duration_category, partial=True)
+    assert get_rows([found_movie]) == get_rows([movie])
+
+
+
+def test_query_with_values_that_are_not_numbers(movies):
+    """Range queries are left to the catalog when a range column has a value that is not a number"""
+    movie_storage = storage.get_storage()
+    movie_storage.add_movie(dict(movies[0], name="Unknown length", duration="long"))
+    assert movie_storage.query(duration=(90, 120)) is None
+    assert movie_storage.query(genre="Drama") is not None
+
+
+
+def test_update_and_delete_keep_the_catalog_in_sync(movies, monkeypatch):
+    """The movie found by the database is changed in the loaded catalog as well as in the storage"""
+    all_movies = load.get_all_movies()
+    movie_storage = storage.get_storage()
+    movie = movies[3]
+    search_criteria = ("OVIE 3", movie["genre"], movie["year"], catalog.get_duration_category_or_none(movie["duration"]))
+    monkeypatch.setattr(load, "get_movie_search_criteria", lambda all_movies: search_criteria)
+    monkeypatch.setattr(load, "select_from_menu", lambda options, prompt: "rating")
+    monkeypatch.setattr(load, "get_movie_attribute_input", lambda attribute, value: "9.9")
+    load.update_movie(all_movies)
+    updated_movie = dict(movie, rating="9.9")
+    expected_movies = movies[:3] + [updated_movie] + movies[4:]
+    assert get_rows(all_movies) == get_rows(expected_movies)
+    assert get_rows(all_movies.query(rating=(9.9, 9.9))) == get_rows([updated_movie])
+
+    monkeypatch.setattr(load.main, "insert_option", lambda range_max: 1)
+    load.delete_movie(all_movies)
+    del expected_movies[3]
+    assert get_rows(all_movies) == get_rows(expected_movies)
+    assert get_rows(storage.SQLiteStorage(movie_storage.database_path).load_movies()) == get_rows(expected_movies)
@@ -0,0 +1,63 @@
+import csv
+import pytest
+import main
+from scripts import load, summary
+from tests.conftest import make_movies, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree. Returns the movies"""
+    use_tree()
+    movies = make_movies(500)
+    write_unscrapped(movies)
+    load.categorize_movies()
+    return movies
+
+
+
+def assert_same_summary(file_summary, expected_summary):
+    """Compare two summaries, leaving out the file size and mtime of sidecars and allowing rounding differences in the rating sums"""
+    file_summary, expected_summary = dict(file_summary), dict(expected_summary)
+    for key in ("size", "mtime_ns"):
+        file_summary.pop(key, None)
+    for key in ("rating_sum", "rating_mean"):
+        assert file_summary.pop(key) == pytest.approx(expected_summary.pop(key))
+    assert file_summary == expected_summary
+
+
+
+def test_sidecars_match_partitions(movies):
+    """Every partition file gets a sidecar with the summary of its movies"""
+    _, encoding, _, _ = load.get_config()
+    file_paths = [file_path for _, _, file_path in load.iter_partition_files()]
+    assert file_paths
+    for file_path in file_paths:
+        assert_same_summary(summary.read_summary(file_path), summary.build_summary(load.read_csv_file(file_path, encoding)))
+
+
+
+def test_catalog_summary_matches_movies(movies):
+    """The combined summaries count the movies of the whole catalog and of a genre and year range"""
+    total, genre_summaries = load.get_catalog_summary()
+    assert total["rows"] == len(movies)
+    assert total["duration_sum"] == sum(int(movie["duration"]) for movie in movies)
+    assert {genre: genre_summary["rows"] for genre, genre_summary in genre_summaries.items()} == \
+        {genre: amount for genre in main.GENRES if (amount := sum(movie["genre"] == genre for movie in movies))}
+    
+    genre = movies[0]["genre"]
+    expected_movies = [movie for movie in movies if movie["genre"] == genre and 1995 <= int(movie["year"]) <= 2000]
+    assert_same_summary(load.get_catalog_summary(genre, 1995, 2000)[0], summary.build_summary(expected_movies))
+
+
+
+def test_stale_sidecar_is_rebuilt(movies):
+    """A sidecar that no longer describes its partition file is rebuilt from the file"""
+    _, encoding, file_format, _ = load.get_config()
+    file_path, _ = load.get_movie_file_path(movies[0]["genre"], movies[0]["year"], movies[0]["duration"], file_format)
+    with open(file_path, "a", encoding=encoding, newline="") as file:
+        csv.DictWriter(file, fieldnames=main.HEADER).writerow(dict(movies[0], name="Added behind the sidecar"))
+    
+    assert summary.read_summary(file_path) is None
+    assert_same_summary(load.get_partition_summary(file_path, encoding), summary.build_summary(load.read_csv_file(file_path, encoding)))
@@ -0,0 +1,71 @@
+import pytest
+from scripts import load, storage
+from tests.conftest import get_rows, make_movies, write_unscrapped
+
+
+
+@pytest.fixture
+def movies(use_tree):
+    """Ingest movies into a tree. Returns the movies"""
+    use_tree()
+    movies = make_movies(200)
+    write_unscrapped(movies)
+    load.ingest_movies()
+    return movies
+
+
+
+def test_added_movies_are_written_right_away_by_default(movies):
+    """Without Write_Buffer_Rows above 1 every added movie is in its partition file at once"""
+    movie_storage = storage.get_storage()
+    new_movie = make_movies(1, seed=1)[0]
+    movie_storage.add_movie(new_movie)
+    assert movie_storage.write_buffer is None
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + [new_movie])
+
+
+
+def test_added_movies_wait_until_the_buffer_is_full(movies, use_tree):
+    """Queued movies count as stored but reach the partition files when the buffer fills or is flushed"""
+    use_tree(Write_Buffer_Rows=10, Write_Buffer_Seconds=3600)
+    movie_storage = storage.get_storage()
+    new_movies = make_movies(25, seed=1)
+    for movie in new_movies[:9]:
+        movie_storage.add_movie(movie)
+    assert get_rows(load.read_folder_movies()) == get_rows(movies)
+    assert movie_storage.get_fingerprints() == set(get_rows(movies + new_movies[:9]))
+
+    for movie in new_movies[9:22]:
+        movie_storage.add_movie(movie)
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + new_movies[:20])
+    assert movie_storage.write_buffer.pending_rows == 2
+
+    movie_storage.add_movies(new_movies[22:])
+    assert movie_storage.write_buffer.pending_rows == 0
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + new_movies)
+
+
+
+def test_buffer_is_written_when_due(movies, use_tree):
+    """flush_if_due writes the queued movies once the oldest has waited Write_Buffer_Seconds"""
+    use_tree(Write_Buffer_Rows=100, Write_Buffer_Seconds=3600)
+    movie_storage = storage.get_storage()
+    new_movie = make_movies(1, seed=1)[0]
+    movie_storage.add_movie(new_movie)
+    assert movie_storage.flush_if_due() == 0
+    movie_storage.write_buffer.max_seconds = 0
+    assert movie_storage.flush_if_due() == 1
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + [new_movie])
+
+
+
+def test_changes_write_the_buffer_first(movies, use_tree):
+    """Updating a queued movie writes the buffer first, so the update finds it in its file"""
+    use_tree(Write_Buffer_Rows=100, Write_Buffer_Seconds=3600)
+    movie_storage = storage.get_storage()
+    new_movie = load.clean_movie_data(make_movies(1, seed=1)[0])
+    movie_storage.add_movie(new_movie)
+    updated_movie = dict(new_movie, rating="9.9")
+    movie_storage.update_movie(new_movie, updated_movie)
+    assert movie_storage.write_buffer.pending_rows == 0
+    assert get_rows(load.read_folder_movies()) == get_rows(movies + [updated_movie])